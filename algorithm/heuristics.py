@@ -0,0 +1,192 @@
+"""
+Heurísticas construtivas para o sequenciamento em máquina única.
+
+Usadas para gerar uma solução inicial (warm start) para o CBC:
+- ATCS (Apparent Tardiness Cost with Setups): despacho guloso que considera
+  peso, tempo de processamento, prazo e setup dependente da sequência;
+- busca local por trocas de pares (pairwise swap) sobre a sequência ATCS.
+
+Todas as funções trabalham apenas com listas/arrays (sem banco de dados).
+O parâmetro opcional `initial_setup` (setup do job que está na máquina para
+cada job) representa o estado inicial da máquina; sem ele a sequência
+começa sem setup.
+"""
+import time
+
+import numpy as np
+
+# Combinações de (k1, k2) testadas no ATCS; a melhor sequência é mantida
+ATCS_PARAMETERS = (
+    (0.5, 0.1), (1.0, 0.5), (2.0, 0.5), (2.0, 1.0), (3.0, 1.0), (4.0, 2.0),
+)
+
+
+def _as_arrays(processing_time, due_time, weight, setup_time):
+    return (
+        np.asarray(processing_time, dtype=float),
+        np.asarray(due_time, dtype=float),
+        np.asarray(weight, dtype=float),
+        np.asarray(setup_time, dtype=float),
+    )
+
+
+def sequence_cost(sequence, processing_time, due_time, weight, setup_time, initial_setup=None) -> float:
+    """Atraso ponderado de uma sequência sem ociosidade (setup entre jobs consecutivos)."""
+    p, d, w, s = _as_arrays(processing_time, due_time, weight, setup_time)
+    seq = np.asarray(sequence, dtype=np.intp)
+    if len(seq) == 0:
+        return 0.0
+    durations = p[seq].copy()
+    durations[1:] += s[seq[:-1], seq[1:]]
+    if initial_setup is not None:
+        durations[0] += initial_setup[seq[0]]
+    completion = np.cumsum(durations)
+    return float(np.sum(w[seq] * np.maximum(completion - d[seq], 0.0)))
+
+
+def atcs_sequence(
+    processing_time,
+    due_time,
+    weight,
+    setup_time,
+    k1: float = 2.0,
+    k2: float = 0.5,
+    initial_setup=None,
+) -> list[int]:
+    """
+    Despacho ATCS: a cada passo escolhe o job com maior índice
+
+        I_j = w_j / p_j * exp(-max(d_j - p_j - t, 0) / (k1 * p_médio))
+                        * exp(-s_lj / (k2 * s_médio))
+
+    onde l é o último job sequenciado e t o instante atual.
+    """
+    p, d, w, s = _as_arrays(processing_time, due_time, weight, setup_time)
+    n = len(p)
+    if n == 0:
+        return []
+
+    p_mean = max(float(p.mean()), 1e-9)
+    off_diagonal = s[~np.eye(n, dtype=bool)]
+    s_mean = max(float(off_diagonal.mean()) if off_diagonal.size else 0.0, 1e-9)
+    ratio = w / np.maximum(p, 1e-9)
+    initial = np.zeros(n) if initial_setup is None else np.asarray(initial_setup, dtype=float)
+
+    remaining = np.ones(n, dtype=bool)
+    sequence = []
+    t = 0.0
+    last = None
+    for _ in range(n):
+        slack = np.maximum(d - p - t, 0.0)
+        index = ratio * np.exp(-slack / (k1 * p_mean))
+        index = index * np.exp(-(s[last] if last is not None else initial) / (k2 * s_mean))
+        index = np.where(remaining, index, -1.0)
+        # Em empate (ex.: todos os índices zerados), prioriza o menor prazo
+        best = np.flatnonzero(index == index.max())
+        nxt = int(best[np.argmin(d[best])])
+
+        t += (s[last, nxt] if last is not None else initial[nxt]) + p[nxt]
+        sequence.append(nxt)
+        remaining[nxt] = False
+        last = nxt
+    return sequence
+
+
+def pairwise_swap_search(
+    sequence,
+    processing_time,
+    due_time,
+    weight,
+    setup_time,
+    time_limit: float = 2.0,
+    max_passes: int = 20,
+    initial_setup=None,
+) -> tuple[list[int], float]:
+    """
+    Busca local por troca de pares (primeira melhoria). Cada troca (a, b)
+    só reavalia o sufixo a partir da posição a, reaproveitando o prefixo.
+    Para quando não há melhoria, ao atingir `max_passes` ou o tempo limite.
+    """
+    p, d, w, s = _as_arrays(processing_time, due_time, weight, setup_time)
+    seq = np.asarray(sequence, dtype=np.intp).copy()
+    n = len(seq)
+    if n < 2:
+        return seq.tolist(), sequence_cost(seq, p, d, w, s, initial_setup)
+    initial = np.zeros(len(p)) if initial_setup is None else np.asarray(initial_setup, dtype=float)
+
+    def completions(order):
+        durations = p[order].copy()
+        durations[0] += initial[order[0]]
+        durations[1:] += s[order[:-1], order[1:]]
+        return np.cumsum(durations)
+
+    def suffix_cost(order, a, prefix_end):
+        """Custo das posições a.. considerando que a posição a-1 termina em prefix_end."""
+        sub = order[a:]
+        durations = p[sub].copy()
+        durations[0] += s[order[a - 1], sub[0]] if a > 0 else initial[sub[0]]
+        durations[1:] += s[sub[:-1], sub[1:]]
+        completion = prefix_end + np.cumsum(durations)
+        return float(np.sum(w[sub] * np.maximum(completion - d[sub], 0.0)))
+
+    deadline = time.perf_counter() + time_limit
+    completion = completions(seq)
+    tardiness = w[seq] * np.maximum(completion - d[seq], 0.0)
+    best_cost = float(tardiness.sum())
+
+    for _ in range(max_passes):
+        improved = False
+        for a in range(n - 1):
+            prefix_end = completion[a - 1] if a > 0 else 0.0
+            prefix_cost = float(tardiness[:a].sum())
+            for b in range(a + 1, n):
+                seq[a], seq[b] = seq[b], seq[a]
+                cost = prefix_cost + suffix_cost(seq, a, prefix_end)
+                if cost < best_cost - 1e-9:
+                    best_cost = cost
+                    completion = completions(seq)
+                    tardiness = w[seq] * np.maximum(completion - d[seq], 0.0)
+                    improved = True
+                else:
+                    seq[a], seq[b] = seq[b], seq[a]
+            if time.perf_counter() > deadline:
+                return seq.tolist(), best_cost
+        if not improved:
+            break
+    return seq.tolist(), best_cost
+
+
+def build_initial_sequence(
+    processing_time,
+    due_time,
+    weight,
+    setup_time,
+    time_limit: float = 2.0,
+    initial_setup=None,
+) -> dict:
+    """
+    Solução inicial: melhor sequência ATCS entre as combinações de
+    `ATCS_PARAMETERS`, refinada por busca local de trocas de pares.
+    """
+    t0 = time.perf_counter()
+    p, d, w, s = _as_arrays(processing_time, due_time, weight, setup_time)
+
+    best_sequence, best_cost = None, float("inf")
+    for k1, k2 in ATCS_PARAMETERS:
+        candidate = atcs_sequence(p, d, w, s, k1=k1, k2=k2, initial_setup=initial_setup)
+        cost = sequence_cost(candidate, p, d, w, s, initial_setup)
+        if cost < best_cost:
+            best_sequence, best_cost = candidate, cost
+    atcs_cost = best_cost
+
+    remaining = max(time_limit - (time.perf_counter() - t0), 0.0)
+    sequence, cost = pairwise_swap_search(
+        best_sequence, p, d, w, s, time_limit=remaining, initial_setup=initial_setup
+    )
+
+    return {
+        "sequence": sequence,
+        "atcs_objective": round(atcs_cost, 4),
+        "objective": round(cost, 4),
+        "time_s": round(time.perf_counter() - t0, 4),
+    }
@@ -0,0 +1,34 @@
+"""
+Ponto de entrada do sequenciamento de injetoras (algorithm.injection) com
+entradas e saída em dados simples, para execução em processo separado.
+"""
+
+
+def solve_injection_problem(
+    jobs,
+    machines,
+    processing=None,
+    due=None,
+    priority=None,
+    setup3=None,
+    dummy=None,
+) -> dict:
+    # Import tardio: o processo worker só carrega o modelo quando necessário
+    from algorithm.injection import solve_injection_scheduling
+
+    status, obj_value, sequences, completion, tardiness = solve_injection_scheduling(
+        jobs=jobs,
+        machines=machines,
+        processing=processing,
+        due=due,
+        priority=priority,
+        setup3=setup3,
+        dummy=dummy,
+    )
+    return {
+        "status": status,
+        "objective_value": obj_value,
+        "sequences": {machine: list(seq) for machine, seq in sequences.items()},
+        "completion": dict(completion),
+        "tardiness": dict(tardiness),
+    }
@@ -0,0 +1,357 @@
+"""
+Motor meta-heurístico (simulated annealing) para o sequenciamento de
+injetoras com múltiplas máquinas, setup dependente da sequência e atraso
+ponderado.
+
+Lê as mesmas entradas do modelo PuLP de `solve_injection_scheduling`
+(mapas `processing`, `due`, `priority` e `setup3` de `InjetorasRequest`) e
+é indicado para instâncias grandes (1000+ jobs), onde o MILP não fecha:
+
+- solução inicial gulosa: jobs em ordem de prazo (EDD), cada um na máquina
+  em que termina mais cedo;
+- vizinhanças: realocar um job (mesma ou outra máquina) e trocar dois jobs;
+- avaliação incremental: cada movimento reavalia apenas o sufixo alterado
+  das máquinas envolvidas (vetorizado com NumPy), reaproveitando os
+  tempos de conclusão e o atraso acumulado do prefixo;
+- resultado "anytime": o melhor objetivo é reportado via callback sempre
+  que melhora, e a busca termina dentro do orçamento de tempo informado.
+
+No pool de processos o callback precisa ser picklable: `ImprovementLog`
+grava as melhorias em um arquivo lido pelo processo da API
+(`algorithm.solver_progress.track_heuristic_progress`).
+"""
+import math
+import random
+import time
+from typing import Callable, Optional
+
+import numpy as np
+
+# Tempo de processamento a partir do qual a máquina é considerada indisponível
+# para o job (ex.: 9999 usado nas paradas programadas)
+UNAVAILABLE_TIME = 9999
+
+
+class InjectionInstance:
+    """Compila os mapas da requisição em arrays densos indexados por posição."""
+
+    def __init__(
+        self,
+        jobs: list[int],
+        machines: list[int],
+        processing: dict,
+        due: dict,
+        priority: dict,
+        setup3: Optional[dict] = None,
+        dummy: Optional[int] = 0,
+    ):
+        self.jobs = [j for j in jobs if j != dummy]
+        self.machines = list(machines)
+        self.dummy = dummy
+        n, m = len(self.jobs), len(self.machines)
+        job_pos = {job: i for i, job in enumerate(self.jobs)}
+        machine_pos = {machine: k for k, machine in enumerate(self.machines)}
+
+        self.processing = np.full((m, n), np.inf)
+        for (job, machine), time_value in processing.items():
+            if job in job_pos and machine in machine_pos and time_value < UNAVAILABLE_TIME:
+                self.processing[machine_pos[machine], job_pos[job]] = time_value
+
+        for i, job in enumerate(self.jobs):
+            if not np.isfinite(self.processing[:, i]).any():
+                raise ValueError(f"Job {job} não pode ser processado em nenhuma máquina")
+
+        self.due = np.array([due.get(job, 0.0) for job in self.jobs], dtype=float)
+        self.weight = np.array([priority.get(job, 1.0) for job in self.jobs], dtype=float)
+
+        # setup[m, i, j] entre jobs; initial_setup[m, j] a partir do job dummy
+        self.setup = np.zeros((m, n, n))
+        self.initial_setup = np.zeros((m, n))
+        for (pred, succ, machine), time_value in (setup3 or {}).items():
+            k = machine_pos.get(machine)
+            j = job_pos.get(succ)
+            if k is None or j is None:
+                continue
+            if pred == dummy:
+                self.initial_setup[k, j] = time_value
+            elif pred in job_pos:
+                self.setup[k, job_pos[pred], j] = time_value
+
+    @property
+    def size(self) -> tuple[int, int]:
+        return len(self.jobs), len(self.machines)
+
+
+class _MachineState:
+    """Sequência de uma máquina com tempos de conclusão e atraso acumulado."""
+
+    __slots__ = ("seq", "completion", "cum_cost")
+
+    def __init__(self, seq: list[int]):
+        self.seq = seq
+        self.completion = np.zeros(0)
+        self.cum_cost = np.zeros(0)
+
+    @property
+    def cost(self) -> float:
+        return float(self.cum_cost[-1]) if len(self.seq) else 0.0
+
+
+class SimulatedAnnealing:
+    def __init__(self, instance: InjectionInstance, seed: Optional[int] = None):
+        self.inst = instance
+        self.rng = random.Random(seed)
+
+    # ---- avaliação ---------------------------------------------------------
+
+    def _durations(self, k: int, seq: np.ndarray, prev: Optional[int]) -> np.ndarray:
+        inst = self.inst
+        durations = inst.processing[k, seq].copy()
+        durations[0] += inst.initial_setup[k, seq[0]] if prev is None else inst.setup[k, prev, seq[0]]
+        durations[1:] += inst.setup[k, seq[:-1], seq[1:]]
+        return durations
+
+    def _refresh(self, k: int, state: _MachineState):
+        if not state.seq:
+            state.completion = np.zeros(0)
+            state.cum_cost = np.zeros(0)
+            return
+        seq = np.asarray(state.seq, dtype=np.intp)
+        state.completion = np.cumsum(self._durations(k, seq, None))
+        tard = self.inst.weight[seq] * np.maximum(state.completion - self.inst.due[seq], 0.0)
+        state.cum_cost = np.cumsum(tard)
+
+    def _cost_from(self, k: int, state: _MachineState, new_seq: list[int], pos: int) -> float:
+        """Custo da máquina k com `new_seq`, que coincide com `state.seq` até pos-1."""
+        if not new_seq:
+            return 0.0
+        if pos >= len(new_seq):
+            return float(state.cum_cost[len(new_seq) - 1])
+        prefix_cost = float(state.cum_cost[pos - 1]) if pos > 0 else 0.0
+        prefix_end = float(state.completion[pos - 1]) if pos > 0 else 0.0
+        prev = new_seq[pos - 1] if pos > 0 else None
+        suffix = np.asarray(new_seq[pos:], dtype=np.intp)
+        completion = prefix_end + np.cumsum(self._durations(k, suffix, prev))
+        tard = self.inst.weight[suffix] * np.maximum(completion - self.inst.due[suffix], 0.0)
+        return prefix_cost + float(tard.sum())
+
+    # ---- solução inicial ---------------------------------------------------
+
+    def _initial_solution(self) -> list[_MachineState]:
+        inst = self.inst
+        n, m = inst.size
+        states = [_MachineState([]) for _ in range(m)]
+        ready = np.zeros(m)
+        last = [None] * m
+        for j in np.argsort(inst.due, kind="stable"):
+            setups = np.array([
+                inst.initial_setup[k, j] if last[k] is None else inst.setup[k, last[k], j]
+                for k in range(m)
+            ])
+            finish = ready + setups + inst.processing[:, j]
+            k = int(np.argmin(finish))
+            states[k].seq.append(int(j))
+            ready[k] = finish[k]
+            last[k] = int(j)
+        for k, state in enumerate(states):
+            self._refresh(k, state)
+        return states
+
+    # ---- busca -------------------------------------------------------------
+
+    def _random_move(self, states: list[_MachineState]):
+        """Sorteia um movimento e retorna (delta, novas sequências por máquina)."""
+        inst = self.inst
+        m = len(states)
+        loaded = [k for k in range(m) if states[k].seq]
+        a = self.rng.choice(loaded)
+        seq_a = states[a].seq
+        i = self.rng.randrange(len(seq_a))
+        job = seq_a[i]
+
+        if self.rng.random() < 0.5:
+            # Realocação: retira o job e insere em outra posição/máquina
+            b = self.rng.randrange(m)
+            if not np.isfinite(inst.processing[b, job]):
+                return None
+            if a == b:
+                if len(seq_a) < 2:
+                    return None
+                new_a = seq_a[:i] + seq_a[i + 1:]
+                pos = self.rng.randrange(len(new_a) + 1)
+                if pos == i:
+                    return None
+                new_a.insert(pos, job)
+                first = min(i, pos)
+                delta = self._cost_from(a, states[a], new_a, first) - states[a].cost
+                return delta, {a: new_a}
+            new_a = seq_a[:i] + seq_a[i + 1:]
+            seq_b = states[b].seq
+            pos = self.rng.randrange(len(seq_b) + 1)
+            new_b = seq_b[:pos] + [job] + seq_b[pos:]
+            delta = (
+                self._cost_from(a, states[a], new_a, i) - states[a].cost
+                + self._cost_from(b, states[b], new_b, pos) - states[b].cost
+            )
+            return delta, {a: new_a, b: new_b}
+
+        # Troca: dois jobs trocam de lugar (mesma máquina ou máquinas diferentes)
+        b = self.rng.choice(loaded)
+        seq_b = states[b].seq
+        jpos = self.rng.randrange(len(seq_b))
+        other = seq_b[jpos]
+        if other == job:
+            return None
+        if a == b:
+            new_a = list(seq_a)
+            new_a[i], new_a[jpos] = new_a[jpos], new_a[i]
+            delta = self._cost_from(a, states[a], new_a, min(i, jpos)) - states[a].cost
+            return delta, {a: new_a}
+        if not (np.isfinite(inst.processing[b, job]) and np.isfinite(inst.processing[a, other])):
+            return None
+        new_a = list(seq_a)
+        new_b = list(seq_b)
+        new_a[i], new_b[jpos] = other, job
+        delta = (
+            self._cost_from(a, states[a], new_a, i) - states[a].cost
+            + self._cost_from(b, states[b], new_b, jpos) - states[b].cost
+        )
+        return delta, {a: new_a, b: new_b}
+
+    def run(
+        self,
+        time_budget: float,
+        on_improvement: Optional[Callable[[float, float], None]] = None,
+        report_interval: float = 0.5,
+    ) -> dict:
+        t0 = time.perf_counter()
+        deadline = t0 + time_budget
+        if not self.inst.jobs:
+            return self._build_result([[] for _ in self.inst.machines], 0.0, 0.0, 0, 0, 0.0, [(0.0, 0.0)])
+        states = self._initial_solution()
+        current = sum(s.cost for s in states)
+        best = current
+        best_seqs = [list(s.seq) for s in states]
+        initial = current
+        history = [(0.0, round(best, 4))]
+        if on_improvement:
+            on_improvement(0.0, best)
+
+        # Temperatura inicial: média dos deltas positivos de uma amostra de movimentos
+        sample = [mv[0] for mv in (self._random_move(states) for _ in range(200)) if mv and mv[0] > 0]
+        t_start = (sum(sample) / len(sample)) if sample else 1.0
+        t_end = max(t_start * 1e-4, 1e-6)
+
+        iterations = accepted = 0
+        last_report = t0
+        pending_report = False
+        while True:
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            progress = (now - t0) / time_budget
+            temperature = t_start * (t_end / t_start) ** progress
+
+            # Lote de movimentos entre consultas ao relógio
+            for _ in range(64):
+                iterations += 1
+                move = self._random_move(states)
+                if move is None:
+                    continue
+                delta, changes = move
+                if delta <= 0 or self.rng.random() < math.exp(-delta / temperature):
+                    accepted += 1
+                    for k, seq in changes.items():
+                        states[k].seq = seq
+                        self._refresh(k, states[k])
+                    current += delta
+                    if current < best - 1e-9:
+                        # Recalcula para não acumular erro de ponto flutuante
+                        current = sum(s.cost for s in states)
+                        if current < best - 1e-9:
+                            best = current
+                            best_seqs = [list(s.seq) for s in states]
+                            pending_report = True
+
+            if pending_report and (time.perf_counter() - last_report) >= report_interval:
+                elapsed = time.perf_counter() - t0
+                history.append((round(elapsed, 3), round(best, 4)))
+                if on_improvement:
+                    on_improvement(elapsed, best)
+                last_report = time.perf_counter()
+                pending_report = False
+
+        elapsed = time.perf_counter() - t0
+        if pending_report:
+            history.append((round(elapsed, 3), round(best, 4)))
+            if on_improvement:
+                on_improvement(elapsed, best)
+
+        return self._build_result(best_seqs, best, initial, iterations, accepted, elapsed, history)
+
+    def _build_result(self, best_seqs, best, initial, iterations, accepted, elapsed, history) -> dict:
+        inst = self.inst
+        sequences = {}
+        completion = {}
+        tardiness = {}
+        for k, seq in enumerate(best_seqs):
+            machine = inst.machines[k]
+            sequences[machine] = [inst.jobs[j] for j in seq]
+            if not seq:
+                continue
+            arr = np.asarray(seq, dtype=np.intp)
+            ends = np.cumsum(self._durations(k, arr, None))
+            for j, end in zip(seq, ends):
+                completion[(inst.jobs[j], machine)] = round(float(end), 4)
+                tardiness[inst.jobs[j]] = round(max(float(end) - inst.due[j], 0.0), 4)
+
+        return {
+            "status": "Heuristic",
+            "objective_value": round(best, 4),
+            "initial_objective": round(initial, 4),
+            "sequences": sequences,
+            "completion": completion,
+            "tardiness": tardiness,
+            "iterations": iterations,
+            "accepted_moves": accepted,
+            "elapsed_s": round(elapsed, 4),
+            "history": history,
+        }
+
+
+class ImprovementLog:
+    """
+    Callback picklable para `on_improvement`: acrescenta cada melhoria a
+    `path`, uma linha "<tempo> <objetivo>" por melhoria.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __call__(self, elapsed: float, best: float):
+        with open(self.path, "a") as f:
+            f.write(f"{elapsed!r} {best!r}\n")
+
+
+def solve_injection_heuristic(
+    jobs: list[int],
+    machines: list[int],
+    processing: dict,
+    due: dict,
+    priority: dict,
+    setup3: Optional[dict] = None,
+    dummy: Optional[int] = 0,
+    time_budget: float = 5.0,
+    seed: Optional[int] = None,
+    on_improvement: Optional[Callable[[float, float], None]] = None,
+) -> dict:
+    """
+    Ponto de entrada do motor: mesmas entradas de `solve_injection_scheduling`
+    mais o orçamento de tempo (segundos, incluindo a montagem da instância) e
+    um callback opcional chamado com (tempo decorrido, melhor objetivo)
+    sempre que a melhor solução melhora.
+    """
+    t0 = time.perf_counter()
+    instance = InjectionInstance(jobs, machines, processing, due, priority, setup3, dummy)
+    remaining = max(time_budget - (time.perf_counter() - t0), 0.05)
+    return SimulatedAnnealing(instance, seed=seed).run(remaining, on_improvement=on_improvement)
@@ -0,0 +1,62 @@
+"""
+Tempo de processamento, tempo pós-gargalo e prazo de um lote de jobs,
+calculados de uma vez com NumPy (mesmas regras do cálculo por job que
+existia em `app/routes/solver.py`):
+
+- demanda com refugo = demanda * (1 + refugo% / 100)
+- fator de disponibilidade = (100 - disponibilidade) / 100 + 1
+- tempo no gargalo (s) = int(demanda com refugo * ciclo por peça * fator)
+- tempo pós-gargalo (s) = int(demanda com refugo * ciclo pós-gargalo por peça * fator)
+- processamento (h) = tempo no gargalo arredondado para cima em 0.1 h
+- prazo (h) = horas até a data prometida menos o pós-gargalo, arredondado
+  para cima em 0.1 h e limitado a 0; com `calendar`, as horas até a data
+  prometida são horas de trabalho (ver `working_calendar.py`)
+"""
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+
+from algorithm.working_calendar import WorkingCalendar
+
+
+def _ceil_tenth(hours: np.ndarray) -> np.ndarray:
+    return np.ceil(hours * 10) / 10
+
+
+def batch_processing_times(
+    demand,
+    scrap_percent,
+    cycle_s,
+    post_cycle_s,
+    machine_availability,
+    promised_date: list[datetime],
+    sequencing_date: datetime,
+    calendar: Optional[WorkingCalendar] = None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Retorna (processamento em h, prazo em h, pós-gargalo em h), um valor por
+    job, arredondados em 2 casas. Os parâmetros numéricos podem ser escalares
+    ou arrays com um valor por job. O `calendar` deve ter origem em
+    `sequencing_date`.
+    """
+    demand = np.asarray(demand, dtype=float)
+    demand_with_scrap = demand * (1 + np.asarray(scrap_percent, dtype=float) / 100)
+    available_factor = (100 - np.asarray(machine_availability, dtype=float)) / 100 + 1
+
+    in_bottleneck_s = np.trunc(demand_with_scrap * np.asarray(cycle_s, dtype=float) * available_factor)
+    post_bottleneck_s = np.trunc(demand_with_scrap * np.asarray(post_cycle_s, dtype=float) * available_factor)
+
+    if calendar is not None:
+        deadline_h = np.asarray(calendar.working_hours(promised_date), dtype=float)
+    else:
+        promised = np.array(promised_date, dtype="datetime64[us]")
+        deadline_h = (promised - np.datetime64(sequencing_date, "us")) / np.timedelta64(1, "h")
+
+    processing_h = _ceil_tenth(in_bottleneck_s / 3600)
+    due_h = np.maximum(_ceil_tenth(deadline_h - post_bottleneck_s / 3600), 0.0)
+    return (
+        np.round(np.broadcast_to(processing_h, demand.shape), 2),
+        np.round(due_h, 2),
+        np.round(np.broadcast_to(post_bottleneck_s / 3600, demand.shape), 2),
+    )
@@ -0,0 +1,322 @@
+"""
+Reparo incremental de uma sequência em máquina única.
+
+Quando poucos jobs entram ou saem de um sequenciamento já calculado, em vez
+de resolver o modelo inteiro novamente:
+
+1. remove os jobs que saíram;
+2. insere cada job novo na posição de menor custo (best insertion);
+3. reotimiza apenas uma janela limitada de posições ao redor de cada
+   alteração (trocas e realocações dentro da janela).
+
+O custo é o atraso ponderado, como em `algorithm.heuristics.sequence_cost`.
+A sequência parte dos términos já conhecidos (início salvo do run, ou sem
+ociosidade) e cada alteração só desloca o sufixo em bloco, mantendo as
+folgas entre jobs. O custo de um deslocamento do sufixo é calculado sem
+reavaliar job a job:
+
+- na inserção, jobs atrasados em qualquer deslocamento possível contribuem
+  linearmente (soma de pesos do sufixo) e jobs adiantados em qualquer
+  deslocamento não contribuem; só os jobs perto do prazo (atraso dentro da
+  faixa de deslocamentos) são avaliados por posição;
+- na janela, o sufixo após a janela é ordenado uma vez por atraso e cada
+  movimento custa O(janela + log n).
+
+Os setups vêm de uma função `setup(origens, destinos)` (índices de jobs,
+elemento a elemento), então só os pares necessários são consultados: a
+linha e a coluna de cada job inserido e os pares da janela. Todas as
+funções trabalham apenas com listas/arrays (sem banco de dados).
+"""
+import time
+from typing import Callable, Optional, Union
+
+import numpy as np
+
+SetupLookup = Callable[[np.ndarray, np.ndarray], np.ndarray]
+
+# Tamanho máximo (elementos) dos blocos posições x jobs perto do prazo na inserção
+INSERTION_BLOCK = 1_000_000
+
+
+def matrix_setup(setup_time) -> SetupLookup:
+    """`SetupLookup` de uma matriz densa job x job."""
+    s = np.asarray(setup_time, dtype=float)
+    return lambda from_jobs, to_jobs: s[from_jobs, to_jobs]
+
+
+def completion_times(sequence, processing_time, setup_time) -> np.ndarray:
+    """Término de cada posição da sequência, sem ociosidade entre jobs."""
+    seq = np.asarray(sequence, dtype=np.intp)
+    if len(seq) == 0:
+        return np.zeros(0)
+    durations = processing_time[seq].copy()
+    durations[1:] += setup_time[seq[:-1], seq[1:]]
+    return np.cumsum(durations)
+
+
+class _ShiftCost:
+    """
+    Variação do atraso ponderado de um conjunto de jobs quando todos são
+    deslocados de `delta` horas. Atrasos ordenados uma vez; cada consulta
+    custa O(log n).
+    """
+
+    def __init__(self, lateness: np.ndarray, weights: np.ndarray):
+        order = np.argsort(-lateness)
+        self.negated = -lateness[order]  # crescente
+        self.cum_w = np.cumsum(weights[order])
+        self.cum_wt = np.cumsum(weights[order] * lateness[order])
+        self.base = self._total(0.0)
+
+    def _total(self, delta: float) -> float:
+        # Jobs com atraso + delta > 0
+        count = int(np.searchsorted(self.negated, delta, side="left"))
+        if count == 0:
+            return 0.0
+        return float(self.cum_wt[count - 1] + delta * self.cum_w[count - 1])
+
+    def __call__(self, delta: float) -> float:
+        return self._total(delta) - self.base
+
+
+class _Schedule:
+    """
+    Sequência com o término e o setup de entrada (do job anterior) de cada
+    posição. Remoções e inserções deslocam o sufixo em bloco.
+    """
+
+    def __init__(self, seq, completion, setup_in, p, d, w, setup: SetupLookup):
+        self.seq = np.asarray(seq, dtype=np.intp)
+        self.completion = np.asarray(completion, dtype=float)
+        self.setup_in = np.asarray(setup_in, dtype=float)
+        self.p, self.d, self.w, self.setup = p, d, w, setup
+
+    def __len__(self):
+        return len(self.seq)
+
+    def _pair(self, a: int, b: int) -> float:
+        return float(self.setup(np.array([a]), np.array([b]))[0])
+
+    def origin(self) -> float:
+        """Início do primeiro job (ponto de partida de uma inserção na posição 0)."""
+        if not len(self.seq):
+            return 0.0
+        return float(self.completion[0] - self.p[self.seq[0]] - self.setup_in[0])
+
+    def cost(self) -> float:
+        return float(np.sum(self.w[self.seq] * np.maximum(self.completion - self.d[self.seq], 0.0)))
+
+    def remove(self, job: int) -> int:
+        """Remove `job` e retorna a posição que ele ocupava."""
+        pos = int(np.flatnonzero(self.seq == job)[0])
+        if pos + 1 < len(self.seq):
+            new_in = self._pair(self.seq[pos - 1], self.seq[pos + 1]) if pos > 0 else 0.0
+            shift = new_in - self.setup_in[pos] - self.p[job] - self.setup_in[pos + 1]
+            self.completion[pos + 1:] += shift
+            self.setup_in[pos + 1] = new_in
+        self.seq = np.delete(self.seq, pos)
+        self.completion = np.delete(self.completion, pos)
+        self.setup_in = np.delete(self.setup_in, pos)
+        return pos
+
+    def best_insertion(self, job: int) -> tuple[int, float, dict]:
+        """
+        Posição de menor aumento de custo para inserir `job`. Inserir na
+        posição k desloca o sufixo k.. de shift[k]; o custo desse
+        deslocamento é separado em parte linear (jobs atrasados em qualquer
+        deslocamento), zero (adiantados em qualquer deslocamento) e os jobs
+        perto do prazo, avaliados por posição.
+        """
+        p, d, w = self.p, self.d, self.w
+        n = len(self.seq)
+        if n == 0:
+            job_completion = self.origin() + p[job]
+            return 0, float(w[job] * max(job_completion - d[job], 0.0)), {
+                "completion": job_completion, "setup_in": 0.0, "setup_out": 0.0, "shift": 0.0,
+            }
+
+        prefix_end = np.concatenate(([self.origin()], self.completion))  # término da posição k-1
+        setup_in = np.concatenate(([0.0], self.setup(self.seq, np.full(n, job))))  # anterior -> job
+        setup_out = np.concatenate((self.setup(np.full(n, job), self.seq), [0.0]))  # job -> próximo
+        replaced = np.concatenate((self.setup_in, [0.0]))  # setup de entrada do próximo que deixa de existir
+
+        job_completion = prefix_end + setup_in + p[job]
+        shift = job_completion + setup_out - prefix_end - replaced
+
+        lateness = self.completion - d[self.seq]
+        weights = w[self.seq]
+        low, high = float(shift[:n].min()), float(shift[:n].max())
+        linear = lateness >= max(0.0, -low)
+        near = ~linear & (lateness > min(0.0, -high))
+
+        # Soma dos pesos dos jobs sempre atrasados do sufixo k..
+        linear_weight = np.concatenate((np.cumsum(np.where(linear, weights, 0.0)[::-1])[::-1], [0.0]))
+        suffix_delta = linear_weight * shift
+
+        near_positions = np.flatnonzero(near)
+        positions = np.arange(n + 1)[:, None]
+        block = max(1, INSERTION_BLOCK // (n + 1))
+        for start in range(0, len(near_positions), block):
+            cols = near_positions[start:start + block]
+            t = lateness[cols]
+            delta = weights[cols] * (np.maximum(t + shift[:, None], 0.0) - np.maximum(t, 0.0))
+            suffix_delta += np.where(positions <= cols[None, :], delta, 0.0).sum(axis=1)
+
+        total = w[job] * np.maximum(job_completion - d[job], 0.0) + suffix_delta
+        position = int(np.argmin(total))
+        return position, float(total[position]), {
+            "completion": float(job_completion[position]),
+            "setup_in": float(setup_in[position]),
+            "setup_out": float(setup_out[position]),
+            "shift": float(shift[position]),
+        }
+
+    def insert(self, job: int) -> tuple[int, float]:
+        position, delta, move = self.best_insertion(job)
+        self.completion[position:] += move["shift"]
+        if position < len(self.seq):
+            self.setup_in[position] = move["setup_out"]
+        self.seq = np.insert(self.seq, position, job)
+        self.completion = np.insert(self.completion, position, move["completion"])
+        self.setup_in = np.insert(self.setup_in, position, move["setup_in"])
+        return position, delta
+
+    def window_search(self, center: int, window: int, max_passes: int = 5) -> int:
+        """
+        Busca local (realocação e troca, primeira melhoria) restrita às
+        posições [center - window, center + window]. Cada movimento reavalia
+        só a janela; o efeito no restante é o custo do deslocamento em bloco
+        do sufixo (`_ShiftCost`). Retorna o número de movimentos avaliados.
+        """
+        p, d, w = self.p, self.d, self.w
+        n = len(self.seq)
+        lo, hi = max(center - window, 0), min(center + window + 1, n)
+        if hi - lo < 2:
+            return 0
+
+        jobs = self.seq[lo:hi].copy()
+        m = len(jobs)
+        start = float(self.completion[lo - 1]) if lo > 0 else self.origin()
+        setups = self.setup(np.repeat(jobs, m), np.tile(jobs, m)).reshape(m, m)
+        from_prev = self.setup(np.full(m, self.seq[lo - 1]), jobs) if lo > 0 else np.zeros(m)
+        has_next = hi < n
+        to_next = self.setup(jobs, np.full(m, self.seq[hi])) if has_next else np.zeros(m)
+        # Término da janela + setup para o próximo job, antes de qualquer movimento
+        old_end = float(self.completion[hi - 1]) + (float(self.setup_in[hi]) if has_next else 0.0)
+        suffix_cost = _ShiftCost(self.completion[hi:] - d[self.seq[hi:]], w[self.seq[hi:]])
+
+        def evaluate(order):
+            setup_in = np.concatenate(([from_prev[order[0]]], setups[order[:-1], order[1:]]))
+            completion = start + np.cumsum(p[jobs[order]] + setup_in)
+            cost = float(np.sum(w[jobs[order]] * np.maximum(completion - d[jobs[order]], 0.0)))
+            shift = float(completion[-1]) + float(to_next[order[-1]]) - old_end
+            return cost + suffix_cost(shift), completion, setup_in, shift
+
+        order = np.arange(m)
+        best, best_completion, best_setup_in, best_shift = evaluate(order)
+        changed = False
+        evaluations = 0
+
+        for _ in range(max_passes):
+            improved = False
+            for a in range(m):
+                for b in range(m):
+                    if a == b:
+                        continue
+                    candidate = order.copy()
+                    if b > a:
+                        candidate[a], candidate[b] = candidate[b], candidate[a]
+                    else:
+                        # Realocação: move o job da posição a para a posição b
+                        candidate[b:a + 1] = np.concatenate(([order[a]], order[b:a]))
+                    cost, completion, setup_in, shift = evaluate(candidate)
+                    evaluations += 1
+                    if cost < best - 1e-9:
+                        order, best = candidate, cost
+                        best_completion, best_setup_in, best_shift = completion, setup_in, shift
+                        improved = changed = True
+            if not improved:
+                break
+
+        if changed:
+            self.seq[lo:hi] = jobs[order]
+            self.completion[lo:hi] = best_completion
+            self.setup_in[lo:hi] = best_setup_in
+            if has_next:
+                self.setup_in[hi] = to_next[order[-1]]
+                self.completion[hi:] += best_shift
+        return evaluations
+
+
+def repair_sequence(
+    sequence: list[int],
+    added: list[int],
+    removed: list[int],
+    processing_time,
+    due_time,
+    weight,
+    setup: Union[SetupLookup, list, np.ndarray],
+    window: int = 4,
+    start: Optional[list[float]] = None,
+    setup_in: Optional[list[float]] = None,
+) -> dict:
+    """
+    Aplica a alteração (jobs removidos e adicionados, por índice) a uma
+    sequência existente. Jobs novos são inseridos por ordem de prazo.
+
+    `setup` é uma matriz job x job ou um `SetupLookup`. Com `start` e
+    `setup_in` (início e setup de entrada de cada posição de `sequence`,
+    ex.: do run salvo), parte desses tempos; senão, de uma sequência sem
+    ociosidade a partir de 0. Retorna a nova sequência com início e setup
+    de entrada de cada posição.
+    """
+    t0 = time.perf_counter()
+    p, d, w = (np.asarray(values, dtype=float) for values in (processing_time, due_time, weight))
+    if not callable(setup):
+        setup = matrix_setup(setup)
+
+    seq = np.asarray(sequence, dtype=np.intp)
+    if setup_in is None:
+        setup_in = np.zeros(len(seq))
+        if len(seq) > 1:
+            setup_in[1:] = setup(seq[:-1], seq[1:])
+    setup_in = np.asarray(setup_in, dtype=float)
+    if start is None:
+        completion = np.cumsum(p[seq] + setup_in)
+    else:
+        completion = np.asarray(start, dtype=float) + p[seq]
+    schedule = _Schedule(seq, completion, setup_in, p, d, w, setup)
+
+    # Posição (na sequência já sem os removidos) do job que ocupa o lugar do removido
+    touched = []
+    for job in removed:
+        pos = schedule.remove(job)
+        touched = [t - 1 if t > pos else t for t in touched]
+        touched.append(pos)
+    initial_objective = schedule.cost()
+
+    insertions = []
+    for job in sorted(added, key=lambda j: d[j]):
+        position, delta = schedule.insert(job)
+        touched = [pos + 1 if pos >= position else pos for pos in touched]
+        touched.append(position)
+        insertions.append({"job": job, "position": position, "delta": round(delta, 4)})
+
+    inserted_objective = schedule.cost()
+
+    evaluations = 0
+    for center in sorted(set(min(pos, len(schedule) - 1) for pos in touched)):
+        evaluations += schedule.window_search(center, window)
+
+    return {
+        "sequence": schedule.seq.tolist(),
+        "start": (schedule.completion - p[schedule.seq]).tolist(),
+        "setup_in": schedule.setup_in.tolist(),
+        "objective": round(schedule.cost(), 4),
+        "objective_after_removal": round(initial_objective, 4),
+        "objective_after_insertion": round(inserted_objective, 4),
+        "insertions": insertions,
+        "window": window,
+        "evaluations": evaluations,
+        "time_s": round(time.perf_counter() - t0, 4),
+    }
@@ -0,0 +1,227 @@
+"""
+Modelos PuLP do sequenciamento em máquina única (rota /sequenciamento/solve).
+
+Formulações disponíveis (parâmetro `formulation`):
+
+- "bigm": formulação original. Duas binárias por par, x[i,j] + x[j,i] == 1,
+  e disjunção com M fixo (10000).
+- "precedence": uma binária por par não ordenado (i < j), sem restrição de
+  igualdade, com horizonte limitado e M calculado por par a partir dos
+  tempos de processamento e setup. A relaxação linear fica bem mais justa.
+
+Estado inicial da máquina (usado no horizonte rolante): `release_time` é o
+instante em que a máquina fica livre e `initial_setup[i]` o setup do job que
+está na máquina para o job i. Juntos definem o início mais cedo de cada job.
+"""
+import time
+from dataclasses import dataclass, replace
+from typing import Optional
+
+from algorithm.heuristics import build_initial_sequence
+from algorithm.solver_backends import SolverOptions, solve_model
+from pulp import LpMinimize, LpProblem, LpVariable, lpSum, LpBinary, value
+
+FORMULATIONS = ("bigm", "precedence")
+BIG_M = 10000
+
+
+@dataclass
+class SequencingModel:
+    model: LpProblem
+    start: dict
+    early: dict
+    tardy: dict
+    precedence: dict  # (i, j) -> binária que vale 1 quando i vem antes de j
+    formulation: str
+    build_time: float
+
+    def stats(self) -> dict:
+        variables = self.model.variables()
+        return {
+            "formulation": self.formulation,
+            "build_time_s": round(self.build_time, 4),
+            "variables": len(variables),
+            "binaries": sum(1 for v in variables if v.cat == "Integer"),
+            "constraints": len(self.model.constraints),
+        }
+
+
+def scheduling_horizon(processing_time, setup_time) -> float:
+    """
+    Limite superior do makespan de qualquer sequência sem ociosidade:
+    soma dos processamentos + maior setup de saída de cada job.
+    """
+    n = len(processing_time)
+    max_setup_out = [
+        max((setup_time[i][j] for j in range(n) if j != i), default=0)
+        for i in range(n)
+    ]
+    return float(sum(processing_time) + sum(max_setup_out))
+
+
+def earliest_starts(n: int, release_time: float = 0.0, initial_setup=None) -> list[float]:
+    return [release_time + (float(initial_setup[i]) if initial_setup is not None else 0.0) for i in range(n)]
+
+
+def build_sequencing_model(
+    processing_time: list[float],
+    due_time: list[float],
+    weight: list[float],
+    setup_time,
+    formulation: str = "bigm",
+    release_time: float = 0.0,
+    initial_setup=None,
+) -> SequencingModel:
+    if formulation not in FORMULATIONS:
+        raise ValueError(f"Formulação desconhecida: {formulation}")
+
+    t0 = time.perf_counter()
+    jobs = list(range(len(processing_time)))
+    setup_time = [[float(s) for s in row] for row in setup_time]
+    model = LpProblem("Sequenciamento_Produção", LpMinimize)
+    earliest = earliest_starts(len(jobs), release_time, initial_setup)
+
+    if formulation == "bigm":
+        start = {i: LpVariable(f"inicio_{i}", lowBound=earliest[i]) for i in jobs}
+    else:
+        horizon = max(earliest, default=0.0) + scheduling_horizon(processing_time, setup_time)
+        start = {
+            i: LpVariable(f"inicio_{i}", lowBound=earliest[i], upBound=horizon - processing_time[i])
+            for i in jobs
+        }
+    early = LpVariable.dicts("antecipacao", jobs, lowBound=0)
+    tardy = LpVariable.dicts("atraso", jobs, lowBound=0)
+
+    model += lpSum(weight[i] * tardy[i] for i in jobs)
+
+    if formulation == "bigm":
+        x = LpVariable.dicts("setup", [(i, j) for i in jobs for j in jobs if i != j], cat=LpBinary)
+        for i in jobs:
+            for j in jobs:
+                if i != j:
+                    model += start[j] - start[i] - (BIG_M + setup_time[i][j]) * x[(i, j)] >= processing_time[i] - BIG_M
+                    if i < j:
+                        model += x[(i, j)] + x[(j, i)] == 1
+    else:
+        # precede[i,j] = 1 se i vem antes de j (apenas i < j)
+        precede = LpVariable.dicts("precede", [(i, j) for i in jobs for j in jobs if i < j], cat=LpBinary)
+        for i in jobs:
+            for j in jobs:
+                if i < j:
+                    # M_ij = maior início de i + p_i + s_ij - menor início de j
+                    m_ij = horizon + setup_time[i][j] - earliest[j]
+                    m_ji = horizon + setup_time[j][i] - earliest[i]
+                    model += start[j] >= start[i] + processing_time[i] + setup_time[i][j] - m_ij * (1 - precede[(i, j)])
+                    model += start[i] >= start[j] + processing_time[j] + setup_time[j][i] - m_ji * precede[(i, j)]
+
+    for i in jobs:
+        model += start[i] + processing_time[i] - tardy[i] + early[i] == due_time[i]
+
+    return SequencingModel(
+        model=model,
+        start=start,
+        early=early,
+        tardy=tardy,
+        precedence=x if formulation == "bigm" else precede,
+        formulation=formulation,
+        build_time=time.perf_counter() - t0,
+    )
+
+
+def set_initial_solution(
+    seq_model: SequencingModel,
+    sequence: list[int],
+    processing_time: list[float],
+    due_time: list[float],
+    setup_time,
+    release_time: float = 0.0,
+    initial_setup=None,
+) -> float:
+    """
+    Carrega uma sequência como solução inicial (MIP start) do modelo.
+
+    As restrições disjuntivas valem para todos os pares (não só os
+    consecutivos), então o início de cada job é o máximo entre o término
+    de cada antecessor somado ao setup correspondente. Retorna o objetivo
+    da solução injetada.
+    """
+    position = {job: pos for pos, job in enumerate(sequence)}
+    earliest = earliest_starts(len(processing_time), release_time, initial_setup)
+    start_values = {}
+    for pos, j in enumerate(sequence):
+        start_values[j] = max(
+            [earliest[j]]
+            + [start_values[i] + processing_time[i] + float(setup_time[i][j]) for i in sequence[:pos]]
+        )
+
+    for j, start_value in start_values.items():
+        completion = start_value + processing_time[j]
+        seq_model.start[j].setInitialValue(start_value)
+        seq_model.tardy[j].setInitialValue(max(completion - due_time[j], 0.0))
+        seq_model.early[j].setInitialValue(max(due_time[j] - completion, 0.0))
+
+    for (i, j), var in seq_model.precedence.items():
+        var.setInitialValue(1 if position[i] < position[j] else 0)
+
+    return value(seq_model.model.objective)
+
+
+def solve_sequencing_model(seq_model: SequencingModel, options: Optional[SolverOptions] = None) -> dict:
+    """
+    Resolve o modelo com o backend de `options` (CBC por padrão, ver
+    algorithm/solver_backends.py) e retorna estatísticas da execução. Com
+    `options.warm_start`, os valores iniciais das variáveis (ver
+    `set_initial_solution`) são enviados ao solver como MIP start.
+    """
+    return solve_model(seq_model.model, options or SolverOptions())
+
+
+def solve_sequencing_problem(
+    processing_time: list[float],
+    due_time: list[float],
+    weight: list[float],
+    setup_time,
+    formulation: str = "bigm",
+    warm_start: bool = True,
+    options: Optional[SolverOptions] = None,
+    release_time: float = 0.0,
+    initial_setup=None,
+) -> dict:
+    """
+    Pipeline completo do sequenciamento sobre dados simples (listas/dicts):
+    solução inicial opcional, construção e solução do modelo e extração dos
+    valores. Entradas e saída são picklable e não dependem do banco, então
+    pode rodar tanto em thread quanto em processo separado
+    (ver app/utils/task_queue.py).
+    """
+    seq_model = build_sequencing_model(
+        processing_time, due_time, weight, setup_time, formulation=formulation,
+        release_time=release_time, initial_setup=initial_setup,
+    )
+
+    heuristic = None
+    if warm_start:
+        # Solução inicial ATCS + busca local, enviada ao CBC como MIP start.
+        # As heurísticas começam em t = 0, então os prazos são deslocados de release_time.
+        heuristic = build_initial_sequence(
+            processing_time, [d - release_time for d in due_time], weight, setup_time,
+            initial_setup=initial_setup,
+        )
+        heuristic["mip_start_objective"] = set_initial_solution(
+            seq_model, heuristic.pop("sequence"), processing_time, due_time, setup_time,
+            release_time=release_time, initial_setup=initial_setup,
+        )
+
+    options = replace(options or SolverOptions(), warm_start=warm_start)
+    report = solve_sequencing_model(seq_model, options)
+
+    jobs = range(len(processing_time))
+    start = [value(seq_model.start[i]) for i in jobs]
+    return {
+        "order": sorted(jobs, key=lambda i: start[i]),
+        "start": start,
+        "tardy": [value(seq_model.tardy[i]) for i in jobs],
+        "objective_value": value(seq_model.model.objective),
+        "model": {**seq_model.stats(), **report, "threads": options.threads},
+        "heuristic": heuristic,
+    }
@@ -0,0 +1,304 @@
+"""
+Camada de seleção do solver MIP usado pelos modelos PuLP.
+
+Backends disponíveis (parâmetro `backend` ou variável SOLVER_BACKEND):
+
+- "cbc": PULP_CBC_CMD (binário do CBC que acompanha o PuLP);
+- "highs": HiGHS via highspy (API em memória do PuLP, sem arquivos .mps).
+
+As opções comuns (tempo limite, threads, gap relativo, presolve e MIP
+start) ficam em `SolverOptions`, que é picklable e pode ser enviada para
+o pool de processos junto com os dados do modelo.
+
+Parada antecipada: com `SolverOptions.log_dir`, `request_stop(log_dir)`
+(de qualquer processo) cria o arquivo STOP no diretório. O CBC recebe
+SIGINT e o HiGHS é interrompido pelo callback de MIP; nos dois casos o
+solve termina com a melhor solução encontrada até ali.
+
+Gap: sempre `relative_gap` (relativo ao incumbente), para os dois
+backends e para o progresso; o "Gap:" do resumo do CBC é relativo ao
+limitante e não é usado.
+"""
+import math
+import os
+import re
+import shlex
+import shutil
+import signal
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+import psutil
+from pulp import HiGHS, LpProblem, LpSolution, LpStatus, PULP_CBC_CMD, constants, value
+
+BACKENDS = ("cbc", "highs")
+DEFAULT_BACKEND = os.getenv("SOLVER_BACKEND", "cbc")
+
+
+@dataclass
+class SolverOptions:
+    backend: str = DEFAULT_BACKEND
+    time_limit: float = 3600
+    threads: int = 1
+    gap_rel: Optional[float] = None
+    presolve: bool = True
+    warm_start: bool = False
+    # Diretório do solve em andamento: logs acompanhados (algorithm/solver_progress.py),
+    # arquivos temporários do CBC e o arquivo STOP de parada antecipada
+    log_dir: Optional[str] = None
+
+    def __post_init__(self):
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Backend desconhecido: {self.backend}")
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+STOP_FILE = "STOP"
+STOP_POLL_INTERVAL = 0.5
+
+
+def request_stop(log_dir: str):
+    """Pede a parada antecipada do solve que usa `log_dir`."""
+    open(os.path.join(log_dir, STOP_FILE), "w").close()
+
+
+def stop_requested(options: SolverOptions) -> bool:
+    return options.log_dir is not None and os.path.exists(os.path.join(options.log_dir, STOP_FILE))
+
+
+class _CbcStopWatcher(threading.Thread):
+    """
+    Envia SIGINT ao CBC deste solve quando o arquivo STOP aparece. O processo
+    do CBC é identificado pelo `log_dir` na linha de comando (tmpDir do PuLP),
+    já que vários solves podem rodar no mesmo processo.
+    """
+
+    def __init__(self, options: SolverOptions):
+        super().__init__(name="cbc-stop", daemon=True)
+        self.options = options
+        self.finished = threading.Event()
+
+    def _cbc_processes(self):
+        for child in psutil.Process().children(recursive=True):
+            try:
+                if any(self.options.log_dir in arg for arg in child.cmdline()):
+                    yield child
+            except psutil.Error:
+                continue
+
+    def run(self):
+        while not self.finished.wait(STOP_POLL_INTERVAL):
+            if not stop_requested(self.options):
+                continue
+            for process in self._cbc_processes():
+                try:
+                    process.send_signal(signal.SIGINT)
+                except psutil.Error:
+                    pass
+            return
+
+
+class _HiGHS(HiGHS):
+    """
+    HiGHS do PuLP com MIP start (valores iniciais das variáveis) e parada
+    antecipada pelo arquivo STOP de `log_dir`.
+    """
+
+    def __init__(self, warm_start: bool = False, options: Optional[SolverOptions] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.warm_start = warm_start
+        self.options = options
+
+    def callSolver(self, lp):
+        import highspy
+
+        variables = lp.variables()
+        if self.warm_start and all(var.varValue is not None for var in variables):
+            solution = highspy.HighsSolution()
+            solution.col_value = [float(var.varValue) for var in sorted(variables, key=lambda v: v.index)]
+            solution.value_valid = True
+            lp.solverModel.setSolution(solution)
+
+        if self.options is not None and self.options.log_dir is not None:
+            last_check = [0.0]
+
+            def interrupt(callback_type, message, data_out, data_in, user_data):
+                now = time.monotonic()
+                if now - last_check[0] >= STOP_POLL_INTERVAL:
+                    last_check[0] = now
+                    data_in.user_interrupt = stop_requested(self.options)
+
+            lp.solverModel.setCallback(interrupt, None)
+            lp.solverModel.startCallback(highspy.cb.HighsCallbackType.kCallbackMipInterrupt)
+        super().callSolver(lp)
+
+    def findSolutionValues(self, lp):
+        import highspy
+
+        if lp.solverModel.getModelStatus() != highspy.HighsModelStatus.kInterrupt:
+            return super().findSolutionValues(lp)
+        # O PuLP não mapeia kInterrupt (levanta KeyError depois de atribuir os
+        # valores das variáveis); tratado como o limite de tempo
+        try:
+            return super().findSolutionValues(lp)
+        except KeyError:
+            info = lp.solverModel.getInfo()
+            if info.primal_solution_status == highspy.SolutionStatus.kSolutionStatusFeasible:
+                return constants.LpStatusOptimal, constants.LpSolutionIntegerFeasible
+            return constants.LpStatusNotSolved, constants.LpSolutionNoSolutionFound
+
+
+def relative_gap(incumbent: Optional[float], best_bound: Optional[float]) -> Optional[float]:
+    """
+    Gap relativo ao incumbente, |incumbente - limitante| / |incumbente|
+    (a mesma definição do mip_gap do HiGHS). None sem incumbente ou
+    limitante finitos.
+    """
+    if incumbent is None or best_bound is None or not (math.isfinite(incumbent) and math.isfinite(best_bound)):
+        return None
+    return abs(incumbent - best_bound) / max(abs(incumbent), 1e-10)
+
+
+_CBC_SUMMARY_PATTERNS = {
+    "result": re.compile(r"^Result - (.+)$", re.MULTILINE),
+    "best_bound": re.compile(r"^Lower bound:\s+(\S+)", re.MULTILINE),
+    "nodes": re.compile(r"^Enumerated nodes:\s+(\d+)", re.MULTILINE),
+}
+
+
+def parse_cbc_summary(log_text: str) -> dict:
+    """Extrai do log do CBC o resultado final, o limitante inferior e o número de nós."""
+    summary = {}
+    for key, pattern in _CBC_SUMMARY_PATTERNS.items():
+        match = pattern.search(log_text)
+        if not match:
+            continue
+        raw = match.group(1).strip()
+        if key == "result":
+            # O CBC imprime "User ctrl-cuser ctrl-c" quando recebe SIGINT
+            summary[key] = raw.replace("User ctrl-cuser ctrl-c", "User ctrl-c")
+        elif key == "nodes":
+            summary[key] = int(raw)
+        else:
+            try:
+                summary[key] = float(raw)
+            except ValueError:
+                pass
+    return summary
+
+
+def _line_buffered_cbc(cbc_path: str, log_dir: str) -> Optional[str]:
+    """
+    Script em `log_dir` que executa o CBC sob `stdbuf -oL`. Com a saída
+    redirecionada para o arquivo de log (`logPath`), o CBC grava em blocos e
+    o log só aparece no fim do solve; com buffer por linha, o acompanhamento
+    de progresso lê cada linha assim que é escrita. None se não há `stdbuf`
+    (Windows, macOS sem coreutils): o CBC roda direto.
+    """
+    stdbuf = shutil.which("stdbuf")
+    if stdbuf is None or os.name == "nt":
+        return None
+    wrapper = os.path.join(log_dir, "cbc_line_buffered.sh")
+    if not os.path.exists(wrapper):
+        with open(wrapper, "w") as f:
+            f.write(f'#!/bin/sh\nexec {shlex.quote(stdbuf)} -oL -eL {shlex.quote(cbc_path)} "$@"\n')
+        os.chmod(wrapper, 0o755)
+    return wrapper
+
+
+def make_solver(options: SolverOptions, log_path: str):
+    """Instancia o solver PuLP do backend escolhido, gravando o log em `log_path`."""
+    if options.backend == "highs":
+        return _HiGHS(
+            warm_start=options.warm_start,
+            options=options,
+            msg=True,
+            timeLimit=options.time_limit,
+            threads=options.threads,
+            gapRel=options.gap_rel,
+            presolve="on" if options.presolve else "off",
+            log_to_console=False,
+            log_file=log_path,
+        )
+    solver = PULP_CBC_CMD(
+        msg=False,
+        timeLimit=options.time_limit,
+        threads=options.threads,
+        gapRel=options.gap_rel,
+        presolve=None if options.presolve else False,
+        warmStart=options.warm_start,
+        logPath=log_path,
+    )
+    if options.log_dir is not None:
+        # Arquivos .mps/.sol no diretório do solve: identifica o processo do CBC
+        solver.tmpDir = options.log_dir
+        line_buffered = _line_buffered_cbc(solver.path, options.log_dir)
+        if line_buffered is not None:
+            solver.path = line_buffered
+    return solver
+
+
+def _highs_summary(model: LpProblem) -> dict:
+    info = model.solverModel.getInfo()
+    status = model.solverModel.modelStatusToString(model.solverModel.getModelStatus())
+    return {
+        "result": status,
+        "best_bound": info.mip_dual_bound,
+        "nodes": info.mip_node_count,
+    }
+
+
+def solve_model(model: LpProblem, options: SolverOptions, echo_log: bool = True) -> dict:
+    """
+    Resolve `model` com o backend de `options` e retorna estatísticas da
+    execução (status, objetivo, limitante, gap, nós e tempo de solução).
+    Com `options.log_dir`, o log fica nesse diretório (quem criou o
+    diretório remove os arquivos).
+    """
+    fd, log_path = tempfile.mkstemp(prefix=f"{options.backend}_", suffix=".log", dir=options.log_dir)
+    os.close(fd)
+    watcher = None
+    if options.backend == "cbc" and options.log_dir is not None:
+        watcher = _CbcStopWatcher(options)
+        watcher.start()
+    try:
+        solver = make_solver(options, log_path)
+        t0 = time.perf_counter()
+        model.solve(solver)
+        solve_time = time.perf_counter() - t0
+        with open(log_path, encoding="utf-8", errors="replace") as f:
+            log_text = f.read()
+    finally:
+        if watcher is not None:
+            watcher.finished.set()
+        if options.log_dir is None:
+            os.remove(log_path)
+
+    if echo_log:
+        print(log_text)
+    summary = _highs_summary(model) if options.backend == "highs" else parse_cbc_summary(log_text)
+    objective = value(model.objective)
+    best_bound = summary.get("best_bound")
+    if best_bound is not None and not math.isfinite(best_bound):
+        best_bound = None
+    gap = relative_gap(objective, best_bound)
+    if gap is None and summary.get("result", "").startswith("Optimal"):
+        gap = 0.0
+
+    return {
+        "backend": options.backend,
+        "status": LpStatus[model.status],
+        "solution_status": LpSolution[model.sol_status],
+        "result": summary.get("result"),
+        "objective_value": objective,
+        "best_bound": best_bound if best_bound is not None else (objective if gap == 0.0 else None),
+        "gap": gap,
+        "nodes": summary.get("nodes"),
+        "solve_time_s": round(solve_time, 4),
+        "stopped": stop_requested(options),
+    }
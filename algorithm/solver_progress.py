@@ -0,0 +1,301 @@
+"""
+Progresso do solver MIP durante a execução, a partir do log.
+
+O solve roda em outro processo (pool de `app/utils/task_queue.py`), então o
+acompanhamento é feito pelo arquivo de log: `track_solver_progress` cria um
+diretório, passa-o ao solver em `SolverOptions.log_dir` e uma thread do
+processo chamador lê as linhas novas de cada log enquanto o solve roda,
+chamando `on_progress` com:
+
+    {"backend", "elapsed_s", "incumbent", "best_bound", "gap", "nodes"}
+
+`elapsed_s` é o tempo de relógio desde o início do acompanhamento. No
+horizonte rolante cada janela gera um log novo, e incumbente/limitante
+passam a ser os da janela corrente.
+
+O HiGHS grava o log linha a linha. O CBC é executado sob `stdbuf -oL`
+(`algorithm.solver_backends.make_solver`) para também gravar linha a linha;
+sem `stdbuf` (Windows), a saída do CBC fica em buffer e o progresso só
+chega no fim do solve.
+"""
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import replace
+from typing import Callable, Optional
+
+from algorithm.metaheuristic import ImprovementLog
+from algorithm.solver_backends import SolverOptions, relative_gap
+
+PROGRESS_INTERVAL = 1.0
+
+# Valores usados pelo CBC/HiGHS quando ainda não há incumbente ou limitante
+_INFINITE = 1e40
+
+_CBC_PATTERNS = [
+    # Cbc0010I After 1000 nodes, 17 on tree, 99.7 best solution, best possible 14.02 (4.28 seconds)
+    (
+        re.compile(r"After (\d+) nodes, \d+ on tree, (\S+) best solution, best possible (\S+) \(([\d.]+) seconds\)"),
+        ("nodes", "incumbent", "best_bound", "solver_time_s"),
+    ),
+    # Cbc0012I/Cbc0004I Integer solution of 99.7 found [by x] after 20069 iterations and 259 nodes (1.81 seconds)
+    (
+        re.compile(r"Integer solution of (\S+) found .*?and (\d+) nodes \(([\d.]+) seconds\)"),
+        ("incumbent", "nodes", "solver_time_s"),
+    ),
+    # Cbc0038I Mini branch and bound improved solution from 204.1 to 201.8 (0.08 seconds)
+    (
+        re.compile(r"improved solution from \S+ to (\S+) \(([\d.]+) seconds\)"),
+        ("incumbent", "solver_time_s"),
+    ),
+    # Cbc0045I MIPStart provided solution with cost 101.9
+    (
+        re.compile(r"(?:MIPStart|MIP start) provided solution with cost (\S+)"),
+        ("incumbent",),
+    ),
+    # Cbc0005I Partial search - best objective 99.7 (best possible 14.02), took 80118 iterations and 1276 nodes (6.00 seconds)
+    (
+        re.compile(r"- best objective (\S+) \(best possible (\S+)\), took \d+ iterations and (\d+) nodes \(([\d.]+) seconds\)"),
+        ("incumbent", "best_bound", "nodes", "solver_time_s"),
+    ),
+    # Cbc0001I Search completed - best objective 99.7, took 80118 iterations and 1276 nodes (6.00 seconds)
+    (
+        re.compile(r"Search completed - best objective (\S+), took \d+ iterations and (\d+) nodes \(([\d.]+) seconds\)"),
+        ("incumbent", "nodes", "solver_time_s"),
+    ),
+]
+
+# Linha da tabela de branch and bound do HiGHS:
+#  Src  Proc. InQueue |  Leaves   Expl. | BestBound  BestSol  Gap |  Cuts  InLp Confl. | LpIters  Time
+_HIGHS_ROW = re.compile(
+    r"^\s*[A-Za-z]?\s+(\d+)\s+\d+\s+\d+\s+[\d.]+%\s+(\S+)\s+(\S+)\s+(\S+)\s+\d+\s+\d+\s+\d+\s+\d+\s+([\d.]+)s\s*$"
+)
+
+
+def _number(raw: str) -> Optional[float]:
+    try:
+        number = float(raw.rstrip("%"))
+    except ValueError:
+        return None  # "inf", "Large", ...
+    if abs(number) >= _INFINITE:
+        return None
+    return number
+
+
+def parse_progress_line(backend: str, line: str) -> Optional[dict]:
+    """
+    Extrai de uma linha de log do `backend` os campos de progresso presentes
+    (`incumbent`, `best_bound`, `gap`, `nodes`, `solver_time_s`), ou None se
+    a linha não informa progresso.
+    """
+    if backend == "highs":
+        match = _HIGHS_ROW.match(line)
+        if not match:
+            return None
+        nodes, best_bound, incumbent, gap = match.groups()[:4]
+        gap = _number(gap)
+        return {
+            "nodes": int(nodes),
+            "best_bound": _number(best_bound),
+            "incumbent": _number(incumbent),
+            "gap": gap / 100 if gap is not None else None,
+            "solver_time_s": float(match.group(5)),
+        }
+
+    for pattern, fields in _CBC_PATTERNS:
+        match = pattern.search(line)
+        if not match:
+            continue
+        progress = {}
+        for field, raw in zip(fields, match.groups()):
+            progress[field] = int(raw) if field == "nodes" else _number(raw)
+        return progress
+    return None
+
+
+class SolverProgressTailer(threading.Thread):
+    """
+    Lê os logs gravados em `log_dir` (um arquivo por solve, na ordem de
+    criação) e chama `on_progress` no máximo a cada `interval` segundos,
+    quando o estado muda.
+    """
+
+    def __init__(self, log_dir: str, backend: str, on_progress: Callable[[dict], None], interval: float = PROGRESS_INTERVAL):
+        super().__init__(name="solver-progress", daemon=True)
+        self.log_dir = log_dir
+        self.backend = backend
+        self.on_progress = on_progress
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._offsets: dict[str, int] = {}
+        self._partial: dict[str, str] = {}
+        self._current: Optional[str] = None
+        self._t0 = time.perf_counter()
+        self._state = self._empty_state()
+        self._sent = None
+
+    @staticmethod
+    def _empty_state() -> dict:
+        return {"incumbent": None, "best_bound": None, "gap": None, "nodes": None}
+
+    def _log_files(self) -> list[str]:
+        """Arquivos de log na ordem em que apareceram (um por solve)."""
+        try:
+            entries = sorted(os.scandir(self.log_dir), key=lambda entry: entry.stat().st_mtime)
+        except FileNotFoundError:
+            entries = []
+        for entry in entries:
+            # O diretório também recebe o .mps/.sol do CBC e o arquivo STOP
+            if entry.name.endswith(".log"):
+                self._offsets.setdefault(entry.name, 0)
+        return list(self._offsets)
+
+    def _read_new_lines(self, name: str) -> list[str]:
+        path = os.path.join(self.log_dir, name)
+        try:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                f.seek(self._offsets[name])
+                chunk = f.read()
+                self._offsets[name] = f.tell()
+        except FileNotFoundError:
+            return []
+        text = self._partial.pop(name, "") + chunk
+        lines = text.split("\n")
+        if lines[-1]:
+            self._partial[name] = lines[-1]
+        return lines[:-1]
+
+    def poll(self):
+        """Processa as linhas novas e notifica se o progresso mudou."""
+        for name in self._log_files():
+            lines = self._read_new_lines(name)
+            if not lines:
+                continue
+            if name != self._current:
+                # Novo solve (janela seguinte do horizonte rolante)
+                self._current = name
+                self._state = self._empty_state()
+            for line in lines:
+                progress = parse_progress_line(self.backend, line)
+                if progress:
+                    progress.pop("solver_time_s", None)
+                    self._state.update({key: value for key, value in progress.items() if value is not None})
+                    # Mesma definição do gap final (solve_model), para os dois backends
+                    gap = relative_gap(self._state["incumbent"], self._state["best_bound"])
+                    if gap is not None or self.backend != "highs":
+                        self._state["gap"] = gap
+
+        if self._state != self._sent and any(value is not None for value in self._state.values()):
+            self._sent = dict(self._state)
+            self.on_progress({
+                "backend": self.backend,
+                "elapsed_s": round(time.perf_counter() - self._t0, 3),
+                **{key: round(value, 6) if isinstance(value, float) else value for key, value in self._state.items()},
+            })
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self._safe_poll()
+        self._safe_poll()
+
+    def _safe_poll(self):
+        try:
+            self.poll()
+        except Exception as e:
+            # O acompanhamento nunca interrompe o solve
+            print(f"Falha ao ler o progresso do solver: {e}")
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+@contextmanager
+def track_solver_progress(options: SolverOptions, on_progress: Optional[Callable[[dict], None]]):
+    """
+    Retorna (via `with`) as opções com `log_dir` apontando para um diretório
+    temporário do solve, acompanhado por `SolverProgressTailer` quando há
+    `on_progress`. O diretório também permite a parada antecipada
+    (`algorithm.solver_backends.request_stop`).
+    """
+    log_dir = tempfile.mkdtemp(prefix="solver_progress_")
+    tailer = None
+    if on_progress is not None:
+        tailer = SolverProgressTailer(log_dir, options.backend, on_progress)
+        tailer.start()
+    try:
+        yield replace(options, log_dir=log_dir)
+    finally:
+        if tailer is not None:
+            tailer.stop()
+        shutil.rmtree(log_dir, ignore_errors=True)
+
+
+class ImprovementTailer(threading.Thread):
+    """
+    Lê o arquivo de um `ImprovementLog` e chama `on_improvement(tempo,
+    objetivo)` com a última melhoria, no máximo a cada `interval` segundos.
+    """
+
+    def __init__(self, path: str, on_improvement: Callable[[float, float], None], interval: float = PROGRESS_INTERVAL):
+        super().__init__(name="heuristic-progress", daemon=True)
+        self.path = path
+        self.on_improvement = on_improvement
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._offset = 0
+        self._partial = ""
+
+    def poll(self):
+        try:
+            with open(self.path) as f:
+                f.seek(self._offset)
+                chunk = f.read()
+                self._offset = f.tell()
+        except FileNotFoundError:
+            return
+        lines = (self._partial + chunk).split("\n")
+        self._partial = lines[-1]
+        if len(lines) > 1:
+            elapsed, best = lines[-2].split()
+            self.on_improvement(float(elapsed), float(best))
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self._safe_poll()
+        self._safe_poll()
+
+    def _safe_poll(self):
+        try:
+            self.poll()
+        except Exception as e:
+            print(f"Falha ao ler o progresso da heurística: {e}")
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+@contextmanager
+def track_heuristic_progress(on_improvement: Optional[Callable[[float, float], None]]):
+    """
+    Retorna (via `with`) o callback picklable (`ImprovementLog`) a passar
+    para `solve_injection_heuristic` no pool de processos, acompanhado por
+    `ImprovementTailer` no processo chamador; None sem `on_improvement`.
+    """
+    if on_improvement is None:
+        yield None
+        return
+    log_dir = tempfile.mkdtemp(prefix="heuristic_progress_")
+    path = os.path.join(log_dir, "improvements.log")
+    tailer = ImprovementTailer(path, on_improvement)
+    tailer.start()
+    try:
+        yield ImprovementLog(path)
+    finally:
+        tailer.stop()
+        shutil.rmtree(log_dir, ignore_errors=True)
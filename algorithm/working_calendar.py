@@ -0,0 +1,143 @@
+"""
+Calendário de horas trabalhadas a partir de turnos e feriados.
+
+Os turnos de cada dia da semana e os feriados são compilados em intervalos
+de trabalho ordenados e disjuntos (segundos desde a `origin`), com a soma
+acumulada das durações. A conversão entre data/hora e horas trabalhadas é
+uma busca binária (`np.searchsorted`) nos dois sentidos:
+
+- `working_hours(quando)`: horas trabalhadas entre a origem e `quando`;
+- `to_datetime(horas)`: data/hora em que se completam `horas` trabalhadas.
+
+Janelas dos turnos (hora do dia em que começa o turno):
+
+- manhã 06:00-14:00, tarde 14:00-22:00, noite 22:00-06:00 (dia seguinte)
+
+Um turno pertence ao dia em que começa: feriado ou dia sem trabalho
+removem também a noite que termina na manhã seguinte. Dias quinzenais
+trabalham nas semanas pares contadas a partir de `biweekly_anchor`.
+"""
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Iterable, Optional
+
+import numpy as np
+
+SHIFT_WINDOWS = {"manha": (6, 14), "tarde": (14, 22), "noite": (22, 30)}
+BIWEEKLY_ANCHOR = date(2024, 1, 1)  # segunda-feira; semana 0 é de trabalho
+
+
+@dataclass(frozen=True)
+class DayShifts:
+    manha: bool = False
+    tarde: bool = False
+    noite: bool = False
+    biweekly: bool = False
+
+
+class WorkingCalendar:
+    """Intervalos de trabalho [starts[k], ends[k]) em segundos desde `origin`."""
+
+    def __init__(self, origin: datetime, starts, ends):
+        self.origin = origin
+        self.starts = np.asarray(starts, dtype=float)
+        self.ends = np.asarray(ends, dtype=float)
+        self.durations = self.ends - self.starts
+        # Segundos trabalhados até o início de cada intervalo (e o total no fim)
+        self.cumulative = np.concatenate(([0.0], np.cumsum(self.durations)))
+
+    @property
+    def total_hours(self) -> float:
+        return float(self.cumulative[-1] / 3600)
+
+    def _offsets(self, when) -> np.ndarray:
+        stamps = np.array(when, dtype="datetime64[us]")
+        return (stamps - np.datetime64(self.origin, "us")) / np.timedelta64(1, "s")
+
+    def working_seconds(self, offsets) -> np.ndarray:
+        """Segundos trabalhados entre a origem e cada instante (segundos desde a origem)."""
+        offsets = np.asarray(offsets, dtype=float)
+        k = np.searchsorted(self.starts, offsets, side="right") - 1
+        inside = k >= 0
+        k = np.maximum(k, 0)
+        elapsed = np.clip(offsets - self.starts[k], 0.0, self.durations[k]) if len(self.starts) else 0.0
+        return np.where(inside, self.cumulative[k] + elapsed, 0.0)
+
+    def working_hours(self, when):
+        """Horas trabalhadas entre a origem e `when` (datetime ou lista de datetimes)."""
+        hours = self.working_seconds(self._offsets(when)) / 3600
+        return float(hours) if np.ndim(hours) == 0 else hours
+
+    def hours_between(self, start: datetime, end: datetime) -> float:
+        return self.working_hours(end) - self.working_hours(start)
+
+    def to_datetime(self, hours, at_end: bool = False):
+        """
+        Instante em que se completam `hours` horas trabalhadas. Em uma troca
+        de intervalo, `at_end=False` retorna o início do próximo intervalo
+        (início de uma tarefa) e `at_end=True` o fim do anterior (término).
+        """
+        seconds = np.asarray(hours, dtype=float) * 3600
+        if np.any(seconds > self.cumulative[-1] + 1e-6):
+            raise ValueError("Horas além do horizonte do calendário")
+        if not len(self.starts):
+            # Sem intervalos de trabalho: só 0h é possível, na origem
+            stamps = np.full(seconds.shape, np.datetime64(self.origin, "us"))
+            return stamps.tolist()
+        side = "left" if at_end else "right"
+        k = np.searchsorted(self.cumulative[1:], seconds, side=side)
+        k = np.minimum(k, len(self.starts) - 1)
+        offsets = self.starts[k] + (seconds - self.cumulative[k])
+        stamps = np.datetime64(self.origin, "us") + np.round(offsets * 1e6).astype("timedelta64[us]")
+        # datetime para um valor, lista de datetimes para um array
+        return stamps.tolist()
+
+
+def _works(day: date, shifts: DayShifts, anchor: date) -> bool:
+    if not shifts.biweekly:
+        return True
+    return ((day - anchor).days // 7) % 2 == 0
+
+
+def compile_calendar(
+    start: datetime,
+    end: datetime,
+    shifts: Optional[dict[int, DayShifts]],
+    holidays: Iterable[date] = (),
+    biweekly_anchor: date = BIWEEKLY_ANCHOR,
+) -> WorkingCalendar:
+    """
+    Intervalos de trabalho entre `start` (origem) e `end`. `shifts` mapeia o
+    dia da semana (0 = segunda) para os turnos; None = trabalho contínuo.
+    """
+    horizon = (end - start).total_seconds()
+    if shifts is None:
+        return WorkingCalendar(start, [0.0], [max(horizon, 0.0)])
+
+    holidays = set(holidays)
+    midnight = datetime.combine(start.date(), datetime.min.time())
+    base = (midnight - start).total_seconds()
+    intervals = []
+    # Começa no dia anterior: a noite dele pode avançar sobre a origem
+    for offset_days in range(-1, (end.date() - start.date()).days + 1):
+        day = start.date() + timedelta(days=offset_days)
+        day_shifts = shifts.get(day.weekday())
+        if day_shifts is None or day in holidays or not _works(day, day_shifts, biweekly_anchor):
+            continue
+        day_start = base + offset_days * 86400
+        for name, (first_hour, last_hour) in SHIFT_WINDOWS.items():
+            if getattr(day_shifts, name):
+                intervals.append((day_start + first_hour * 3600, day_start + last_hour * 3600))
+
+    starts, ends = [], []
+    for interval_start, interval_end in sorted(intervals):
+        interval_start, interval_end = max(interval_start, 0.0), min(interval_end, horizon)
+        if interval_end <= interval_start:
+            continue
+        if ends and interval_start <= ends[-1]:
+            # Turnos consecutivos viram um intervalo só
+            ends[-1] = max(ends[-1], interval_end)
+        else:
+            starts.append(interval_start)
+            ends.append(interval_end)
+    return WorkingCalendar(start, starts, ends)
@@ -22,3 +22,5 @@ class ProductionLine(Base):
     # Each production line has a setup matrix for all its composition lines
     setups = relationship("Setup", back_populates="production_line", cascade="all, delete-orphan")
 
+    # 1:1 relationship with setup defaults (setup time for pairs without a registered setup)
+    setup_default = relationship("SetupDefault", back_populates="production_line", uselist=False, cascade="all, delete-orphan")
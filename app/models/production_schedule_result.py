@@ -24,4 +24,14 @@ class ProductionScheduleResult(Base):
     status = Column(String)
     expected_revenue = Column(Float)
 
+    # Dados do modelo (horas de trabalho desde o início do sequenciamento),
+    # reaproveitados pelo re-sequenciamento incremental sem remontar o modelo
+    composition_line_id = Column(Integer, nullable=True)
+    start_hours = Column(Float, nullable=True)
+    processing_hours = Column(Float, nullable=True)
+    post_bottleneck_hours = Column(Float, nullable=True)
+    due_hours = Column(Float, nullable=True)
+    weight = Column(Float, nullable=True)
+    setup_hours = Column(Float, nullable=True)  # Setup do job anterior da sequência para este
+
     run = relationship("ProductionScheduleRun", back_populates="results")
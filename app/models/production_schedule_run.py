@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, Float, String, DateTime
+from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.database import Base
@@ -18,5 +18,10 @@ class ProductionScheduleRun(Base):
     max_deadline_hours = Column(Float)
     machine_status = Column(String)
 
+    # Disponibilidade usada nos tempos de processamento (reaproveitados no re-sequenciamento)
+    machine_availability = Column(Integer, nullable=True)
+    # Run de origem de um re-sequenciamento incremental
+    base_run_id = Column(Integer, ForeignKey("production_schedule_run.id", ondelete="SET NULL"), nullable=True)
+
     results = relationship("ProductionScheduleResult", back_populates="run", cascade="all, delete-orphan")
     revenue_forecast = relationship("PredictedRevenueByDay", back_populates="run", cascade="all, delete-orphan")
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, ForeignKey
+from sqlalchemy.orm import relationship
+from app.database import Base
+
+class SetupDefault(Base):
+    """
+    Tempos de setup padrão de uma linha de produção, usados para os pares de
+    composition lines sem `Setup` cadastrado. Assim só as exceções precisam
+    ser cadastradas, em vez da matriz N x N inteira:
+    - same_mold_time: troca de produto no mesmo molde
+    - mold_change_time: troca de molde
+
+    Ordem de resolução: setup cadastrado; mesma composition line = 0;
+    mesmo molde = same_mold_time; moldes diferentes = mold_change_time.
+    Padrão nulo mantém o par como setup faltando.
+    """
+    __tablename__ = "setup_default"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+
+    production_line_id = Column(Integer, ForeignKey("production_line.id"), nullable=False, unique=True)
+
+    same_mold_time = Column(Integer, nullable=True)  # Tempo em segundos
+    mold_change_time = Column(Integer, nullable=True)  # Tempo em segundos
+
+    production_line = relationship("ProductionLine", back_populates="setup_default")
@@ -0,0 +1,29 @@
+from sqlalchemy import Column, Integer, String, Text, Boolean, DateTime, ForeignKey
+from datetime import datetime
+from app.database import Base
+
+class SolveTask(Base):
+    """
+    Execução assíncrona do solver (fila de tarefas).
+    Guarda os parâmetros da requisição, o status e o resultado serializados em JSON.
+
+    status: pending -> running -> completed | failed | cancelled
+    """
+    __tablename__ = "solve_task"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String, nullable=False)  # Ex.: "sequenciamento"
+    user_id = Column(String, nullable=True, index=True)
+    status = Column(String, nullable=False, default="pending", index=True)
+
+    params = Column(Text, nullable=False)  # JSON
+    result = Column(Text, nullable=True)  # JSON
+    error = Column(Text, nullable=True)
+    cancel_requested = Column(Boolean, default=False, nullable=False)
+    stop_requested = Column(Boolean, default=False, nullable=False)  # Parada antecipada (grava a melhor solução)
+
+    run_id = Column(Integer, ForeignKey("production_schedule_run.id", ondelete="SET NULL"), nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
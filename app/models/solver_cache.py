@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime
+from datetime import datetime
+from app.database import Base
+
+class SolverCacheEntry(Base):
+    """
+    Camada persistente do cache de resultados do solver (app/utils/solver_cache.py).
+    A chave é o SHA-256 do problema normalizado (tempos, prazos, prioridades,
+    setups e opções do solver).
+    """
+    __tablename__ = "solver_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    fingerprint = Column(String(64), nullable=False, unique=True, index=True)
+    kind = Column(String, nullable=False)  # Ex.: "sequenciamento", "injetoras"
+    result = Column(Text, nullable=False)  # JSON
+    hits = Column(Integer, default=0, nullable=False)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
@@ -1,6 +1,10 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session, joinedload
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.orm import Session, joinedload, selectinload
 from app.database import get_db
+from app.utils.cycle_time_index import fetch_cycle_times, invalidate_cycle_time_index
+from app.utils.setup_matrix_cache import invalidate_setup_matrix
 from app.models.composition_line import CompositionLine
 from app.models.composition_line_machine import CompositionLineMachine
 from app.models.production_line import ProductionLine
@@ -97,6 +101,7 @@ def create_composition_line(composition_line: CompositionLineCreate, db: Session
         db.add(composition_line_machine)
     
     db.commit()
+    invalidate_cycle_time_index()
     db.refresh(db_composition_line)
     
     # Load relations for response
@@ -110,14 +115,34 @@ def create_composition_line(composition_line: CompositionLineCreate, db: Session
     return CompositionLineResponse.from_orm_with_relations(db_composition_line, db)
 
 @router.get("/", response_model=list[CompositionLineResponse])
-def list_composition_lines(db: Session = Depends(get_db)):
-    composition_lines = db.query(CompositionLine).options(
+def list_composition_lines(
+    production_line_id: Optional[int] = Query(default=None, description="Only composition lines of this production line"),
+    after_id: Optional[int] = Query(default=None, description="Keyset pagination: only IDs greater than this one"),
+    limit: Optional[int] = Query(default=None, ge=1, le=1000, description="Page size (all when omitted)"),
+    db: Session = Depends(get_db)
+):
+    """
+    Composition lines ordered by ID. Next page: `after_id` = ID of the last
+    item of the current page. Cycle times of every machine are loaded with a
+    single ProductionTime query.
+    """
+    query = db.query(CompositionLine).options(
         joinedload(CompositionLine.production_line),
         joinedload(CompositionLine.mold),
         joinedload(CompositionLine.product),
-        joinedload(CompositionLine.machines).joinedload(CompositionLineMachine.machine)
-    ).all()
-    return [CompositionLineResponse.from_orm_with_relations(cl, db) for cl in composition_lines]
+        selectinload(CompositionLine.machines).joinedload(CompositionLineMachine.machine)
+    )
+    if production_line_id is not None:
+        query = query.filter(CompositionLine.production_line_id == production_line_id)
+    if after_id is not None:
+        query = query.filter(CompositionLine.id > after_id)
+    query = query.order_by(CompositionLine.id)
+    if limit is not None:
+        query = query.limit(limit)
+    composition_lines = query.all()
+
+    cycle_times = fetch_cycle_times(db, composition_lines)
+    return [CompositionLineResponse.from_orm_with_relations(cl, db, cycle_times) for cl in composition_lines]
 
 @router.get("/{composition_line_id}", response_model=CompositionLineResponse)
 def get_composition_line(composition_line_id: int, db: Session = Depends(get_db)):
@@ -147,6 +172,7 @@ def update_composition_line(
     final_mold_id = composition_line.mold_id if composition_line.mold_id is not None else db_composition_line.mold_id
     final_product_id = composition_line.product_id if composition_line.product_id is not None else db_composition_line.product_id
     final_production_line_id = composition_line.production_line_id if composition_line.production_line_id is not None else db_composition_line.production_line_id
+    old_production_line_id = db_composition_line.production_line_id
     
     # If product or mold is being updated, validate the relationship
     if composition_line.product_id is not None or composition_line.mold_id is not None:
@@ -210,6 +236,9 @@ def update_composition_line(
             db.add(composition_line_machine)
     
     db.commit()
+    invalidate_cycle_time_index()
+    # Os setups em cache guardam o molde e a linha de cada composition line
+    invalidate_setup_matrix([old_production_line_id, final_production_line_id])
     db.refresh(db_composition_line)
     
     # Load relations for response
@@ -228,9 +257,12 @@ def delete_composition_line(composition_line_id: int, db: Session = Depends(get_
     if not db_composition_line:
         raise HTTPException(status_code=404, detail="Composition line not found")
     
+    production_line_id = db_composition_line.production_line_id
     # Cascade delete will handle CompositionLineMachine
     db.delete(db_composition_line)
     db.commit()
+    invalidate_cycle_time_index()
+    invalidate_setup_matrix([production_line_id])
     return {"message": "Composition line deleted successfully"}
 
 
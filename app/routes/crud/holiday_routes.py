@@ -6,6 +6,8 @@ from sqlalchemy.orm import Session
 from pydantic import BaseModel
 
 from app.database import get_db
+from app.utils.upsert import upsert_insert
+from app.utils.working_calendar import invalidate_working_calendar
 from app.models.holiday import Holiday, HolidayLevel
 from app.schemas.holiday_schema import (
     HolidayCreate,
@@ -70,6 +72,7 @@ def create_holiday(holiday: HolidayCreate, db: Session = Depends(get_db)):
     db_holiday = Holiday(**holiday.model_dump())
     db.add(db_holiday)
     db.commit()
+    invalidate_working_calendar()
     db.refresh(db_holiday)
     return db_holiday
 
@@ -106,6 +109,7 @@ def update_holiday(holiday_id: int, holiday: HolidayUpdate, db: Session = Depend
         setattr(db_holiday, key, value)
 
     db.commit()
+    invalidate_working_calendar()
     db.refresh(db_holiday)
     return db_holiday
 
@@ -117,6 +121,7 @@ def delete_holiday(holiday_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Feriado não encontrado")
     db.delete(holiday)
     db.commit()
+    invalidate_working_calendar()
     return {"message": "Feriado removido com sucesso"}
 
 
@@ -127,6 +132,78 @@ class SyncHolidaysResponse(BaseModel):
     message: str
 
 
+def national_holiday_candidates(years: range) -> tuple[list[tuple[date, str]], int]:
+    """
+    Feriados nacionais dos anos: Carnaval de cada ano (não está na biblioteca
+    `holidays`) seguido dos feriados da biblioteca, na ordem da resposta.
+    Retorna também o total encontrado.
+    """
+    br_holidays = holidays_lib.Brazil(years=years)
+    candidates = [item for year in years for item in get_carnival_dates(year).items()]
+    candidates.extend(sorted(br_holidays.items()))
+    return candidates, len(br_holidays) + 2 * len(years)
+
+
+def sync_holidays(db: Session, candidates: list[tuple[date, str]], force: bool) -> tuple[list[HolidayResponse], int]:
+    """
+    Grava os feriados nacionais candidatos com uma leitura e uma escrita:
+
+    - datas sem feriado cadastrado são inseridas;
+    - datas com feriado nacional são puladas ou, com `force`, têm o nome atualizado;
+    - datas com outro feriado (estadual, municipal...) são puladas, pois a
+      data é única.
+
+    Retorna (feriados criados/atualizados na ordem dos candidatos, pulados).
+    """
+    dates = [holiday_date for holiday_date, _ in candidates]
+    existing = {
+        holiday_date: level
+        for holiday_date, level in db.query(Holiday.date, Holiday.level).filter(
+            Holiday.date >= min(dates), Holiday.date <= max(dates)
+        )
+    }
+    national = {holiday_date for holiday_date, level in existing.items() if level == HolidayLevel.NACIONAL}
+
+    rows, position = [], {}
+    for index, (holiday_date, name) in enumerate(candidates):
+        if holiday_date in position:
+            continue  # mesma data em dois candidatos: vale o primeiro
+        if holiday_date not in existing or (force and holiday_date in national):
+            position[holiday_date] = index
+            rows.append({"name": name, "date": holiday_date, "level": HolidayLevel.NACIONAL})
+    skipped = len(candidates) - len(rows)
+    if not rows:
+        return [], skipped
+
+    statement = upsert_insert(db, Holiday)
+    if force:
+        statement = statement.on_conflict_do_update(
+            index_elements=[Holiday.date],
+            set_={"name": statement.excluded.name},
+            where=Holiday.level == HolidayLevel.NACIONAL,
+        )
+    else:
+        # INSERT OR IGNORE: um feriado gravado por outra requisição no meio tempo é pulado
+        statement = statement.on_conflict_do_nothing(index_elements=[Holiday.date])
+    saved = db.scalars(
+        statement.returning(Holiday), rows, execution_options={"populate_existing": True}
+    ).all()
+
+    saved.sort(key=lambda holiday: position[holiday.date])
+    created = [HolidayResponse.model_validate(holiday) for holiday in saved]
+    db.commit()
+    invalidate_working_calendar()
+    return created, skipped + len(rows) - len(saved)
+
+
+def require_holidays_lib():
+    if holidays_lib is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Instale a biblioteca `holidays` (pip install holidays) para importar feriados nacionais",
+        )
+
+
 @router.post("/sincronizar-nacionais/{year}", response_model=SyncHolidaysResponse)
 def sync_national_holidays(
     year: int, 
@@ -137,91 +214,14 @@ def sync_national_holidays(
     Sincroniza feriados nacionais do Brasil para um ano específico.
     Verifica se já existe um feriado nacional na data antes de adicionar.
     """
-    if holidays_lib is None:
-        raise HTTPException(
-            status_code=400,
-            detail="Instale a biblioteca `holidays` (pip install holidays) para importar feriados nacionais",
-        )
+    require_holidays_lib()
 
-    br_holidays = holidays_lib.Brazil(years=year)
-    created = []
-    skipped = 0
-    
-    # Adiciona Carnaval (não está na biblioteca holidays)
-    carnival_dates = get_carnival_dates(year)
-    for carnival_date, carnival_name in carnival_dates.items():
-        # Verifica se já existe um feriado nacional nesta data
-        existing_national = db.query(Holiday).filter(
-            Holiday.date == carnival_date,
-            Holiday.level == HolidayLevel.NACIONAL
-        ).first()
-        
-        if existing_national:
-            if not force:
-                skipped += 1
-                continue
-            else:
-                # Se force=True, atualiza o existente
-                existing_national.name = carnival_name
-                created.append(existing_national)
-                continue
-        
-        # Verifica se existe qualquer feriado na data (não nacional)
-        existing_any = db.query(Holiday).filter(Holiday.date == carnival_date).first()
-        if existing_any and not force:
-            skipped += 1
-            continue
-        
-        db_holiday = Holiday(
-            name=carnival_name,
-            date=carnival_date,
-            level=HolidayLevel.NACIONAL
-        )
-        db.add(db_holiday)
-        created.append(db_holiday)
-    
-    for holiday_date, name in sorted(br_holidays.items()):
-        # Verifica se já existe um feriado nacional nesta data
-        existing_national = db.query(Holiday).filter(
-            Holiday.date == holiday_date,
-            Holiday.level == HolidayLevel.NACIONAL
-        ).first()
-        
-        if existing_national:
-            if not force:
-                skipped += 1
-                continue
-            else:
-                # Se force=True, atualiza o existente
-                existing_national.name = name
-                created.append(existing_national)
-                continue
-        
-        # Verifica se existe qualquer feriado na data (não nacional)
-        existing_any = db.query(Holiday).filter(Holiday.date == holiday_date).first()
-        if existing_any and not force:
-            skipped += 1
-            continue
-        
-        db_holiday = Holiday(
-            name=name, 
-            date=holiday_date, 
-            level=HolidayLevel.NACIONAL
-        )
-        db.add(db_holiday)
-        created.append(db_holiday)
-
-    if created:
-        db.commit()
-        for entry in created:
-            db.refresh(entry)
-
-    # Total inclui feriados da biblioteca + Carnaval (2 dias por ano)
-    total_found = len(br_holidays) + len(carnival_dates)
+    candidates, total_found = national_holiday_candidates(range(year, year + 1))
+    created, skipped = sync_holidays(db, candidates, force)
     message = f"Sincronização concluída: {len(created)} feriados adicionados/atualizados, {skipped} já existiam"
     
     return SyncHolidaysResponse(
-        created=[HolidayResponse.model_validate(h) for h in created],
+        created=created,
         skipped=skipped,
         total_found=total_found,
         message=message
@@ -239,11 +239,7 @@ def sync_national_holidays_range(
     Sincroniza feriados nacionais do Brasil para um range de anos.
     Útil para popular múltiplos anos de uma vez.
     """
-    if holidays_lib is None:
-        raise HTTPException(
-            status_code=400,
-            detail="Instale a biblioteca `holidays` (pip install holidays) para importar feriados nacionais",
-        )
+    require_holidays_lib()
 
     if start_year > end_year:
         raise HTTPException(
@@ -257,88 +253,12 @@ def sync_national_holidays_range(
             detail="O range de anos não pode ser maior que 50 anos"
         )
 
-    years_range = range(start_year, end_year + 1)
-    br_holidays = holidays_lib.Brazil(years=years_range)
-    
-    created = []
-    skipped = 0
-    
-    # Adiciona Carnaval para cada ano (não está na biblioteca holidays)
-    for year in years_range:
-        carnival_dates = get_carnival_dates(year)
-        for carnival_date, carnival_name in carnival_dates.items():
-            # Verifica se já existe um feriado nacional nesta data
-            existing_national = db.query(Holiday).filter(
-                Holiday.date == carnival_date,
-                Holiday.level == HolidayLevel.NACIONAL
-            ).first()
-            
-            if existing_national:
-                if not force:
-                    skipped += 1
-                    continue
-                else:
-                    existing_national.name = carnival_name
-                    created.append(existing_national)
-                    continue
-            
-            # Verifica se existe qualquer feriado na data
-            existing_any = db.query(Holiday).filter(Holiday.date == carnival_date).first()
-            if existing_any and not force:
-                skipped += 1
-                continue
-            
-            db_holiday = Holiday(
-                name=carnival_name,
-                date=carnival_date,
-                level=HolidayLevel.NACIONAL
-            )
-            db.add(db_holiday)
-            created.append(db_holiday)
-    
-    for holiday_date, name in sorted(br_holidays.items()):
-        # Verifica se já existe um feriado nacional nesta data
-        existing_national = db.query(Holiday).filter(
-            Holiday.date == holiday_date,
-            Holiday.level == HolidayLevel.NACIONAL
-        ).first()
-        
-        if existing_national:
-            if not force:
-                skipped += 1
-                continue
-            else:
-                # Se force=True, atualiza o existente
-                existing_national.name = name
-                created.append(existing_national)
-                continue
-        
-        # Verifica se existe qualquer feriado na data (não nacional)
-        existing_any = db.query(Holiday).filter(Holiday.date == holiday_date).first()
-        if existing_any and not force:
-            skipped += 1
-            continue
-        
-        db_holiday = Holiday(
-            name=name, 
-            date=holiday_date, 
-            level=HolidayLevel.NACIONAL
-        )
-        db.add(db_holiday)
-        created.append(db_holiday)
-
-    if created:
-        db.commit()
-        for entry in created:
-            db.refresh(entry)
-
-    # Total inclui feriados da biblioteca + Carnaval (2 dias por ano para cada ano no range)
-    total_carnival_days = len(years_range) * 2
-    total_found = len(br_holidays) + total_carnival_days
+    candidates, total_found = national_holiday_candidates(range(start_year, end_year + 1))
+    created, skipped = sync_holidays(db, candidates, force)
     message = f"Sincronização concluída para {start_year}-{end_year}: {len(created)} feriados adicionados/atualizados, {skipped} já existiam"
     
     return SyncHolidaysResponse(
-        created=[HolidayResponse.model_validate(h) for h in created],
+        created=created,
         skipped=skipped,
         total_found=total_found,
         message=message
@@ -355,100 +275,19 @@ def sync_national_holidays_automatic(
     Por padrão, sincroniza do ano atual até 5 anos à frente.
     Esta função garante que os feriados sejam adicionados apenas uma vez.
     """
-    if holidays_lib is None:
-        raise HTTPException(
-            status_code=400,
-            detail="Instale a biblioteca `holidays` (pip install holidays) para importar feriados nacionais",
-        )
+    require_holidays_lib()
 
     from datetime import datetime
     current_year = datetime.now().year
     end_year = current_year + years_ahead
-    
-    years_range = range(current_year, end_year + 1)
-    br_holidays = holidays_lib.Brazil(years=years_range)
-    
-    created = []
-    skipped = 0
-    
-    # Adiciona Carnaval para cada ano (não está na biblioteca holidays)
-    for year in years_range:
-        carnival_dates = get_carnival_dates(year)
-        for carnival_date, carnival_name in carnival_dates.items():
-            # Verifica se já existe um feriado nacional nesta data
-            existing_national = db.query(Holiday).filter(
-                Holiday.date == carnival_date,
-                Holiday.level == HolidayLevel.NACIONAL
-            ).first()
-            
-            if existing_national:
-                if not force:
-                    skipped += 1
-                    continue
-                else:
-                    # Se force=True, atualiza o existente
-                    existing_national.name = carnival_name
-                    created.append(existing_national)
-                    continue
-            
-            # Verifica se existe qualquer feriado na data (não nacional)
-            existing_any = db.query(Holiday).filter(Holiday.date == carnival_date).first()
-            if existing_any and not force:
-                skipped += 1
-                continue
-            
-            db_holiday = Holiday(
-                name=carnival_name,
-                date=carnival_date,
-                level=HolidayLevel.NACIONAL
-            )
-            db.add(db_holiday)
-            created.append(db_holiday)
-    
-    for holiday_date, name in sorted(br_holidays.items()):
-        # Verifica se já existe um feriado nacional nesta data
-        existing_national = db.query(Holiday).filter(
-            Holiday.date == holiday_date,
-            Holiday.level == HolidayLevel.NACIONAL
-        ).first()
-        
-        if existing_national:
-            skipped += 1
-            continue
-        
-        # Se não existe feriado nacional, adiciona
-        db_holiday = Holiday(
-            name=name, 
-            date=holiday_date, 
-            level=HolidayLevel.NACIONAL
-        )
-        db.add(db_holiday)
-        created.append(db_holiday)
 
-    if created:
-        db.commit()
-        for entry in created:
-            db.refresh(entry)
-
-    # Total inclui feriados da biblioteca + Carnaval (2 dias por ano para cada ano no range)
-    total_carnival_days = len(years_range) * 2
-    total_found = len(br_holidays) + total_carnival_days
+    candidates, total_found = national_holiday_candidates(range(current_year, end_year + 1))
+    created, skipped = sync_holidays(db, candidates, force=False)
     message = f"Sincronização automática concluída ({current_year}-{end_year}): {len(created)} feriados adicionados, {skipped} já existiam"
     
     return SyncHolidaysResponse(
-        created=[HolidayResponse.model_validate(h) for h in created],
+        created=created,
         skipped=skipped,
         total_found=total_found,
         message=message
     )
-
-
-
-
-
-
-
-
-
-
-
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models.job import Job
@@ -17,8 +17,14 @@ def create_job(job: JobCreate, db: Session = Depends(get_db)):
     return db_job
 
 @router.get("", response_model=list[JobResponse])
-def list_jobs(db: Session = Depends(get_db)):
-    return db.query(Job).all()
+def list_jobs(
+    include_processed: bool = Query(default=False, description="Inclui jobs já sequenciados"),
+    db: Session = Depends(get_db),
+):
+    query = db.query(Job)
+    if not include_processed:
+        query = query.filter(Job.processed.isnot(True))
+    return query.all()
 
 @router.get("/{job_id}", response_model=JobResponse)
 def get_job(job_id: int, db: Session = Depends(get_db)):
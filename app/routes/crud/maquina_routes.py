@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from app.database import get_db
+from app.utils.cycle_time_index import invalidate_cycle_time_index
 from app.models.machine import Machine
 from app.schemas.maquina_schema import MachineCreate, MachineUpdate, MachineResponse
 
@@ -11,6 +12,7 @@ def create_machine(machine: MachineCreate, db: Session = Depends(get_db)):
     db_machine = Machine(**machine.model_dump())
     db.add(db_machine)
     db.commit()
+    invalidate_cycle_time_index()
     db.refresh(db_machine)
     return db_machine
 
@@ -33,6 +35,7 @@ def update_machine(machine_id: int, machine: MachineUpdate, db: Session = Depend
     for key, value in machine.model_dump().items():
         setattr(db_machine, key, value)
     db.commit()
+    invalidate_cycle_time_index()
     db.refresh(db_machine)
     return db_machine
 
@@ -43,6 +46,7 @@ def delete_machine(machine_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Machine not found")
     db.delete(db_machine)
     db.commit()
+    invalidate_cycle_time_index()
     return {"message": "Machine deleted successfully"}
 
 
@@ -1,6 +1,9 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session, joinedload
 from app.database import get_db
+from app.utils.cycle_time_index import invalidate_cycle_time_index
+from app.utils.setup_matrix_cache import invalidate_setup_matrix
+from app.models.composition_line import CompositionLine
 from app.models.mold import Mold
 from app.models.product import Product
 from app.models.mold_product import MoldProduct
@@ -8,6 +11,15 @@ from app.schemas.mold_schema import MoldCreate, MoldUpdate, MoldResponse
 
 router = APIRouter(prefix="/molds", tags=["Molds"])
 
+
+def _mold_production_line_ids(db: Session, mold_id: int) -> list[int]:
+    """Linhas de produção com composition lines do molde (setups em cache dependem do molde)."""
+    return [
+        production_line_id for (production_line_id,) in
+        db.query(CompositionLine.production_line_id).filter(CompositionLine.mold_id == mold_id).distinct()
+    ]
+
+
 @router.post("", response_model=MoldResponse)
 def create_mold(mold: MoldCreate, db: Session = Depends(get_db)):
     # Validate that open_cavities is not greater than total_cavities
@@ -43,6 +55,7 @@ def create_mold(mold: MoldCreate, db: Session = Depends(get_db)):
             db.add(mold_product)
     
     db.commit()
+    invalidate_cycle_time_index()
     db.refresh(db_mold)
     
     # Load products for response
@@ -111,7 +124,10 @@ def update_mold(mold_id: int, mold: MoldUpdate, db: Session = Depends(get_db)):
                 )
                 db.add(mold_product)
     
+    production_line_ids = _mold_production_line_ids(db, mold_id)
     db.commit()
+    invalidate_cycle_time_index()
+    invalidate_setup_matrix(production_line_ids)
     db.refresh(db_mold)
     
     # Load products for response
@@ -126,7 +142,11 @@ def delete_mold(mold_id: int, db: Session = Depends(get_db)):
     db_mold = db.query(Mold).get(mold_id)
     if not db_mold:
         raise HTTPException(status_code=404, detail="Mold not found")
+    # Lidas antes do delete: as composition lines do molde são removidas em cascata
+    production_line_ids = _mold_production_line_ids(db, mold_id)
     db.delete(db_mold)
     db.commit()
+    invalidate_cycle_time_index()
+    invalidate_setup_matrix(production_line_ids)
     return {"message": "Mold deleted successfully"}
 
@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session, joinedload
 from app.database import get_db
 from app.models.production_line import ProductionLine
 from app.models.composition_line import CompositionLine
+from app.utils.setup_matrix_cache import invalidate_setup_matrix
 from app.schemas.production_line_schema import (
     ProductionLineCreate,
     ProductionLineUpdate,
@@ -85,6 +86,7 @@ def delete_production_line(production_line_id: int, db: Session = Depends(get_db
     # Cascade delete will handle CompositionLines
     db.delete(db_production_line)
     db.commit()
+    invalidate_setup_matrix([production_line_id])
     return {"message": "Production line deleted successfully"}
 
 def _build_response(production_line_obj: ProductionLine) -> ProductionLineResponse:
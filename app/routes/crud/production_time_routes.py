@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session, joinedload
 from app.database import get_db
+from app.utils.cycle_time_index import invalidate_cycle_time_index
 from app.models.production_time import ProductionTime
 from app.models.machine import Machine
 from app.models.product import Product
@@ -64,6 +65,7 @@ def create_production_time(production_time: ProductionTimeCreate, db: Session =
     db_production_time = ProductionTime(**production_time.model_dump())
     db.add(db_production_time)
     db.commit()
+    invalidate_cycle_time_index()
     db.refresh(db_production_time)
     
     # Load relations for response
@@ -137,6 +139,7 @@ def update_production_time(
         setattr(db_production_time, key, value)
     
     db.commit()
+    invalidate_cycle_time_index()
     db.refresh(db_production_time)
     
     # Load relations for response
@@ -156,5 +159,6 @@ def delete_production_time(production_time_id: int, db: Session = Depends(get_db
     
     db.delete(db_production_time)
     db.commit()
+    invalidate_cycle_time_index()
     return {"message": "Production time deleted successfully"}
 
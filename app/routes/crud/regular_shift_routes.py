@@ -2,6 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
 from app.database import get_db
+from app.utils.working_calendar import invalidate_working_calendar
 from app.models.regular_shift import RegularShift
 from app.schemas.regular_shift_schema import (
     RegularShiftCreate,
@@ -29,12 +30,14 @@ def create_or_update_regular_shift(
         existing_shift.noite = shift.noite
         existing_shift.frequencia = shift.frequencia
         db.commit()
+        invalidate_working_calendar()
         db.refresh(existing_shift)
         return existing_shift
 
     new_shift = RegularShift(**shift.model_dump())
     db.add(new_shift)
     db.commit()
+    invalidate_working_calendar()
     db.refresh(new_shift)
     return new_shift
 
@@ -77,6 +80,7 @@ def update_regular_shift(
         setattr(db_shift, key, value)
 
     db.commit()
+    invalidate_working_calendar()
     db.refresh(db_shift)
     return db_shift
 
@@ -88,6 +92,7 @@ def delete_regular_shift(shift_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Turno não encontrado")
     db.delete(db_shift)
     db.commit()
+    invalidate_working_calendar()
     return {"message": "Turno regular removido"}
 
 
@@ -1,11 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session, joinedload
 from app.database import get_db
+from app.utils.setup_matrix_cache import invalidate_setup_matrix
 from app.models.setup import Setup
+from app.models.setup_default import SetupDefault
 from app.models.production_line import ProductionLine
 from app.models.composition_line import CompositionLine
 from app.models.machine import Machine
-from app.schemas.setup_schema import SetupResumeResponse, CompositionLineResume
+from app.schemas.setup_schema import (
+    SetupResumeResponse, CompositionLineResume, SetupDefaultUpdate, SetupDefaultResponse
+)
 
 router = APIRouter(prefix="/setup-matrix", tags=["Setup Matrix"])
 
@@ -74,6 +78,7 @@ def generate_setup_matrix(production_line_id: int, db: Session = Depends(get_db)
             created_count += 1
     
     db.commit()
+    invalidate_setup_matrix([production_line_id])
     
     return {
         "message": f"Setup matrix generated for production line '{production_line.name}'",
@@ -121,3 +126,39 @@ def get_setup_matrix(production_line_id: int, db: Session = Depends(get_db)):
         for s in setups
     ]
 
+@router.get("/production-line/{production_line_id}/defaults", response_model=SetupDefaultResponse)
+def get_setup_defaults(production_line_id: int, db: Session = Depends(get_db)):
+    """
+    Tempos de setup padrão da linha de produção, usados nos pares sem setup
+    cadastrado (nulos quando não definidos).
+    """
+    production_line = db.query(ProductionLine).get(production_line_id)
+    if not production_line:
+        raise HTTPException(status_code=404, detail="Production line not found")
+
+    if production_line.setup_default is None:
+        return SetupDefaultResponse(production_line_id=production_line_id)
+    return production_line.setup_default
+
+@router.put("/production-line/{production_line_id}/defaults", response_model=SetupDefaultResponse)
+def update_setup_defaults(production_line_id: int, defaults: SetupDefaultUpdate, db: Session = Depends(get_db)):
+    """
+    Define os tempos de setup padrão da linha de produção: troca de produto
+    no mesmo molde e troca de molde. Com eles só as exceções precisam de
+    setup cadastrado; campo nulo mantém esses pares como setup faltando.
+    """
+    production_line = db.query(ProductionLine).get(production_line_id)
+    if not production_line:
+        raise HTTPException(status_code=404, detail="Production line not found")
+
+    setup_default = production_line.setup_default
+    if setup_default is None:
+        setup_default = SetupDefault(production_line_id=production_line_id)
+        db.add(setup_default)
+    setup_default.same_mold_time = defaults.same_mold_time
+    setup_default.mold_change_time = defaults.mold_change_time
+
+    db.commit()
+    db.refresh(setup_default)
+    invalidate_setup_matrix([production_line_id])
+    return setup_default
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session, joinedload
 from app.database import get_db
+from app.utils.setup_matrix_cache import invalidate_setup_matrix
 from app.models.setup import Setup
 from app.models.composition_line import CompositionLine
 from app.models.production_line import ProductionLine
@@ -102,7 +103,9 @@ def update_setups_batch(request: SetupBatchUpdateRequest, db: Session = Depends(
 
         updated_setups.append(db_setup)
 
+    production_line_ids = {s.production_line_id for s in updated_setups}
     db.commit()
+    invalidate_setup_matrix(production_line_ids)
     
     # Buscar informações completas para as respostas
     setup_ids = [s.id for s in updated_setups]
@@ -196,6 +199,7 @@ def create_setup(setup: SetupTrocaCreate, db: Session = Depends(get_db)):
             db.add(inverse_setup)
 
     db.commit()
+    invalidate_setup_matrix([setup.production_line_id])
     db.refresh(db_setup)
     
     # Buscar informações completas para a resposta
@@ -304,6 +308,7 @@ def update_setup(setup_id: int, setup_update: SetupTrocaUpdate, db: Session = De
     setup_name = f"{from_cl.mold.name} {from_cl.product.name}"
 
     # Atualizar o setup
+    old_production_line_id = db_setup.production_line_id
     db_setup.production_line_id = setup_update.production_line_id
     db_setup.from_composition_line_id = setup_update.from_composition_line_id
     db_setup.to_composition_line_id = setup_update.to_composition_line_id
@@ -337,6 +342,7 @@ def update_setup(setup_id: int, setup_update: SetupTrocaUpdate, db: Session = De
             db.add(new_inverse)
 
     db.commit()
+    invalidate_setup_matrix([old_production_line_id, setup_update.production_line_id])
     db.refresh(db_setup)
     
     # Buscar informações completas para a resposta
@@ -385,7 +391,9 @@ def delete_setup(setup_id: int, db: Session = Depends(get_db)):
         if inverse_setup:
             db.delete(inverse_setup)
     
+    production_line_id = db_setup.production_line_id
     db.commit()
+    invalidate_setup_matrix([production_line_id])
     return {"message": "Setup deleted"}
 
 
@@ -2,13 +2,18 @@ from fastapi import APIRouter, Depends
 from app.database import Base, engine
 from app.models import (
     user, enterprise, password_reset_token, user_session,
-    client, product, job, setup,
-    predicted_revenue_by_day, production_schedule_run, production_schedule_result
+    client, product, job, setup, setup_default,
+    predicted_revenue_by_day, production_schedule_run, production_schedule_result,
+    solve_task, solver_cache
 )
 
+from init_db import upgrade_schema
+
 router = APIRouter()
 
 @router.get("/init-db", tags=["Dev"])
 def create_tables():
     Base.metadata.create_all(bind=engine)
-    return {"message": "🗂️ Tabelas criadas com sucesso!"}
+    # Colunas novas em tabelas já existentes (create_all não altera tabelas)
+    added = upgrade_schema()
+    return {"message": "🗂️ Tabelas criadas com sucesso!", "colunas_adicionadas": added}
@@ -1,73 +1,76 @@
-from fastapi import APIRouter, Depends
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from fastapi.responses import StreamingResponse
-import pandas as pd
+from openpyxl import Workbook
+import numpy as np
 import io
 
 from app.database import get_db
 from app.models.composition_line import CompositionLine
-from app.models.setup import Setup
+from app.utils.setup_matrix import composition_line_label, load_setup_matrix
+from app.utils.setup_matrix_cache import get_setup_matrix
 from sqlalchemy.orm import joinedload
 
 router = APIRouter(prefix="/template", tags=["Templates"])
 
+
+def setup_template_cells(seconds: np.ndarray) -> np.ndarray:
+    """
+    Células da planilha a partir da matriz de setup (NaN = sem cadastro):
+    o tempo cadastrado; senão o tempo do inverso como "(inv) {tempo}",
+    apenas para exibição; senão vazio (None, célula não gravada). A
+    diagonal é sempre 0.
+    """
+    direct = ~np.isnan(seconds)
+    inverse = ~direct & direct.T
+
+    cells = np.full(seconds.shape, None, dtype=object)
+    cells[direct] = seconds[direct].astype(int).tolist()
+    cells[inverse] = [f"(inv) {value}" for value in seconds.T[inverse].astype(int).tolist()]
+    np.fill_diagonal(cells, 0)
+    return cells
+
+
 @router.get("/setup-matrix")
-def download_setup_template(db: Session = Depends(get_db)):
-    # Buscar todas as composition lines com mold e product carregados
-    composition_lines = db.query(CompositionLine).options(
-        joinedload(CompositionLine.mold),
-        joinedload(CompositionLine.product)
-    ).all()
-    
-    # Criar rótulos no formato "M{id_mold}-{nome_produto}"
-    rotulos = []
-    id_por_rotulo = {}
-    rotulo_por_id = {}
-    
-    for cl in composition_lines:
-        rotulo = f"M{cl.mold_id}-{cl.product.name}"
-        rotulos.append(rotulo)
-        id_por_rotulo[rotulo] = cl.id
-        rotulo_por_id[cl.id] = rotulo
-    
-    # Cria DataFrame com índice e colunas iguais
-    matriz = pd.DataFrame("", index=rotulos, columns=rotulos)
-    matriz.index.name = "De\\Para"
+def download_setup_template(
+    production_line_id: Optional[int] = Query(default=None, description="Só as composition lines desta linha de produção"),
+    db: Session = Depends(get_db),
+):
+    # Composition lines (com product carregado para os rótulos), opcionalmente de uma linha de produção
+    query = db.query(CompositionLine).options(joinedload(CompositionLine.product))
+    if production_line_id is not None:
+        query = query.filter(CompositionLine.production_line_id == production_line_id)
+    composition_lines = query.order_by(CompositionLine.id).all()
+    if production_line_id is not None and not composition_lines:
+        raise HTTPException(status_code=404, detail="Nenhuma composition line encontrada para a linha de produção")
 
-    for rotulo_de in rotulos:
-        for rotulo_para in rotulos:
-            id_de = id_por_rotulo[rotulo_de]
-            id_para = id_por_rotulo[rotulo_para]
-            
-            if id_de == id_para:
-                matriz.at[rotulo_de, rotulo_para] = 0
-                continue
+    # Rótulos no formato "M{id_mold}-{nome_produto}"
+    rotulos = [composition_line_label(cl) for cl in composition_lines]
 
-            setup = db.query(Setup).filter_by(
-                from_composition_line_id=id_de,
-                to_composition_line_id=id_para
-            ).first()
+    # Uma linha: setups do cache; planta inteira: todos os setups com uma única query.
+    # Só os setups cadastrados: os padrões da linha não viram células da planilha
+    if production_line_id is not None:
+        setup_matrix = get_setup_matrix(db, composition_lines, defaults=False)
+    else:
+        setup_matrix = load_setup_matrix(db, [cl.id for cl in composition_lines])
+    cells = setup_template_cells(setup_matrix.seconds)
 
-            if setup:
-                matriz.at[rotulo_de, rotulo_para] = setup.setup_time
-            else:
-                # Tenta buscar o inverso, apenas para exibição
-                setup_inv = db.query(Setup).filter_by(
-                    from_composition_line_id=id_para,
-                    to_composition_line_id=id_de
-                ).first()
-                if setup_inv:
-                    matriz.at[rotulo_de, rotulo_para] = f"(inv) {setup_inv.setup_time}"
-                else:
-                    matriz.at[rotulo_de, rotulo_para] = ""
+    # Workbook em modo write-only: linhas gravadas direto, sem montar a planilha em memória
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(["De\\Para", *rotulos])
+    for rotulo, row in zip(rotulos, cells):
+        sheet.append([rotulo, *row.tolist()])
 
-    # Exporta para Excel em memória
     stream = io.BytesIO()
-    matriz.to_excel(stream, engine="openpyxl")
+    workbook.save(stream)
     stream.seek(0)
 
+    filename = "setup_matrix.xlsx" if production_line_id is None else f"setup_matrix_linha_{production_line_id}.xlsx"
     return StreamingResponse(
         stream,
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": "attachment; filename=setup_matrix.xlsx"}
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
@@ -1,216 +1,226 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, Body
-from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, Query, Body, Header
+from sqlalchemy.orm import Session, selectinload
 from datetime import datetime, time
 from app.database import get_db
 from app.models.job import Job
-from app.models.setup import Setup
-from app.models.composition_line import CompositionLine
 from app.utils.save_schedule import save_solver_result_to_db
-from pulp import LpMinimize, LpProblem, LpVariable, lpSum, LpBinary, value, PULP_CBC_CMD
+from app.utils.setup_matrix import (
+    resolve_job_composition_lines, build_job_setup_times, job_setup_lookup, composition_line_label, MissingSetupError,
+)
+from app.models.composition_line import CompositionLine
 import numpy as np
 from app.auth.auth_bearer import get_current_user
 from app.models.user import User
 from fastapi.responses import StreamingResponse
-from app.utils.sse import register_user, unregister_user
-from app.utils.sse import send_event, set_processing, is_processing
+from starlette.concurrency import run_in_threadpool
+from app.utils.sse import register_user, unregister_user, format_event, sse_metrics, SSE_HEARTBEAT_S
+from app.utils.sse import send_event, acquire_processing, release_processing, is_processing
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import json
+from functools import partial
 from io import StringIO
 import sys
 from app.utils.email_sender import send_solver_report
-import math
-from algorithm.injection import solve_injection_scheduling
-from app.schemas.injetoras_solver_schema import InjetorasRequest
+from algorithm.injection_pipeline import solve_injection_problem
+from algorithm.processing_times import batch_processing_times
+from algorithm.repair import repair_sequence
+from algorithm.rolling_horizon import solve_rolling_horizon
+from algorithm.solver_backends import SolverOptions, DEFAULT_BACKEND
+from algorithm.solver_progress import track_solver_progress, track_heuristic_progress
+from app.models.production_schedule_run import ProductionScheduleRun
+from app.models.production_schedule_result import ProductionScheduleResult
+from app.schemas.resequence_schema import ResequenceRequest
+from app.schemas.injetoras_solver_schema import InjetorasRequest, InjetorasFromJobsRequest
+from app.utils.injection_problem import build_line_subproblems
+from app.utils.working_calendar import get_working_calendar, has_working_shifts
+from app.utils.cycle_time_index import get_cycle_time_index
+from algorithm.sequencing import solve_sequencing_problem
+from typing import Callable, Literal, Optional
+from algorithm.metaheuristic import solve_injection_heuristic
+from app.models.solve_task import SolveTask
+from app.schemas.solve_task_schema import SolveTaskResponse
+from app.utils.task_queue import (
+    solver_executor, run_solver, submit_solver, submit_task, cancel_task, is_cancel_requested, task_to_dict, TaskCancelled,
+    SOLVER_THREADS, progress_notifier, running_solve, stop_task,
+)
+from app.utils.solver_cache import problem_fingerprint, get_cached_result, store_result
 
 router = APIRouter(prefix="/sequenciamento", tags=["Sequenciamento"])
 
 @router.get("/stream")
-async def stream_updates(user_id: str):
-    queue = register_user(user_id)
+async def stream_updates(
+    user_id: str,
+    last_event_id: Optional[str] = Header(
+        default=None, alias="Last-Event-ID", description="Retoma o stream após este evento (enviado pelo EventSource)"
+    ),
+):
+    subscriber = register_user(user_id, last_event_id)
 
-    await send_event(user_id, is_processing(user_id))
+    # Estado atual só para esta conexão (as outras abas já o receberam)
+    subscriber.put(None, json.dumps(await is_processing(user_id)))
 
     async def event_generator():
         try:
             while True:
-                data = await queue.get()
-                yield f"data: {data}\n\n"
+                try:
+                    event_id, data = await asyncio.wait_for(subscriber.queue.get(), SSE_HEARTBEAT_S)
+                except asyncio.TimeoutError:
+                    # Comentário SSE: mantém a conexão aberta em proxies
+                    yield ": heartbeat\n\n"
+                    continue
+                yield format_event(event_id, data)
         except asyncio.CancelledError:
             pass
         finally:
-            unregister_user(user_id)
+            unregister_user(subscriber)
 
     return StreamingResponse(event_generator(), media_type="text/event-stream")
 
-def calculate_processing_time(job, sequencing_date: datetime, machine_availability: int, weight: list, job_index: int):
-    # TODO: Product model now only has id and name. 
-    # cycle, bottleneck, and scrap fields were removed.
-    # These values need to come from another source (e.g., Mold, ProductionLine, or separate ProductSpecs model)
-    
-    # Cálculo do refugo
-    # scrap_percent = float(job.product.scrap)  # REMOVED: Product.scrap no longer exists
-    scrap_percent = 0  # Default value - needs to be updated with correct source
-    scrap_factor = 1 + scrap_percent / 100
-    demand_with_scrap = job.demand * scrap_factor
-
-    # fator de disponibilidade
-    available_factor = (100 - machine_availability) / 100 + 1
-
-    # Gargalo
-    # cycle_bottleneck = job.product.cycle * available_factor  # REMOVED: Product.cycle no longer exists
-    cycle_bottleneck = 0 * available_factor  # Default value - needs to be updated with correct source
-    in_bottleneck_time = int(demand_with_scrap * cycle_bottleneck)
-    # post_bottleneck_time = job.product.bottleneck * available_factor  # REMOVED: Product.bottleneck no longer exists
-    post_bottleneck_time = 0 * available_factor  # Default value - needs to be updated with correct source
-    total_bottleneck_time = int(demand_with_scrap * post_bottleneck_time)
-    in_bottleneck_time_hours = math.ceil((in_bottleneck_time / 3600) * 10) / 10
-
-    # Prazos
-    promised_date = job.promised_date
-    deadline = (promised_date - sequencing_date).total_seconds() / 3600
-    deadline_in_bottleneck = math.ceil((deadline - total_bottleneck_time / 3600) * 10) / 10
-
-    if deadline_in_bottleneck < 0:
-        deadline_in_bottleneck = 0
-
-    return round( in_bottleneck_time_hours, 2), round(deadline_in_bottleneck, 2), round(total_bottleneck_time/3600, 2)
-
-@router.post("/solve")
-async def solve_jobs(
-    job_ids: list[int],
-    sequencing_date: datetime = Query(..., description="Data e hora de início do sequenciamento"),
-    machine_availability: int = Query(default=100, ge=1, le=100),
-    db: Session = Depends(get_db),
-):
 
-    jobs_data = db.query(Job).filter(Job.id.in_(job_ids)).all()
+@router.get("/stream/metrics")
+def stream_metrics():
+    """Conexões SSE, profundidade das filas e eventos descartados (por worker)."""
+    return sse_metrics()
 
-    jobs = list(range(len(jobs_data)))
 
-    if len(jobs_data) != len(job_ids):
-        raise HTTPException(status_code=404, detail="Algum job não foi encontrado")
+def _reject_processed(jobs_data: list[Job]):
+    """Jobs já sequenciados estão em um run ativo; sequenciá-los de novo os duplicaria em outro run."""
+    processed = sorted(job.id for job in jobs_data if job.processed)
+    if processed:
+        raise HTTPException(status_code=409, detail={
+            "erro": "Jobs já sequenciados (estão em outro run):",
+            "job_ids": processed,
+        })
 
-    weight = [job.client.priority for job in jobs_data]
 
-    processing_time = []
-    due_time = []
-    post_bottleneck_times = []
+def prepare_sequencing(
+    db: Session,
+    job_ids: list[int],
+    sequencing_date: datetime,
+    machine_availability: int,
+    include_processed: bool = False,
+) -> dict:
+    """
+    Carrega os jobs e monta os dados do modelo (tempos, prazos, pesos e
+    matriz de setup). Levanta HTTPException se faltar job, composition
+    line ou setup, ou se algum job já foi sequenciado (sem `include_processed`).
+    """
+    jobs_data = db.query(Job).options(
+        selectinload(Job.client), selectinload(Job.product)
+    ).filter(Job.id.in_(job_ids)).all()
 
-    for i, job in enumerate(jobs_data):
-        proc_time, real_due, bottleneck  = calculate_processing_time(
-            job, sequencing_date, machine_availability, weight, i
-        )
-        processing_time.append(proc_time)
-        due_time.append(real_due)
-        post_bottleneck_times.append(bottleneck)
+    if len(jobs_data) != len(job_ids):
+        raise HTTPException(status_code=404, detail="Algum job não foi encontrado")
+    if not include_processed:
+        _reject_processed(jobs_data)
 
     weight = [job.client.priority for job in jobs_data]
 
-    # Para usar o novo formato de setup, precisamos mapear jobs para production_lines
-    # Por enquanto, vamos buscar a primeira production_line que corresponde ao produto de cada job
-    # TODO: Idealmente, o Job deveria ter um campo composition_line_id ou permitir especificar
-    from app.models.composition_line import CompositionLine
-    
-    job_to_composition_line = {}
+    # Composition line de cada job (a de menor id que produz o produto), com uma única query
+    job_to_composition_line = resolve_job_composition_lines(db, jobs_data)
     for job in jobs_data:
-        # Busca a primeira composition_line que tem o produto do job
-        # Assumindo que o job tem um produto, precisamos encontrar uma composition_line com esse produto
-        composition_line = db.query(CompositionLine).filter_by(
-            product_id=job.fk_id_product
-        ).first()
-        if not composition_line:
+        if job.id not in job_to_composition_line:
             raise HTTPException(
                 status_code=404, 
                 detail=f"Nenhuma composition line encontrada para o produto {job.product.name}"
             )
-        job_to_composition_line[job.id] = composition_line.id
-    
-    setup_time = np.zeros((len(jobs_data), len(jobs_data)), dtype=float)
-    setups_faltando = []
-
-    for i, job_i in enumerate(jobs_data):
-        for j, job_j in enumerate(jobs_data):
-            if i != j:
-                from_cl_id = job_to_composition_line[job_i.id]
-                to_cl_id = job_to_composition_line[job_j.id]
-                
-                setup = db.query(Setup).filter_by(
-                    from_composition_line_id=from_cl_id,
-                    to_composition_line_id=to_cl_id
-                ).first()
-                if setup:
-                    setup_time[i][j] = math.ceil((setup.setup_time / 3600) * 10) / 10
-                else:
-                    from_cl = db.query(CompositionLine).options(
-                        joinedload(CompositionLine.mold),
-                        joinedload(CompositionLine.product)
-                    ).get(from_cl_id)
-                    to_cl = db.query(CompositionLine).options(
-                        joinedload(CompositionLine.mold),
-                        joinedload(CompositionLine.product)
-                    ).get(to_cl_id)
-                    from_label = f"M{from_cl.mold_id}-{from_cl.product.name}" if from_cl else f"Produto {job_i.product.name}"
-                    to_label = f"M{to_cl.mold_id}-{to_cl.product.name}" if to_cl else f"Produto {job_j.product.name}"
-                    setups_faltando.append(f"{from_label} ➜ {to_label}")
 
-    if setups_faltando:
+    if not has_working_shifts(db):
+        raise HTTPException(
+            status_code=400,
+            detail="Nenhum turno de trabalho cadastrado: todos os dias estão sem trabalho (turnos regulares)",
+        )
+
+    # Tempos de ciclo, refugo e pós-injeção do índice em memória (app/utils/cycle_time_index.py)
+    index = get_cycle_time_index(db)
+    composition_lines = [job_to_composition_line[job.id] for job in jobs_data]
+    piece_cycles = [index.bottleneck_piece_cycle(cl) for cl in composition_lines]
+    sem_ciclo = [job.id for job, cycle in zip(jobs_data, piece_cycles) if cycle is None]
+    if sem_ciclo:
         raise HTTPException(status_code=400, detail={
-            "erro": "Faltam setups cadastrados entre os seguintes produtos:",
-            "faltantes": setups_faltando
+            "erro": "Jobs sem máquina com tempo de ciclo cadastrado:",
+            "faltantes": sem_ciclo,
         })
 
-    model = LpProblem("Sequenciamento_Produção", LpMinimize)
-    start = LpVariable.dicts("inicio", jobs, lowBound=0)
-    early = LpVariable.dicts("antecipacao", jobs, lowBound=0)
-    tardy = LpVariable.dicts("atraso", jobs, lowBound=0)
-    x = LpVariable.dicts("setup", [(i, j) for i in jobs for j in jobs if i != j], cat=LpBinary)
-
-    model += lpSum(weight[i] * tardy[i] for i in jobs)
-    M = 10000
-
-    for i in jobs:
-        for j in jobs:
-            if i != j:
-                model += start[j] - start[i] - (M + setup_time[i][j]) * x[(i, j)] >= processing_time[i] - M
-                model += x[(i, j)] + x[(j, i)] == 1
-
-    for i in jobs:
-        model += start[i] + processing_time[i] - tardy[i] + early[i] == due_time[i]
-
-    executor = ThreadPoolExecutor(max_workers=1)
+    processing_time, due_time, post_bottleneck_times = batch_processing_times(
+        demand=[job.demand for job in jobs_data],
+        scrap_percent=[index.scrap_percent(cl.mold_id) for cl in composition_lines],
+        cycle_s=piece_cycles,
+        post_cycle_s=[index.post_cycle[cl.id] for cl in composition_lines],
+        machine_availability=machine_availability,
+        promised_date=[job.promised_date for job in jobs_data],
+        sequencing_date=sequencing_date,
+        # Prazos em horas de trabalho: turnos regulares e feriados (app/utils/working_calendar.py)
+        calendar=get_working_calendar(db, sequencing_date, max(job.promised_date for job in jobs_data)),
+    )
 
-    user_id = str(jobs_data[0].client.id)
+    # O término dos jobs precisa caber no calendário (convertido em datas ao salvar o run); checado antes do solve
+    try:
+        get_working_calendar(
+            db, sequencing_date, max(job.promised_date for job in jobs_data), min_hours=float(processing_time.sum())
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
+    # Matriz de setup carregada com uma única query (ver app/utils/setup_matrix.py)
+    setup_time, setups_faltando = build_job_setup_times(db, jobs_data, job_to_composition_line)
 
-    if is_processing(user_id):
-        raise HTTPException(status_code=409, detail="Já existe um sequenciamento em andamento.")
+    if setups_faltando:
+        raise HTTPException(status_code=400, detail={
+            "erro": "Faltam setups cadastrados entre os seguintes produtos:",
+            "faltantes": setups_faltando
+        })
 
-    set_processing(user_id, True)
-    await send_event(user_id, True)
+    return {
+        "jobs_data": jobs_data,
+        "processing_time": processing_time.tolist(),
+        "due_time": due_time.tolist(),
+        "weight": weight,
+        "post_bottleneck_times": post_bottleneck_times.tolist(),
+        "setup_time": setup_time.tolist(),
+        "composition_line_ids": [cl.id for cl in composition_lines],
+    }
 
-    def resolver_modelo(modelo):
-        solver = PULP_CBC_CMD(msg=True, timeLimit=3600)
-        modelo.solve(solver)
-        return modelo
 
-    model = await asyncio.get_event_loop().run_in_executor(executor, resolver_modelo, model)
+def persist_sequencing(
+    db: Session,
+    sequencing_date: datetime,
+    prepared: dict,
+    solution: dict,
+    machine_availability: Optional[int] = None,
+    base_run_id: Optional[int] = None,
+):
+    """
+    Grava o resultado do solver (run + resultados) e monta a resposta da rota.
+    O setup de entrada de cada job vem de `solution["setup_in"]` (por índice
+    de job) ou da matriz `prepared["setup_time"]`.
+    """
+    jobs_data = prepared["jobs_data"]
+    jobs_ordenados = solution["order"]
+    start, tardy = solution["start"], solution["tardy"]
+
+    setup_in = solution.get("setup_in")
+    if setup_in is None:
+        setup_time = prepared["setup_time"]
+        setup_in = [0.0] * len(jobs_data)
+        for anterior, i in zip(jobs_ordenados, jobs_ordenados[1:]):
+            setup_in[i] = setup_time[anterior][i]
 
-    jobs_ordenados = sorted(jobs, key=lambda i: value(start[i]))
     resultado = []
-
     for posicao, i in enumerate(jobs_ordenados):
         resultado.append({
             "job_id": jobs_data[i].id,
             "ordem": posicao + 1,
-            "inicio_h": round(value(start[i]), 2),
-            "atraso_h": round(value(tardy[i]), 2),
+            "inicio_h": round(start[i], 2),
+            "atraso_h": round(tardy[i], 2),
             "produto": jobs_data[i].product.name,
             "cliente": jobs_data[i].client.name,
         })
 
+    # Jobs sequenciados são mantidos (para re-sequenciamento incremental) e marcados como processados;
+    # gravados no mesmo commit do run (sem expirar os jobs antes de salvar os resultados)
     for job in jobs_data:
-        db.delete(job)
-    db.commit()
+        job.processed = True
 
     run_saved = save_solver_result_to_db(
         db=db,
@@ -218,30 +228,437 @@ async def solve_jobs(
         jobs_data=jobs_data,
         ordem_execucao=jobs_ordenados,
         start=start,
-        processing_time=processing_time,
-        bottleneck_times=post_bottleneck_times,
-        setup_count=len(jobs),
-        optimized_setups=sum(
-            1 for i in range(len(jobs_ordenados) - 1)
-            if setup_time[jobs_ordenados[i]][jobs_ordenados[i + 1]] > 0
+        processing_time=prepared["processing_time"],
+        bottleneck_times=prepared["post_bottleneck_times"],
+        setup_count=len(jobs_data),
+        optimized_setups=sum(1 for i in jobs_ordenados[1:] if setup_in[i] > 0),
+        due_time=prepared["due_time"],
+        weight=prepared["weight"],
+        setup_in=setup_in,
+        composition_line_ids=prepared["composition_line_ids"],
+        machine_availability=machine_availability,
+        base_run_id=base_run_id,
+    )
+
+    response = {
+        "sequencing_date": sequencing_date.isoformat(),
+        "sequencia": resultado,
+        "objective_value": solution["objective_value"],
+        "model": solution["model"],
+        "heuristic": solution["heuristic"],
+    }
+    return response, run_saved
+
+
+def _rolling_options(rolling_window: Optional[int], rolling_overlap: int, window_time_limit: int) -> Optional[dict]:
+    if rolling_window is None:
+        return None
+    if rolling_overlap >= rolling_window:
+        raise HTTPException(status_code=400, detail="rolling_overlap deve ser menor que rolling_window")
+    return {"window_size": rolling_window, "overlap": rolling_overlap, "window_time_limit": window_time_limit}
+
+
+def _solve_prepared(
+    prepared: dict,
+    formulation: str,
+    warm_start: bool,
+    options: SolverOptions,
+    rolling: Optional[dict] = None,
+    on_progress: Optional[Callable[[dict], None]] = None,
+    task_id: Optional[int] = None,
+) -> dict:
+    """
+    Envia só os dados do modelo (sem objetos ORM) para o pool de processos.
+    `on_progress` recebe o progresso do solver lido do log durante o solve;
+    com `task_id`, o solve pode ser parado por POST /tasks/{task_id}/stop.
+    """
+    with track_solver_progress(options, on_progress) as options, running_solve(task_id, options.log_dir):
+        return _run_prepared(prepared, formulation, warm_start, options, rolling)
+
+
+def _run_prepared(prepared: dict, formulation: str, warm_start: bool, options: SolverOptions, rolling: Optional[dict]):
+    if rolling is not None:
+        # Janelas montadas por data prometida
+        jobs_data = prepared["jobs_data"]
+        return run_solver(
+            solve_rolling_horizon,
+            prepared["processing_time"],
+            prepared["due_time"],
+            prepared["weight"],
+            prepared["setup_time"],
+            release_order=sorted(range(len(jobs_data)), key=lambda i: jobs_data[i].promised_date),
+            formulation=formulation,
+            warm_start=warm_start,
+            options=options,
+            **rolling,
         )
+    return run_solver(
+        solve_sequencing_problem,
+        prepared["processing_time"],
+        prepared["due_time"],
+        prepared["weight"],
+        prepared["setup_time"],
+        formulation=formulation,
+        warm_start=warm_start,
+        options=options,
     )
 
-    await send_event(user_id, "Sequenciamento finalizado.")
-    await send_event(user_id, False)
-    set_processing(user_id, False)
 
-    return {
+def _lookup_solution(
+    db: Session,
+    prepared: dict,
+    formulation: str,
+    warm_start: bool,
+    use_cache: bool,
+    options: SolverOptions,
+    rolling: Optional[dict] = None,
+):
+    """Chave do problema no cache de resultados e, se houver, a solução já calculada."""
+    # Threads e diretório de log não alteram o problema; as demais opções do solver sim
+    solver_key = {key: value for key, value in options.to_dict().items() if key not in ("threads", "log_dir")}
+    fingerprint = problem_fingerprint(
+        "sequenciamento",
+        {key: prepared[key] for key in ("processing_time", "due_time", "weight", "setup_time")},
+        {"formulation": formulation, "warm_start": warm_start, "solver": solver_key, "rolling": rolling},
+    )
+    if not use_cache:
+        return None, {"hit": False, "fingerprint": fingerprint}
+    return get_cached_result(db, fingerprint)
+
+
+@router.post("/solve")
+async def solve_jobs(
+    job_ids: list[int],
+    sequencing_date: datetime = Query(..., description="Data e hora de início do sequenciamento"),
+    machine_availability: int = Query(default=100, ge=1, le=100),
+    include_processed: bool = Query(default=False, description="Permite jobs já sequenciados (que estão em outro run)"),
+    formulation: Literal["bigm", "precedence"] = Query(
+        default="bigm",
+        description="Formulação do modelo: 'bigm' (original) ou 'precedence' (M ajustado por par)",
+    ),
+    warm_start: bool = Query(
+        default=True,
+        description="Gera uma solução inicial (ATCS + busca local) e envia ao CBC como MIP start",
+    ),
+    backend: Literal["cbc", "highs"] = Query(default=DEFAULT_BACKEND, description="Solver MIP: 'cbc' ou 'highs'"),
+    threads: int = Query(default=SOLVER_THREADS, ge=1, le=64, description="Threads do solver"),
+    gap_rel: Optional[float] = Query(default=None, ge=0, le=1, description="Gap relativo para encerrar o solve"),
+    presolve: bool = Query(default=True, description="Presolve do solver"),
+    use_cache: bool = Query(default=True, description="Reaproveita a solução de um problema idêntico já resolvido"),
+    rolling_window: Optional[int] = Query(
+        default=None, ge=2, le=200,
+        description="Horizonte rolante: jobs por janela (por data prometida). Omitido = modelo completo",
+    ),
+    rolling_overlap: int = Query(default=4, ge=0, description="Jobs da janela reabertos na janela seguinte"),
+    window_time_limit: int = Query(default=10, ge=1, le=3600, description="Tempo limite (s) por janela"),
+    db: Session = Depends(get_db),
+):
+    rolling = _rolling_options(rolling_window, rolling_overlap, window_time_limit)
+    options = SolverOptions(backend=backend, threads=threads, gap_rel=gap_rel, presolve=presolve)
+    prepared = prepare_sequencing(db, job_ids, sequencing_date, machine_availability, include_processed)
+
+    user_id = str(prepared["jobs_data"][0].client.id)
+
+    # Trava compartilhada entre workers (app/utils/event_broker.py)
+    if not await acquire_processing(user_id):
+        raise HTTPException(status_code=409, detail="Já existe um sequenciamento em andamento.")
+
+    await send_event(user_id, True)
+
+    try:
+        solution, cache_info = _lookup_solution(db, prepared, formulation, warm_start, use_cache, options, rolling)
+        if solution is None:
+            # Pool compartilhado com a fila de tarefas (app/utils/task_queue.py);
+            # o progresso do solver vai para o stream SSE do usuário
+            loop = asyncio.get_running_loop()
+            solution = await loop.run_in_executor(
+                solver_executor,
+                partial(
+                    _solve_prepared, prepared, formulation, warm_start, options, rolling,
+                    on_progress=progress_notifier(loop, user_id),
+                ),
+            )
+            store_result(db, cache_info["fingerprint"], "sequenciamento", solution)
+        response, _ = persist_sequencing(db, sequencing_date, prepared, solution, machine_availability)
+        response["cache"] = cache_info
+    finally:
+        await send_event(user_id, "Sequenciamento finalizado.")
+        await send_event(user_id, False)
+        await release_processing(user_id)
+
+    return response
+
+
+@router.post("/tasks", status_code=202)
+async def submit_solve_task(
+    job_ids: list[int],
+    sequencing_date: datetime = Query(..., description="Data e hora de início do sequenciamento"),
+    machine_availability: int = Query(default=100, ge=1, le=100),
+    include_processed: bool = Query(default=False, description="Permite jobs já sequenciados (que estão em outro run)"),
+    formulation: Literal["bigm", "precedence"] = Query(default="bigm"),
+    warm_start: bool = Query(default=True),
+    backend: Literal["cbc", "highs"] = Query(default=DEFAULT_BACKEND, description="Solver MIP: 'cbc' ou 'highs'"),
+    threads: int = Query(default=SOLVER_THREADS, ge=1, le=64, description="Threads do solver"),
+    gap_rel: Optional[float] = Query(default=None, ge=0, le=1, description="Gap relativo para encerrar o solve"),
+    presolve: bool = Query(default=True, description="Presolve do solver"),
+    use_cache: bool = Query(default=True),
+    rolling_window: Optional[int] = Query(
+        default=None, ge=2, le=200,
+        description="Horizonte rolante: jobs por janela (por data prometida). Omitido = modelo completo",
+    ),
+    rolling_overlap: int = Query(default=4, ge=0, description="Jobs da janela reabertos na janela seguinte"),
+    window_time_limit: int = Query(default=10, ge=1, le=3600, description="Tempo limite (s) por janela"),
+    user_id: Optional[str] = Query(
+        default=None,
+        description="Usuário do stream SSE notificado quando a tarefa muda de status e com o progresso do solver",
+    ),
+    db: Session = Depends(get_db),
+):
+    """
+    Mesmo sequenciamento de /solve, mas executado na fila de tarefas:
+    retorna o id da tarefa imediatamente. Acompanhe por GET /tasks/{task_id}.
+    """
+    if not job_ids:
+        raise HTTPException(status_code=400, detail="Informe ao menos um job")
+    rolling = _rolling_options(rolling_window, rolling_overlap, window_time_limit)
+    options = SolverOptions(backend=backend, threads=threads, gap_rel=gap_rel, presolve=presolve)
+
+    params = {
+        "job_ids": job_ids,
         "sequencing_date": sequencing_date.isoformat(),
-        "sequencia": resultado,
-        "objective_value": value(model.objective)
+        "machine_availability": machine_availability,
+        "include_processed": include_processed,
+        "formulation": formulation,
+        "warm_start": warm_start,
+        "solver": options.to_dict(),
+        "rolling": rolling,
     }
 
+    loop = asyncio.get_running_loop()
 
-@router.post("/injetoras/solve")
-async def solve_injetoras(request: InjetorasRequest | None = Body(default=None)):
-    if request is None:
-        request = InjetorasRequest()
+    def work(task_db: Session, task: SolveTask):
+        prepared = prepare_sequencing(task_db, job_ids, sequencing_date, machine_availability, include_processed)
+        solution, cache_info = _lookup_solution(task_db, prepared, formulation, warm_start, use_cache, options, rolling)
+        if solution is None:
+            solution = _solve_prepared(
+                prepared, formulation, warm_start, options, rolling,
+                on_progress=progress_notifier(loop, user_id, task_id=task.id),
+                task_id=task.id,
+            )
+            # Solução de um solve parado antes do fim não vai para o cache
+            if not solution["model"].get("stopped"):
+                store_result(task_db, cache_info["fingerprint"], "sequenciamento", solution)
+        if is_cancel_requested(task_db, task.id):
+            raise TaskCancelled()
+        response, run = persist_sequencing(task_db, sequencing_date, prepared, solution, machine_availability)
+        response["cache"] = cache_info
+        return response, run.id
+
+    task = submit_task(db, "sequenciamento", params, work, user_id=user_id)
+    return {"task_id": task.id, "status": task.status}
+
+
+@router.get("/tasks/{task_id}", response_model=SolveTaskResponse)
+def get_solve_task(task_id: int, db: Session = Depends(get_db)):
+    task = db.query(SolveTask).get(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Tarefa não encontrada")
+    return task_to_dict(task)
+
+
+@router.post("/tasks/{task_id}/cancel", response_model=SolveTaskResponse)
+def cancel_solve_task(task_id: int, db: Session = Depends(get_db)):
+    task = db.query(SolveTask).get(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Tarefa não encontrada")
+    if task.status not in ("pending", "running"):
+        raise HTTPException(status_code=409, detail=f"Tarefa já finalizada ({task.status})")
+    return task_to_dict(cancel_task(db, task))
+
+
+@router.post("/tasks/{task_id}/stop", response_model=SolveTaskResponse)
+def stop_solve_task(task_id: int, db: Session = Depends(get_db)):
+    """
+    Encerra o solver da tarefa antes do tempo limite (ex.: gap já aceitável)
+    e grava a melhor solução encontrada até agora, como em um solve completo.
+    Diferente de /cancel, que descarta o resultado.
+    """
+    task = db.query(SolveTask).get(task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Tarefa não encontrada")
+    if task.status != "running":
+        raise HTTPException(status_code=409, detail=f"Tarefa não está em execução ({task.status})")
+    return task_to_dict(stop_task(db, task))
+
+
+def _stored_model_data(run: ProductionScheduleRun, results: list[ProductionScheduleResult]) -> bool:
+    """Se o run guardou os dados do modelo de todos os jobs (runs antigos não guardam)."""
+    return run.machine_availability is not None and all(
+        result.composition_line_id is not None
+        and None not in (
+            result.start_hours, result.processing_hours, result.post_bottleneck_hours,
+            result.due_hours, result.weight, result.setup_hours,
+        )
+        for result in results
+    )
+
+
+@router.post("/runs/{run_id}/resequence")
+def resequence_run(
+    run_id: int,
+    delta: ResequenceRequest,
+    sequencing_date: Optional[datetime] = Query(
+        default=None, description="Data de início; padrão = início do sequenciamento original"
+    ),
+    machine_availability: int = Query(default=100, ge=1, le=100),
+    window: int = Query(default=4, ge=0, le=20, description="Posições reotimizadas ao redor de cada alteração"),
+    db: Session = Depends(get_db),
+):
+    """
+    Re-sequenciamento incremental de um sequenciamento salvo: remove e insere
+    jobs (best insertion) e reotimiza só uma janela ao redor das alterações
+    (algorithm/repair.py), sem resolver o modelo completo. Gera um novo run.
+
+    Com a mesma data de início e disponibilidade do run, parte dos tempos
+    salvos no run (início, processamento, prazo, peso e setup de entrada) e
+    só prepara os jobs adicionados; os setups são consultados por par, sob
+    demanda, sem montar a matriz job x job. Vale para runs de máquina única
+    (/solve, /tasks); runs de /injetoras/from-jobs não são suportados.
+    """
+    run = db.query(ProductionScheduleRun).get(run_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="Sequenciamento não encontrado")
+
+    base_results = (
+        db.query(ProductionScheduleResult)
+        .filter(ProductionScheduleResult.run_id == run_id)
+        .order_by(ProductionScheduleResult.order_index)
+        .all()
+    )
+    base_job_ids = [result.job_id for result in base_results]
+    add_ids = list(dict.fromkeys(delta.add_job_ids))
+    remove_ids = set(delta.remove_job_ids)
+
+    scheduled = set(base_job_ids)
+    already_scheduled = [job_id for job_id in add_ids if job_id in scheduled]
+    if already_scheduled:
+        raise HTTPException(status_code=400, detail=f"Jobs já estão no sequenciamento: {already_scheduled}")
+    not_scheduled = sorted(remove_ids - scheduled)
+    if not_scheduled:
+        raise HTTPException(status_code=400, detail=f"Jobs não pertencem ao sequenciamento: {not_scheduled}")
+    if len(base_job_ids) + len(add_ids) == len(remove_ids):
+        raise HTTPException(status_code=400, detail="O sequenciamento ficaria sem jobs")
+
+    base_jobs = {
+        job.id: job for job in db.query(Job).options(
+            selectinload(Job.client), selectinload(Job.product)
+        ).filter(Job.id.in_(base_job_ids))
+    }
+    if len(base_jobs) != len(base_job_ids):
+        raise HTTPException(
+            status_code=409,
+            detail="Os jobs deste sequenciamento não existem mais; resolva novamente por /solve",
+        )
+
+    sequencing_date = sequencing_date or run.sequencing_start
+    reuse = (
+        sequencing_date == run.sequencing_start
+        and machine_availability == run.machine_availability
+        and _stored_model_data(run, base_results)
+    )
+
+    if reuse:
+        # Jobs da sequência salva (índices 0..n-1) seguidos dos adicionados
+        model = {
+            "jobs_data": [base_jobs[job_id] for job_id in base_job_ids],
+            "processing_time": [result.processing_hours for result in base_results],
+            "due_time": [result.due_hours for result in base_results],
+            "weight": [result.weight for result in base_results],
+            "post_bottleneck_times": [result.post_bottleneck_hours for result in base_results],
+            "composition_line_ids": [result.composition_line_id for result in base_results],
+        }
+        if add_ids:
+            added = prepare_sequencing(db, add_ids, sequencing_date, machine_availability)
+            for key in model:
+                model[key] = model[key] + list(added[key])
+        index = {job.id: i for i, job in enumerate(model["jobs_data"])}
+
+        composition_lines = {
+            cl.id: cl for cl in db.query(CompositionLine).filter(
+                CompositionLine.id.in_(set(model["composition_line_ids"]))
+            )
+        }
+        job_composition_lines = [composition_lines[cl_id] for cl_id in model["composition_line_ids"]]
+        setup = job_setup_lookup(db, job_composition_lines)
+        start = [result.start_hours for result in base_results]
+        setup_in = [result.setup_hours for result in base_results]
+    else:
+        # Run antigo ou outra data/disponibilidade: tempos recalculados para todos os jobs
+        model = prepare_sequencing(
+            db, base_job_ids + add_ids, sequencing_date, machine_availability, include_processed=True
+        )
+        index = {job.id: i for i, job in enumerate(model["jobs_data"])}
+        _reject_processed([model["jobs_data"][index[job_id]] for job_id in add_ids])
+        setup, start, setup_in = model["setup_time"], None, None
+
+    try:
+        repair = repair_sequence(
+            [index[job_id] for job_id in base_job_ids],
+            added=[index[job_id] for job_id in add_ids],
+            removed=[index[job_id] for job_id in remove_ids],
+            processing_time=model["processing_time"],
+            due_time=model["due_time"],
+            weight=model["weight"],
+            setup=setup,
+            window=window,
+            start=start,
+            setup_in=setup_in,
+        )
+    except MissingSetupError as exc:
+        raise HTTPException(status_code=400, detail={
+            "erro": "Faltam setups cadastrados entre os seguintes produtos:",
+            "faltantes": list(dict.fromkeys(
+                f"{composition_line_label(job_composition_lines[i])} ➜ "
+                f"{composition_line_label(job_composition_lines[j])}"
+                for i, j in exc.pairs
+            )),
+        })
+
+    for insertion in repair["insertions"]:
+        insertion["job"] = model["jobs_data"][insertion["job"]].id
+
+    # Dados restritos aos jobs que ficaram, na ordem da nova sequência
+    sequence = repair.pop("sequence")
+    subset = {
+        key: [model[key][i] for i in sequence]
+        for key in ("jobs_data", "processing_time", "due_time", "weight", "post_bottleneck_times", "composition_line_ids")
+    }
+    start = repair.pop("start")
+    completion = np.asarray(start) + np.asarray(subset["processing_time"], dtype=float)
+    solution = {
+        "order": list(range(len(sequence))),
+        "start": start,
+        "setup_in": repair.pop("setup_in"),
+        "tardy": np.maximum(completion - np.asarray(subset["due_time"], dtype=float), 0.0).tolist(),
+        "objective_value": repair["objective"],
+        "model": {"method": "incremental", "reused_run_data": reuse},
+        "heuristic": None,
+    }
+
+    # Jobs removidos voltam para a fila de jobs a sequenciar
+    for job_id in remove_ids:
+        base_jobs[job_id].processed = False
+
+    response, new_run = persist_sequencing(
+        db, sequencing_date, subset, solution, machine_availability, base_run_id=run_id
+    )
+    response["base_run_id"] = run_id
+    response["run_id"] = new_run.id
+    response["repair"] = repair
+    return response
+
+
+def _injetoras_maps(request: InjetorasRequest):
     processing_map = (
         {(entry.job, entry.machine): entry.time for entry in request.processing}
         if request.processing else None
@@ -258,17 +675,10 @@ async def solve_injetoras(request: InjetorasRequest | None = Body(default=None))
         {(entry.predecessor, entry.successor, entry.machine): entry.time for entry in request.setup}
         if request.setup else None
     )
+    return processing_map, due_map, priority_map, setup_map
 
-    status, obj_value, sequences, completion, tardiness = solve_injection_scheduling(
-        jobs=request.jobs,
-        machines=request.machines,
-        processing=processing_map,
-        due=due_map,
-        priority=priority_map,
-        setup3=setup_map,
-        dummy=request.dummy,
-    )
 
+def _injetoras_payload(status, obj_value, sequences, completion, tardiness) -> dict:
     completion_payload = [
         {
             "job": job,
@@ -290,3 +700,278 @@ async def solve_injetoras(request: InjetorasRequest | None = Body(default=None))
         "completion": completion_payload,
         "tardiness": tardiness_payload,
     }
+
+
+def _injetoras_fingerprint(jobs, machines, processing, due, priority, setup3, dummy) -> str:
+    return problem_fingerprint("injetoras", {
+        "jobs": jobs,
+        "machines": machines,
+        "processing": processing,
+        "due": due,
+        "priority": priority,
+        "setup": setup3,
+        "dummy": dummy,
+    })
+
+
+@router.post("/injetoras/solve")
+async def solve_injetoras(
+    request: InjetorasRequest | None = Body(default=None),
+    use_cache: bool = Query(default=True, description="Reaproveita a solução de um problema idêntico já resolvido"),
+    db: Session = Depends(get_db),
+):
+    if request is None:
+        request = InjetorasRequest()
+    processing_map, due_map, priority_map, setup_map = _injetoras_maps(request)
+
+    fingerprint = _injetoras_fingerprint(
+        request.jobs, request.machines, processing_map, due_map, priority_map, setup_map, request.dummy
+    )
+    if use_cache:
+        payload, cache_info = get_cached_result(db, fingerprint)
+        if payload is not None:
+            payload["cache"] = cache_info
+            return payload
+
+    # Modelo construído e resolvido no pool de processos (app/utils/task_queue.py)
+    result = await asyncio.get_running_loop().run_in_executor(
+        solver_executor,
+        partial(
+            run_solver,
+            solve_injection_problem,
+            jobs=request.jobs,
+            machines=request.machines,
+            processing=processing_map,
+            due=due_map,
+            priority=priority_map,
+            setup3=setup_map,
+            dummy=request.dummy,
+        ),
+    )
+
+    payload = _injetoras_payload(
+        result["status"], result["objective_value"], result["sequences"],
+        result["completion"], result["tardiness"],
+    )
+    store_result(db, fingerprint, "injetoras", payload)
+    payload["cache"] = {"hit": False, "fingerprint": fingerprint}
+    return payload
+
+
+def _merge_injetoras_payloads(payloads: list[dict]) -> dict:
+    """Junta as respostas dos subproblemas (conjuntos de máquinas disjuntos) em uma só."""
+    statuses = [payload["status"] for payload in payloads]
+    objectives = [payload["objective_value"] for payload in payloads]
+    return {
+        "status": next((status for status in statuses if status != "Optimal"), "Optimal"),
+        "objective_value": None if None in objectives else sum(objectives),
+        "sequences": {
+            machine: seq for payload in payloads for machine, seq in payload["sequences"].items()
+        },
+        "completion": [entry for payload in payloads for entry in payload["completion"]],
+        "tardiness": [entry for payload in payloads for entry in payload["tardiness"]],
+    }
+
+
+def _injetoras_from_jobs_subproblems(db: Session, request: InjetorasFromJobsRequest, include_processed: bool, use_cache: bool):
+    """
+    Carrega os jobs, monta os subproblemas por grupo de linhas e consulta o
+    cache de cada um. Síncrona (banco e montagem densa de `setup3`): roda
+    fora do event loop.
+    """
+    jobs_data = db.query(Job).options(
+        selectinload(Job.client), selectinload(Job.product)
+    ).filter(Job.id.in_(request.job_ids)).all()
+    if len(jobs_data) != len(set(request.job_ids)):
+        raise HTTPException(status_code=404, detail="Algum job não foi encontrado")
+    if not include_processed:
+        _reject_processed(jobs_data)
+
+    try:
+        subproblems = build_line_subproblems(db, jobs_data, request.sequencing_date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    payloads, cache_infos = {}, {}
+    for k, sub in enumerate(subproblems):
+        fingerprint = _injetoras_fingerprint(
+            sub["jobs"], sub["machines"], sub["processing"], sub["due"], sub["priority"], sub["setup3"], sub["dummy"]
+        )
+        cached, cache_infos[k] = (
+            get_cached_result(db, fingerprint) if use_cache else (None, {"hit": False, "fingerprint": fingerprint})
+        )
+        if cached is not None:
+            payloads[k] = cached
+    return jobs_data, subproblems, payloads, cache_infos
+
+
+def _save_injetoras_from_jobs(
+    db: Session,
+    request: InjetorasFromJobsRequest,
+    jobs_data: list[Job],
+    subproblems: list[dict],
+    payloads: dict,
+    cache_infos: dict,
+    solved: list[int],
+) -> dict:
+    """Grava no cache os subproblemas resolvidos agora, une as respostas e grava o run (fora do event loop)."""
+    for k in solved:
+        store_result(db, cache_infos[k]["fingerprint"], "injetoras", payloads[k])
+
+    ordered = [payloads[k] for k in range(len(subproblems))]
+    response = _merge_injetoras_payloads(ordered)
+    response["lines"] = [
+        {
+            "production_line_ids": sub["production_line_ids"],
+            "jobs": len(sub["jobs"]),
+            "machines": sub["machines"],
+            "status": payload["status"],
+            "objective_value": payload["objective_value"],
+            "cache": cache_infos[k],
+        }
+        for k, (sub, payload) in enumerate(zip(subproblems, ordered))
+    ]
+
+    # Um único run com todas as linhas: início de cada job na máquina em que foi alocado
+    processing = {key: value for sub in subproblems for key, value in sub["processing"].items()}
+    setup3 = {key: value for sub in subproblems for key, value in sub["setup3"].items()}
+    completion = {(entry["job"], int(entry["machine"])): entry["completion_time"] for entry in response["completion"]}
+    jobs_by_id = {job.id: job for job in jobs_data}
+    assigned, optimized_setups = [], 0
+    for machine, seq in response["sequences"].items():
+        seq = [job_id for job_id in seq if job_id in jobs_by_id]
+        optimized_setups += sum(1 for a, b in zip(seq, seq[1:]) if setup3.get((a, b, int(machine)), 0) > 0)
+        assigned.extend((job_id, int(machine)) for job_id in seq)
+
+    if not assigned:
+        response["run_id"] = None
+        return response
+
+    run_jobs = [jobs_by_id[job_id] for job_id, _ in assigned]
+    run_processing = [processing[key] for key in assigned]
+    run_start = [completion[key] - processing[key] for key in assigned]
+    for job in run_jobs:
+        job.processed = True
+    # Sem dados do modelo por job: o run é multi-máquina e não é re-sequenciável por /runs/{id}/resequence
+    run = save_solver_result_to_db(
+        db=db,
+        sequencing_date=request.sequencing_date,
+        jobs_data=run_jobs,
+        ordem_execucao=sorted(range(len(assigned)), key=lambda i: run_start[i]),
+        start=run_start,
+        processing_time=run_processing,
+        bottleneck_times=[0.0] * len(assigned),
+        setup_count=len(assigned),
+        optimized_setups=optimized_setups,
+    )
+
+    response["run_id"] = run.id
+    return response
+
+
+@router.post("/injetoras/from-jobs")
+async def solve_injetoras_from_jobs(
+    request: InjetorasFromJobsRequest,
+    use_cache: bool = Query(default=True, description="Reaproveita a solução de subproblemas idênticos já resolvidos"),
+    include_processed: bool = Query(default=False, description="Permite jobs já sequenciados (que estão em outro run)"),
+    db: Session = Depends(get_db),
+):
+    """
+    Sequenciamento de injetoras a partir dos jobs do banco. Os jobs são
+    agrupados por linha de produção (linhas sem máquinas em comum são
+    independentes), cada grupo é resolvido em paralelo no pool de processos
+    e as sequências são unidas em uma única resposta e um único run.
+
+    Banco, montagem dos subproblemas e gravação rodam no threadpool; o event
+    loop só aguarda os solves. O run gravado é multi-máquina e não guarda os
+    dados do modelo por job: /runs/{id}/resequence (máquina única) não se
+    aplica a ele.
+    """
+    if request.machine_states:
+        raise HTTPException(status_code=400, detail="machine_states ainda não é suportado nesta rota")
+
+    jobs_data, subproblems, payloads, cache_infos = await run_in_threadpool(
+        _injetoras_from_jobs_subproblems, db, request, include_processed, use_cache
+    )
+
+    pending = {
+        k: asyncio.wrap_future(submit_solver(
+            solve_injection_problem,
+            jobs=sub["jobs"],
+            machines=sub["machines"],
+            processing=sub["processing"],
+            due=sub["due"],
+            priority=sub["priority"],
+            setup3=sub["setup3"],
+            dummy=sub["dummy"],
+        ))
+        for k, sub in enumerate(subproblems)
+        if k not in payloads
+    }
+    for k, result in zip(pending, await asyncio.gather(*pending.values())):
+        payloads[k] = _injetoras_payload(
+            result["status"], result["objective_value"], result["sequences"],
+            result["completion"], result["tardiness"],
+        )
+
+    return await run_in_threadpool(
+        _save_injetoras_from_jobs, db, request, jobs_data, subproblems, payloads, cache_infos, list(pending)
+    )
+
+
+@router.post("/injetoras/heuristic")
+async def solve_injetoras_heuristic(
+    request: InjetorasRequest = Body(...),
+    time_budget: float = Query(default=10, gt=0, le=600, description="Tempo máximo de busca em segundos"),
+    seed: Optional[int] = Query(default=None, description="Semente do gerador aleatório (reprodutibilidade)"),
+    user_id: Optional[str] = Query(
+        default=None, description="Usuário do stream SSE que recebe o melhor objetivo a cada melhoria"
+    ),
+):
+    """
+    Sequenciamento de injetoras por simulated annealing (algorithm/metaheuristic.py),
+    para instâncias grandes demais para o modelo PuLP. Usa as mesmas entradas de
+    /injetoras/solve; a busca dura no máximo `time_budget` (mais a espera por um
+    processo livre no pool de solvers).
+    """
+    processing_map, due_map, priority_map, setup_map = _injetoras_maps(request)
+    if not request.jobs or not request.machines or not processing_map:
+        raise HTTPException(status_code=400, detail="Informe jobs, machines e processing")
+
+    loop = asyncio.get_running_loop()
+
+    def on_improvement(elapsed: float, best: float):
+        asyncio.run_coroutine_threadsafe(
+            send_event(user_id, {"elapsed_s": round(elapsed, 3), "best_objective": round(best, 4)}),
+            loop,
+        )
+
+    # Busca no pool de processos limitado (app/utils/task_queue.py), fora do GIL da API;
+    # as melhorias chegam ao stream SSE pelo arquivo de progresso
+    with track_heuristic_progress(on_improvement if user_id else None) as improvement_log:
+        try:
+            result = await asyncio.wrap_future(submit_solver(
+                solve_injection_heuristic,
+                jobs=request.jobs,
+                machines=request.machines,
+                processing=processing_map,
+                due=due_map or {},
+                priority=priority_map or {},
+                setup3=setup_map,
+                dummy=request.dummy,
+                time_budget=time_budget,
+                seed=seed,
+                on_improvement=improvement_log,
+            ))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    payload = _injetoras_payload(
+        result["status"], result["objective_value"], result["sequences"],
+        result["completion"], result["tardiness"],
+    )
+    payload["search"] = {
+        key: result[key]
+        for key in ("initial_objective", "iterations", "accepted_moves", "elapsed_s", "history")
+    }
+    return payload
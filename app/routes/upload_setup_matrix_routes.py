@@ -1,5 +1,6 @@
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
+import numpy as np
 import pandas as pd
 from io import BytesIO
 import traceback
@@ -8,23 +9,104 @@ from app.database import get_db
 from app.models.composition_line import CompositionLine
 from app.models.setup import Setup
 from sqlalchemy.orm import joinedload
+from app.routes.crud.setup_matrix_routes import generate_setup_name
+from app.utils.setup_matrix import composition_line_label
+from app.utils.setup_matrix_cache import invalidate_setup_matrix
+from app.utils.upsert import upsert_insert
 
 router = APIRouter(prefix="/upload")
 
+
+# Planilha em formato longo (só os pares cadastrados): uma linha por setup
+PAIR_COLUMNS = ["De", "Para", "Tempo"]
+
+
+def _parse_seconds(values: pd.Series) -> np.ndarray:
+    # Remove "(inv)" se existir
+    text = values.astype(str).str.replace(r"^\(inv\)", "", regex=True).str.strip()
+    return np.trunc(pd.to_numeric(text, errors="coerce").to_numpy(dtype=float))
+
+
+def _mirrored_entries(from_ids: np.ndarray, to_ids: np.ndarray, seconds: np.ndarray, order: np.ndarray) -> pd.DataFrame:
+    """
+    Entradas (from, to, seconds) com os espelhos: um tempo i → j vale também
+    para j → i. Quando os dois sentidos de um par estão preenchidos, vale o
+    que vem depois em `order` (mesma regra do cadastro célula a célula).
+    """
+    mirror = from_ids != to_ids
+    entries = pd.DataFrame({
+        "from_id": np.concatenate([from_ids, to_ids[mirror]]).astype(int),
+        "to_id": np.concatenate([to_ids, from_ids[mirror]]).astype(int),
+        "seconds": np.concatenate([seconds, seconds[mirror]]).astype(int),
+        "order": np.concatenate([order, order[mirror]]),
+    })
+    entries = entries.sort_values("order", kind="stable").drop_duplicates(["from_id", "to_id"], keep="last")
+    return entries.drop(columns="order")
+
+
+def _matrix_entries(df: pd.DataFrame, rotulos: list, rotulo_para_id: dict) -> tuple[pd.DataFrame, int]:
+    """
+    Matriz da planilha em formato longo (from, to, seconds), já com os
+    espelhos, na ordem de leitura por linhas. Retorna também o número de
+    células com tempo inválido.
+    """
+    n = len(rotulos)
+    matrix = df.reindex(index=rotulos)  # linha com o rótulo de cada coluna
+    matrix.index, matrix.columns = range(n), range(n)
+    long = matrix.reset_index(names="i").melt(id_vars="i", var_name="j", value_name="raw").dropna(subset=["raw"])
+
+    seconds = _parse_seconds(long["raw"])
+    invalid = int(np.isnan(seconds).sum())
+
+    ids = np.array([rotulo_para_id.get(rotulo, np.nan) for rotulo in rotulos], dtype=float)
+    i, j = long["i"].to_numpy(dtype=int), long["j"].to_numpy(dtype=int)
+    keep = ~np.isnan(seconds) & ~np.isnan(ids[i]) & ~np.isnan(ids[j])
+    i, j, seconds = i[keep], j[keep], seconds[keep]
+    return _mirrored_entries(ids[i], ids[j], seconds, i * n + j), invalid
+
+
+def _pair_entries(df: pd.DataFrame, rotulo_para_id: dict) -> tuple[pd.DataFrame, list, int]:
+    """
+    Planilha com uma linha por par (colunas De, Para, Tempo), para cadastrar
+    só as exceções aos tempos padrão da linha. Mesmas regras da matriz,
+    na ordem das linhas. Retorna as entradas, os rótulos lidos e o número
+    de tempos inválidos.
+    """
+    df = df.dropna(subset=["De", "Para", "Tempo"])
+    de = df["De"].astype(str).str.strip()
+    para = df["Para"].astype(str).str.strip()
+    rotulos = list(pd.unique(pd.concat([de, para])))
+
+    seconds = _parse_seconds(df["Tempo"])
+    invalid = int(np.isnan(seconds).sum())
+
+    from_ids = de.map(rotulo_para_id).to_numpy(dtype=float)
+    to_ids = para.map(rotulo_para_id).to_numpy(dtype=float)
+    keep = ~np.isnan(seconds) & ~np.isnan(from_ids) & ~np.isnan(to_ids)
+    order = np.arange(len(df))[keep]
+    return _mirrored_entries(from_ids[keep], to_ids[keep], seconds[keep], order), rotulos, invalid
+
+
 @router.post("/setup-matrix-xlsx")
 def upload_setup_matrix_xlsx(
     file: UploadFile = File(...),
+    dry_run: bool = Query(default=False, description="Só compara com o cadastro (criados, atualizados, inalterados), sem gravar"),
     db: Session = Depends(get_db)
 ):
+    """
+    Cadastra a matriz de setup da planilha (rótulos "M{id_mold}-{nome_produto}"
+    nas linhas e colunas, tempos em segundos) com um único upsert. Também
+    aceita uma linha por par, com as colunas De, Para e Tempo (só as exceções
+    aos tempos padrão da linha). Pares de composition lines de linhas de
+    produção diferentes são ignorados.
+    """
     try:
         contents = file.file.read()
-        df = pd.read_excel(BytesIO(contents), index_col=0)
-
-        print("DataFrame carregado:")
-        print(df)
-
-        rotulos = list(df.columns)
-        print(f"Composition lines detectadas: {rotulos}")
+        df = pd.read_excel(BytesIO(contents))
+        pairs = all(column in df.columns for column in PAIR_COLUMNS)
+        if not pairs:
+            df = df.set_index(df.columns[0])
+            rotulos = list(df.columns)
 
         # Mapeia os rótulos (formato "M{id_mold}-{nome_produto}") para os IDs das composition lines
         composition_lines_db = db.query(CompositionLine).options(
@@ -32,76 +114,72 @@ def upload_setup_matrix_xlsx(
             joinedload(CompositionLine.product)
         ).all()
         rotulo_para_id = {}
-        
+        production_line_of = {}
+        setup_name_of = {}
+
         for cl in composition_lines_db:
-            rotulo = f"M{cl.mold_id}-{cl.product.name}"
-            rotulo_para_id[rotulo] = cl.id
-
-        for i_rotulo in rotulos:
-            for j_rotulo in rotulos:
-                i_id = rotulo_para_id.get(i_rotulo)
-                j_id = rotulo_para_id.get(j_rotulo)
-
-                if i_id is None or j_id is None:
-                    print(f"Composition line não encontrada no banco: {i_rotulo} ou {j_rotulo}")
-                    continue
-
-                tempo_raw = df.loc[i_rotulo, j_rotulo]
-
-                if pd.isna(tempo_raw):
-                    continue
-
-                try:
-                    # Remove "(inv)" se existir
-                    if isinstance(tempo_raw, str) and tempo_raw.startswith("(inv)"):
-                        tempo_raw = tempo_raw.replace("(inv)", "").strip()
-                    tempo = int(float(tempo_raw))
-                except (ValueError, TypeError):
-                    print(f"Tempo inválido para {i_rotulo} → {j_rotulo}: {tempo_raw}")
-                    continue
-
-                print(f"{i_rotulo} → {j_rotulo} = {tempo} segundos")
-
-                # Cria ou atualiza o setup direto
-                setup = db.query(Setup).filter(
-                    Setup.from_composition_line_id == i_id,
-                    Setup.to_composition_line_id == j_id
-                ).first()
-
-                if setup:
-                    setup.setup_time = tempo  # Atualiza
-                    print(f"Setup atualizado: {i_rotulo} → {j_rotulo}")
-                else:
-                    db.add(Setup(
-                        from_composition_line_id=i_id,
-                        to_composition_line_id=j_id,
-                        setup_time=tempo
-                    ))
-                    print(f"Setup criado: {i_rotulo} → {j_rotulo}")
-
-                # Criar automaticamente o setup inverso (espelho) se não for o mesmo
-                # Se M1 → M3 = 60s, então M3 → M1 = 60s automaticamente
-                if i_id != j_id:  # Não criar espelho se for o mesmo
-                    inverse_setup = db.query(Setup).filter(
-                        Setup.from_composition_line_id == j_id,
-                        Setup.to_composition_line_id == i_id
-                    ).first()
-
-                    if inverse_setup:
-                        # Atualiza o inverso também
-                        inverse_setup.setup_time = tempo
-                        print(f"Setup inverso atualizado: {j_rotulo} → {i_rotulo}")
-                    else:
-                        # Cria o inverso automaticamente
-                        db.add(Setup(
-                            from_composition_line_id=j_id,
-                            to_composition_line_id=i_id,
-                            setup_time=tempo  # Mesmo tempo do setup direto
-                        ))
-                        print(f"Setup inverso criado automaticamente: {j_rotulo} → {i_rotulo}")
-
-        db.commit()
-        return {"message": "Setups cadastrados ou atualizados com sucesso."}
+            rotulo_para_id[composition_line_label(cl)] = cl.id
+            production_line_of[cl.id] = cl.production_line_id
+            setup_name_of[cl.id] = generate_setup_name(cl.mold.name, cl.product.name)
+
+        if pairs:
+            entries, rotulos, celulas_invalidas = _pair_entries(df, rotulo_para_id)
+        else:
+            entries, celulas_invalidas = _matrix_entries(df, rotulos, rotulo_para_id)
+        entries["production_line_id"] = entries["from_id"].map(production_line_of)
+        same_line = entries["production_line_id"] == entries["to_id"].map(production_line_of)
+        pares_entre_linhas = int((~same_line).sum())
+        entries = entries[same_line]
+
+        # Setups existentes carregados com uma única query
+        ids = list(set(rotulo_para_id.get(rotulo) for rotulo in rotulos) - {None})
+        existing = pd.DataFrame(
+            db.query(
+                Setup.production_line_id, Setup.from_composition_line_id, Setup.to_composition_line_id, Setup.setup_time
+            ).filter(
+                Setup.from_composition_line_id.in_(ids), Setup.to_composition_line_id.in_(ids)
+            ).all(),
+            columns=["production_line_id", "from_id", "to_id", "current"],
+        )
+        diff = entries.merge(existing, on=["production_line_id", "from_id", "to_id"], how="left")
+        created = diff["current"].isna()
+        changed = ~created & (diff["current"] != diff["seconds"])
+
+        writes = diff[created | changed]
+        if not dry_run and len(writes):
+            statement = upsert_insert(db, Setup)
+            statement = statement.on_conflict_do_update(
+                index_elements=[Setup.production_line_id, Setup.from_composition_line_id, Setup.to_composition_line_id],
+                set_={"setup_time": statement.excluded.setup_time},
+            )
+            db.execute(statement, [
+                {
+                    "production_line_id": int(production_line_id),
+                    "from_composition_line_id": int(from_id),
+                    "to_composition_line_id": int(to_id),
+                    "name": setup_name_of[from_id],
+                    "setup_time": int(seconds),
+                }
+                for production_line_id, from_id, to_id, seconds in writes[
+                    ["production_line_id", "from_id", "to_id", "seconds"]
+                ].itertuples(index=False)
+            ])
+            db.commit()
+            invalidate_setup_matrix(writes["production_line_id"].astype(int).tolist())
+
+        return {
+            "message": (
+                "Simulação: nenhum setup foi gravado." if dry_run
+                else "Setups cadastrados ou atualizados com sucesso."
+            ),
+            "dry_run": dry_run,
+            "criados": int(created.sum()),
+            "atualizados": int(changed.sum()),
+            "inalterados": int(len(diff) - created.sum() - changed.sum()),
+            "rotulos_nao_encontrados": [rotulo for rotulo in rotulos if rotulo not in rotulo_para_id],
+            "celulas_invalidas": celulas_invalidas,
+            "pares_entre_linhas": pares_entre_linhas,
+        }
 
     except Exception as e:
         traceback.print_exc()
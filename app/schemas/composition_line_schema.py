@@ -59,21 +59,21 @@ class CompositionLineResponse(CompositionLineBase):
     machines: List[MachineInfo] = Field(default=[], description="Machines in this composition line")
     
     @classmethod
-    def from_orm_with_relations(cls, composition_line_obj, db=None):
+    def from_orm_with_relations(cls, composition_line_obj, db=None, cycle_times=None):
         """Helper method to create response with related entities loaded.
-        Cycle time is retrieved from ProductionTime table."""
-        from app.models.production_time import ProductionTime
-        
+        Cycle time is retrieved from ProductionTime table: pass `cycle_times`
+        ((machine_id, product_id, mold_id) -> tempo_ciclo, see `fetch_cycle_times`)
+        when serializing many composition lines, otherwise it is loaded with one query."""
+        if cycle_times is None:
+            from app.utils.cycle_time_index import fetch_cycle_times
+            cycle_times = fetch_cycle_times(db, [composition_line_obj])
+
         machines = []
         for clm in composition_line_obj.machines:
-            # Get cycle time from ProductionTime based on machine, product, and mold
-            production_time = db.query(ProductionTime).filter(
-                ProductionTime.machine_id == clm.machine_id,
-                ProductionTime.product_id == composition_line_obj.product_id,
-                ProductionTime.mold_id == composition_line_obj.mold_id
-            ).first()
-            
-            cycle_time = production_time.tempo_ciclo if production_time else 0
+            # Cycle time from ProductionTime based on machine, product, and mold
+            cycle_time = cycle_times.get(
+                (clm.machine_id, composition_line_obj.product_id, composition_line_obj.mold_id), 0
+            )
             
             machines.append(
                 MachineInfo(
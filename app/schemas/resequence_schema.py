@@ -0,0 +1,6 @@
+from pydantic import BaseModel
+from typing import List
+
+class ResequenceRequest(BaseModel):
+    add_job_ids: List[int] = []
+    remove_job_ids: List[int] = []
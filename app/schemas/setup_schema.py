@@ -86,4 +86,13 @@ class SetupResumeResponse(BaseModel):
         from_attributes = True
 
 class SetupBatchUpdateRequest(BaseModel):
-    updates: List[SetupBatchUpdateItem]
\ No newline at end of file
+    updates: List[SetupBatchUpdateItem]
+class SetupDefaultUpdate(BaseModel):
+    same_mold_time: Optional[int] = Field(None, ge=0, description="Tempo padrão (s) de troca de produto no mesmo molde")
+    mold_change_time: Optional[int] = Field(None, ge=0, description="Tempo padrão (s) de troca de molde")
+
+class SetupDefaultResponse(SetupDefaultUpdate):
+    production_line_id: int
+
+    class Config:
+        from_attributes = True
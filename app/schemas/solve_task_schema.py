@@ -0,0 +1,21 @@
+from pydantic import BaseModel
+from datetime import datetime
+from typing import Any, Optional
+
+class SolveTaskResponse(BaseModel):
+    id: int
+    kind: str
+    user_id: Optional[str] = None
+    status: str
+    params: dict
+    result: Optional[Any] = None
+    error: Optional[Any] = None
+    cancel_requested: bool
+    stop_requested: bool = False
+    run_id: Optional[int] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
@@ -0,0 +1,151 @@
+"""
+Índice em memória dos dados de tempo de ciclo usados pelos solvers.
+
+Carrega de uma vez (só colunas, sem objetos ORM) os tempos de ciclo por
+(máquina, produto, molde) de `ProductionTime`, refugo e cavidades abertas
+de `Mold`, o ciclo pós-injeção e as máquinas de cada `CompositionLine` e a
+disponibilidade das máquinas. Os solvers consultam o índice em vez de
+fazer queries por job.
+
+O índice fica em cache no processo e é invalidado pelas rotas que alteram
+esses cadastros (`invalidate_cycle_time_index`). Como a invalidação só
+vale para o worker que recebeu a escrita, o cache também expira após
+CYCLE_INDEX_TTL segundos (padrão 300).
+"""
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Session
+
+from app.models.composition_line import CompositionLine
+from app.models.composition_line_machine import CompositionLineMachine
+from app.models.machine import Machine
+from app.models.mold import Mold
+from app.models.production_time import ProductionTime
+
+CYCLE_INDEX_TTL = float(os.getenv("CYCLE_INDEX_TTL", 300))
+
+
+@dataclass
+class CycleTimeIndex:
+    """
+    - cycle: (machine_id, product_id, mold_id) -> tempo de ciclo (s por injeção)
+    - molds: mold_id -> (refugo %, cavidades abertas)
+    - post_cycle: composition_line_id -> ciclo pós-injeção (s por peça)
+    - line_machines: composition_line_id -> máquinas da composition line
+    - availability: machine_id -> disponibilidade (%)
+    """
+    cycle: dict[tuple[int, int, int], int]
+    molds: dict[int, tuple[float, int]]
+    post_cycle: dict[int, int]
+    line_machines: dict[int, list[int]]
+    availability: dict[int, float]
+    loaded_at: float = field(default_factory=time.monotonic)
+
+    def scrap_percent(self, mold_id: int) -> float:
+        return self.molds[mold_id][0]
+
+    def open_cavities(self, mold_id: int) -> int:
+        return max(self.molds[mold_id][1], 1)
+
+    def machine_cycles(self, composition_line: CompositionLine) -> dict[int, int]:
+        """Tempo de ciclo (s por injeção) em cada máquina da composition line que tem cadastro."""
+        cycles = {}
+        for machine_id in self.line_machines.get(composition_line.id, ()):
+            cycle_s = self.cycle.get((machine_id, composition_line.product_id, composition_line.mold_id))
+            if cycle_s is not None:
+                cycles[machine_id] = cycle_s
+        return cycles
+
+    def bottleneck_piece_cycle(self, composition_line: CompositionLine) -> Optional[float]:
+        """
+        Segundos por peça na máquina mais lenta (gargalo) da composition line:
+        tempo de ciclo / cavidades abertas. None se nenhuma máquina tem tempo de ciclo.
+        """
+        cycles = self.machine_cycles(composition_line)
+        if not cycles:
+            return None
+        return max(cycles.values()) / self.open_cavities(composition_line.mold_id)
+
+
+def load_cycle_time_index(db: Session) -> CycleTimeIndex:
+    cycle = {
+        (machine_id, product_id, mold_id): tempo_ciclo
+        for machine_id, product_id, mold_id, tempo_ciclo in db.query(
+            ProductionTime.machine_id, ProductionTime.product_id, ProductionTime.mold_id, ProductionTime.tempo_ciclo
+        ).order_by(ProductionTime.id.desc())  # duplicidade: vale o de menor id
+    }
+    molds = {
+        mold_id: (float(scrap or 0), open_cavities or 1)
+        for mold_id, scrap, open_cavities in db.query(Mold.id, Mold.scrap, Mold.open_cavities)
+    }
+    post_cycle = {
+        cl_id: post or 0
+        for cl_id, post in db.query(CompositionLine.id, CompositionLine.post_injection_cycle_time)
+    }
+    line_machines = {}
+    for cl_id, machine_id in db.query(
+        CompositionLineMachine.composition_line_id, CompositionLineMachine.machine_id
+    ).order_by(CompositionLineMachine.id):
+        line_machines.setdefault(cl_id, []).append(machine_id)
+    availability = {
+        machine_id: float(value if value is not None else 100)
+        for machine_id, value in db.query(Machine.id, Machine.availability)
+    }
+    return CycleTimeIndex(
+        cycle=cycle, molds=molds, post_cycle=post_cycle, line_machines=line_machines, availability=availability
+    )
+
+
+def fetch_cycle_times(db: Session, composition_lines: list[CompositionLine]) -> dict[tuple[int, int, int], int]:
+    """
+    Tempos de ciclo (machine_id, product_id, mold_id) -> segundos das máquinas
+    das composition lines informadas, com uma única query e sem passar pelo
+    cache (respostas da API refletem o cadastro atual).
+    """
+    pairs = {(cl.product_id, cl.mold_id) for cl in composition_lines}
+    machine_ids = {clm.machine_id for cl in composition_lines for clm in cl.machines}
+    if not pairs or not machine_ids:
+        return {}
+    return {
+        (machine_id, product_id, mold_id): tempo_ciclo
+        for machine_id, product_id, mold_id, tempo_ciclo in db.query(
+            ProductionTime.machine_id, ProductionTime.product_id, ProductionTime.mold_id, ProductionTime.tempo_ciclo
+        ).filter(
+            tuple_(ProductionTime.product_id, ProductionTime.mold_id).in_(pairs),
+            ProductionTime.machine_id.in_(machine_ids),
+        ).order_by(ProductionTime.id.desc())  # duplicidade: vale o de menor id
+    }
+
+
+_index: Optional[CycleTimeIndex] = None
+_version = 0
+_lock = threading.Lock()
+
+
+def get_cycle_time_index(db: Session) -> CycleTimeIndex:
+    """Índice em cache; recarrega se foi invalidado ou expirou."""
+    global _index
+    with _lock:
+        index, version = _index, _version
+    if index is not None and time.monotonic() - index.loaded_at < CYCLE_INDEX_TTL:
+        return index
+
+    index = load_cycle_time_index(db)
+    with _lock:
+        # Uma escrita durante a carga invalida o que foi lido
+        if version == _version:
+            _index = index
+    return index
+
+
+def invalidate_cycle_time_index():
+    """Chamada após commits que alteram tempos de ciclo, moldes, composition lines ou máquinas."""
+    global _index, _version
+    with _lock:
+        _index = None
+        _version += 1
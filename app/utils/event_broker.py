@@ -0,0 +1,216 @@
+"""
+Broker de eventos do SSE e trava de "sequenciamento em andamento".
+
+Com vários workers do uvicorn, o stream de um usuário fica em um processo e
+o solve pode rodar em outro. O broker separa a publicação da entrega:
+`publish` leva o evento (com o id gerado por quem publica) a todos os
+processos, e cada processo entrega aos streams que mantém (`deliver`,
+registrado por `app/utils/sse.py`). A trava por usuário (guarda do 409 em
+/solve) também fica no broker.
+
+Implementações (variável de ambiente SSE_BROKER):
+
+- "memory" (padrão): tudo no próprio processo; adequado para um worker só;
+- "postgres": eventos por LISTEN/NOTIFY no canal `sse_events` e trava por
+  advisory lock em uma conexão dedicada (liberada pelo Postgres se o
+  worker cair). Requer DATABASE_URL apontando para Postgres.
+
+O payload do NOTIFY é limitado a ~8000 bytes pelo Postgres; os eventos do
+SSE (status, progresso) são bem menores.
+"""
+import asyncio
+import json
+import os
+import select
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Callable, Optional
+
+from sqlalchemy import text
+
+from app.database import engine
+
+SSE_BROKER = os.getenv("SSE_BROKER", "memory")
+NOTIFY_CHANNEL = "sse_events"
+# Primeira chave dos advisory locks (separa das travas de outros módulos)
+LOCK_NAMESPACE = 5_370_001
+
+Deliver = Callable[[str, str, str], None]
+
+
+class EventBroker(ABC):
+    """
+    Interface comum; `deliver(user_id, event_id, data)` entrega um evento aos
+    streams locais. Os métodos da trava podem bloquear (I/O no banco): nas
+    rotas async são chamados fora do event loop (ver `app/utils/sse.py`).
+    """
+
+    def __init__(self, deliver: Deliver):
+        self.deliver = deliver
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    @abstractmethod
+    async def publish(self, user_id: str, event_id: str, data: str):
+        ...
+
+    @abstractmethod
+    def try_lock(self, user_id: str) -> bool:
+        """Adquire a trava do usuário sem esperar; False se já estiver em uso."""
+
+    @abstractmethod
+    def unlock(self, user_id: str):
+        ...
+
+    @abstractmethod
+    def is_locked(self, user_id: str) -> bool:
+        ...
+
+
+class InProcessBroker(EventBroker):
+    def __init__(self, deliver: Deliver):
+        super().__init__(deliver)
+        self._locked: set[str] = set()
+        self._lock = threading.Lock()
+
+    async def publish(self, user_id: str, event_id: str, data: str):
+        self.deliver(user_id, event_id, data)
+
+    def try_lock(self, user_id: str) -> bool:
+        with self._lock:
+            if user_id in self._locked:
+                return False
+            self._locked.add(user_id)
+            return True
+
+    def unlock(self, user_id: str):
+        with self._lock:
+            self._locked.discard(user_id)
+
+    def is_locked(self, user_id: str) -> bool:
+        with self._lock:
+            return user_id in self._locked
+
+
+def _autocommit_connection():
+    """Conexão psycopg2 fora do pool do SQLAlchemy, em autocommit."""
+    connection = engine.raw_connection()
+    connection.detach()
+    dbapi_connection = connection.driver_connection
+    dbapi_connection.autocommit = True
+    return dbapi_connection
+
+
+class PostgresBroker(EventBroker):
+    def __init__(self, deliver: Deliver):
+        super().__init__(deliver)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._listener: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        # Conexão que segura o advisory lock de cada usuário travado por este processo
+        self._lock_connections: dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._stopping.clear()
+        self._listener = threading.Thread(target=self._listen, name="sse-listener", daemon=True)
+        self._listener.start()
+
+    async def stop(self):
+        self._stopping.set()
+        if self._listener is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._listener.join)
+        with self._lock:
+            connections = list(self._lock_connections.values())
+            self._lock_connections.clear()
+        for connection in connections:
+            connection.close()
+
+    def _listen(self):
+        while not self._stopping.is_set():
+            connection = None
+            try:
+                connection = _autocommit_connection()
+                with connection.cursor() as cursor:
+                    cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                while not self._stopping.is_set():
+                    if select.select([connection], [], [], 1.0) == ([], [], []):
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        notify = connection.notifies.pop(0)
+                        message = json.loads(notify.payload)
+                        self._loop.call_soon_threadsafe(
+                            self.deliver, message["user_id"], message["id"], message["data"]
+                        )
+            except Exception as e:
+                # Reconecta; eventos publicados enquanto desconectado são perdidos
+                print(f"Broker SSE (postgres): conexão perdida ({e}), reconectando")
+                time.sleep(1)
+            finally:
+                if connection is not None:
+                    connection.close()
+
+    def _notify(self, payload: str):
+        connection = engine.raw_connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_notify(%s, %s)", (NOTIFY_CHANNEL, payload))
+            connection.commit()
+        finally:
+            connection.close()
+
+    async def publish(self, user_id: str, event_id: str, data: str):
+        payload = json.dumps({"user_id": user_id, "id": event_id, "data": data})
+        await asyncio.get_running_loop().run_in_executor(None, self._notify, payload)
+
+    def try_lock(self, user_id: str) -> bool:
+        connection = _autocommit_connection()
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_lock(%s, hashtext(%s))", (LOCK_NAMESPACE, user_id))
+            acquired = cursor.fetchone()[0]
+        if not acquired:
+            connection.close()
+            return False
+        with self._lock:
+            self._lock_connections[user_id] = connection
+        return True
+
+    def unlock(self, user_id: str):
+        with self._lock:
+            connection = self._lock_connections.pop(user_id, None)
+        if connection is not None:
+            # Fechar a sessão libera o advisory lock
+            connection.close()
+
+    def is_locked(self, user_id: str) -> bool:
+        with self._lock:
+            if user_id in self._lock_connections:
+                return True
+        # Conexão do pool (a trava de teste é liberada antes de devolvê-la)
+        params = {"namespace": LOCK_NAMESPACE, "user_id": user_id}
+        with engine.connect() as connection:
+            acquired = connection.execute(
+                text("SELECT pg_try_advisory_lock(:namespace, hashtext(:user_id))"), params
+            ).scalar()
+            if acquired:
+                connection.execute(text("SELECT pg_advisory_unlock(:namespace, hashtext(:user_id))"), params)
+            connection.commit()
+        return not acquired
+
+
+BROKERS = {"memory": InProcessBroker, "postgres": PostgresBroker}
+
+
+def create_broker(deliver: Deliver, kind: str = SSE_BROKER) -> EventBroker:
+    if kind not in BROKERS:
+        raise ValueError(f"SSE_BROKER desconhecido: {kind} (use {', '.join(BROKERS)})")
+    if kind == "postgres" and engine.dialect.name != "postgresql":
+        raise ValueError("SSE_BROKER=postgres requer DATABASE_URL apontando para Postgres")
+    return BROKERS[kind](deliver)
@@ -0,0 +1,149 @@
+"""
+Montagem dos subproblemas do sequenciamento de injetoras a partir dos jobs
+do banco, um por grupo independente de máquinas.
+
+Cada job é associado à sua composition line (ver `setup_matrix.py`), e
+portanto a uma linha de produção e às máquinas dessa composition line.
+Linhas que não compartilham máquinas formam subproblemas independentes;
+linhas com máquina em comum são resolvidas juntas.
+
+Os mapas gerados seguem o formato de `solve_injection_scheduling`
+(`processing`, `due`, `priority`, `setup3`, em horas), com 9999 nas
+combinações (job, máquina) indisponíveis. Os prazos são horas de trabalho
+do calendário de turnos (ver `working_calendar.py`).
+"""
+import math
+from collections import defaultdict
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.utils.cycle_time_index import get_cycle_time_index
+from app.utils.setup_matrix import composition_line_label, resolve_job_composition_lines
+from app.utils.setup_matrix_cache import get_setup_matrix
+from app.utils.working_calendar import get_working_calendar
+
+UNAVAILABLE_TIME = 9999
+DUMMY_JOB = 0
+
+
+def _ceil_tenth(hours: float) -> float:
+    return math.ceil(hours * 10) / 10
+
+
+def _group_lines(line_machines: dict[int, set]) -> list[list[int]]:
+    """Agrupa linhas de produção que compartilham pelo menos uma máquina."""
+    parent = {line: line for line in line_machines}
+
+    def find(line):
+        while parent[line] != line:
+            parent[line] = parent[parent[line]]
+            line = parent[line]
+        return line
+
+    owner = {}
+    for line, machines in line_machines.items():
+        for machine in machines:
+            if machine in owner:
+                parent[find(line)] = find(owner[machine])
+            else:
+                owner[machine] = line
+
+    groups = defaultdict(list)
+    for line in line_machines:
+        groups[find(line)].append(line)
+    return sorted((sorted(lines) for lines in groups.values()), key=lambda lines: lines[0])
+
+
+def build_line_subproblems(db: Session, jobs_data: list, sequencing_date: datetime) -> list[dict]:
+    """
+    Retorna um subproblema por grupo de linhas, com `production_line_ids`,
+    `jobs`, `machines`, `processing`, `due`, `priority`, `setup3` e `dummy`.
+    Levanta ValueError se algum job não tiver composition line, máquina
+    com tempo de ciclo cadastrado ou setup.
+    """
+    job_to_cl = resolve_job_composition_lines(db, jobs_data)
+    missing = [job.product.name for job in jobs_data if job.id not in job_to_cl]
+    if missing:
+        raise ValueError(f"Nenhuma composition line encontrada para os produtos: {sorted(set(missing))}")
+
+    # Máquinas, tempos de ciclo, moldes e disponibilidade vêm do índice em memória
+    index = get_cycle_time_index(db)
+
+    jobs_by_line = defaultdict(list)
+    line_machines = defaultdict(set)
+    processing = {}
+    without_machine = []
+    for job in jobs_data:
+        cl = job_to_cl[job.id]
+        jobs_by_line[cl.production_line_id].append(job)
+        line_machines[cl.production_line_id].update(index.line_machines.get(cl.id, ()))
+        scrap_factor = 1 + index.scrap_percent(cl.mold_id) / 100
+        cavities = index.open_cavities(cl.mold_id)
+        cycles = index.machine_cycles(cl)
+        for machine_id, cycle_s in cycles.items():
+            available_factor = (100 - index.availability[machine_id]) / 100 + 1
+            seconds = job.demand * scrap_factor * cycle_s / cavities * available_factor
+            processing[(job.id, machine_id)] = _ceil_tenth(seconds / 3600)
+        if not cycles:
+            without_machine.append(job.id)
+    if without_machine:
+        raise ValueError(f"Jobs sem máquina com tempo de ciclo cadastrado: {without_machine}")
+
+    # Prazos em horas de trabalho (turnos e feriados) até a data prometida
+    calendar = get_working_calendar(db, sequencing_date, max(job.promised_date for job in jobs_data))
+
+    subproblems = []
+    setups_faltando = []
+    for line_ids in _group_lines(line_machines):
+        group_jobs = [job for line in line_ids for job in jobs_by_line[line]]
+        machines = sorted(set().union(*(line_machines[line] for line in line_ids)))
+        job_ids = [job.id for job in group_jobs]
+
+        group_processing = {
+            (job_id, machine_id): processing.get((job_id, machine_id), UNAVAILABLE_TIME)
+            for job_id in job_ids
+            for machine_id in machines
+        }
+
+        # Setup entre jobs (horas), a partir da matriz da(s) linha(s)
+        cls = [job_to_cl[job_id] for job_id in job_ids]
+        matrix = get_setup_matrix(db, cls)
+        seconds = matrix.take([cl.id for cl in cls])
+        missing_mask = np.isnan(seconds)
+        np.fill_diagonal(missing_mask, False)
+        setups_faltando.extend(
+            f"{composition_line_label(cls[i])} ➜ {composition_line_label(cls[j])}"
+            for i, j in np.argwhere(missing_mask)
+        )
+        hours = np.ceil(np.nan_to_num(seconds, nan=0.0) / 3600 * 10) / 10
+        np.fill_diagonal(hours, 0.0)
+
+        setup3 = {}
+        for machine_id in machines:
+            for a, job_a in enumerate(job_ids):
+                # Job dummy: máquina parte sem setup
+                setup3[(DUMMY_JOB, job_a, machine_id)] = 0.0
+                setup3[(job_a, DUMMY_JOB, machine_id)] = 0.0
+                for b, job_b in enumerate(job_ids):
+                    if a != b:
+                        setup3[(job_a, job_b, machine_id)] = float(hours[a, b])
+
+        subproblems.append({
+            "production_line_ids": line_ids,
+            "jobs": job_ids,
+            "machines": machines,
+            "processing": group_processing,
+            "due": {
+                job.id: max(_ceil_tenth(calendar.working_hours(job.promised_date)), 0.0)
+                for job in group_jobs
+            },
+            "priority": {job.id: float(job.client.priority) for job in group_jobs},
+            "setup3": setup3,
+            "dummy": DUMMY_JOB,
+        })
+
+    if setups_faltando:
+        raise ValueError(f"Faltam setups cadastrados entre os seguintes produtos: {sorted(set(setups_faltando))}")
+    return subproblems
@@ -0,0 +1,150 @@
+"""
+Importação em lote de jobs (carteira de pedidos) de planilhas XLSX ou CSV.
+
+Cada bloco de linhas é tratado de uma vez com pandas:
+
+- clientes e produtos são resolvidos por nome com uma query IN por bloco
+  (só nomes ainda não vistos), guardados em dicionários;
+- data e horário prometidos são convertidos com os conversores vetorizados
+  do pandas (mesmos formatos aceitos antes: data dd/mm/aaaa ou data do
+  Excel; horário hh:mm:ss, horário/data-hora do Excel ou número HHMMSS);
+- os jobs são inseridos com um INSERT em lote por bloco.
+
+Linhas sem cliente, produto ou demanda, ou com cliente/produto não
+cadastrado, são ignoradas. Data ou horário inválidos em uma linha válida
+recusam o arquivo inteiro. O CSV é lido em blocos direto do upload, sem
+carregar o arquivo todo em memória.
+"""
+import csv
+from typing import BinaryIO, Iterable
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.models.client import Client
+from app.models.job import Job
+from app.models.product import Product
+
+IMPORT_CHUNK_SIZE = 5000
+
+COLUMNS = ["Cliente", "Produto", "Demanda", "Data Prometida", "Horário Prometido", "Valor Unitário"]
+
+
+class JobImportError(ValueError):
+    pass
+
+
+def read_xlsx_chunks(file: BinaryIO) -> Iterable[pd.DataFrame]:
+    df = pd.read_excel(file, engine="openpyxl")
+    for start in range(0, len(df), IMPORT_CHUNK_SIZE):
+        yield df.iloc[start:start + IMPORT_CHUNK_SIZE]
+
+
+def read_csv_chunks(file: BinaryIO) -> Iterable[pd.DataFrame]:
+    """CSV separado por vírgula ou ponto e vírgula (com vírgula decimal), lido em blocos."""
+    sample = file.read(4096).decode("utf-8-sig", errors="ignore")
+    file.seek(0)
+    try:
+        separator = csv.Sniffer().sniff(sample, delimiters=",;").delimiter
+    except csv.Error:
+        separator = ","
+    yield from pd.read_csv(
+        file,
+        sep=separator,
+        decimal="," if separator == ";" else ".",
+        encoding="utf-8-sig",
+        chunksize=IMPORT_CHUNK_SIZE,
+    )
+
+
+def parse_promised_dates(values: pd.Series) -> pd.Series:
+    """Data (sem horário) de cada linha; NaT se inválida."""
+    if values.dtype == object:
+        values = values.str.strip().fillna(values)
+    return pd.to_datetime(values, format="%d/%m/%Y", errors="coerce").dt.normalize()
+
+
+def _hhmmss(numbers: pd.Series) -> pd.Series:
+    numbers = np.trunc(numbers)
+    hours, minutes, seconds = numbers // 10000, numbers // 100 % 100, numbers % 100
+    valid = (numbers >= 0) & (hours < 24) & (minutes < 60)
+    return pd.to_timedelta((hours * 3600 + minutes * 60 + seconds).where(valid), unit="s")
+
+
+def parse_promised_times(values: pd.Series) -> pd.Series:
+    """Horário de cada linha como intervalo desde a meia-noite; NaT se inválido."""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values - values.dt.normalize()
+    if pd.api.types.is_numeric_dtype(values):
+        return _hhmmss(values.astype(float))
+
+    # Objetos time/Timestamp viram "hh:mm:ss"/"aaaa-mm-dd hh:mm:ss"; números viram texto
+    text = values.astype(str).str.strip()
+    result = _hhmmss(pd.to_numeric(text, errors="coerce"))
+    pending = result.isna()
+    result[pending] = pd.to_timedelta(text[pending], errors="coerce")
+    pending = result.isna()
+    stamps = pd.to_datetime(text[pending], format="ISO8601", errors="coerce")
+    result[pending] = stamps - stamps.dt.normalize()
+    return result
+
+
+def _ids_by_name(db: Session, model, names: np.ndarray, known: dict[str, int]) -> dict[str, int]:
+    """Completa `known` com os ids dos nomes ainda não resolvidos (uma query IN)."""
+    missing = [name for name in pd.unique(names) if name not in known]
+    if missing:
+        # Nome duplicado no cadastro: vale o de menor id
+        for name, model_id in db.query(model.name, model.id).filter(model.name.in_(missing)).order_by(model.id.desc()):
+            known[name] = model_id
+        known.update({name: None for name in missing if name not in known})
+    return known
+
+
+def import_jobs(db: Session, chunks: Iterable[pd.DataFrame]) -> tuple[int, int]:
+    """Insere os jobs de todos os blocos em uma transação. Retorna (criados, ignorados)."""
+    clients: dict[str, int] = {}
+    products: dict[str, int] = {}
+    created = ignored = 0
+    row_offset = 2  # linha 1 é o cabeçalho
+
+    for chunk in chunks:
+        missing_columns = [column for column in COLUMNS if column not in chunk.columns]
+        if missing_columns:
+            raise JobImportError(f"Colunas ausentes: {missing_columns}")
+
+        client_names = chunk["Cliente"].astype(str).str.strip().to_numpy()
+        product_names = chunk["Produto"].astype(str).str.strip().to_numpy()
+        demand = pd.to_numeric(chunk["Demanda"], errors="coerce").to_numpy()
+
+        _ids_by_name(db, Client, client_names, clients)
+        _ids_by_name(db, Product, product_names, products)
+        client_ids = pd.Series(client_names).map(clients).to_numpy()
+        product_ids = pd.Series(product_names).map(products).to_numpy()
+
+        keep = ~np.isnan(demand) & pd.notna(client_ids) & pd.notna(product_ids)
+        ignored += int((~keep).sum())
+        valid = chunk[keep]
+
+        promised = parse_promised_dates(valid["Data Prometida"]) + parse_promised_times(valid["Horário Prometido"])
+        invalid = np.flatnonzero(keep)[promised.isna().to_numpy()] + row_offset
+        if len(invalid):
+            raise JobImportError(f"Data ou horário prometido inválido nas linhas: {invalid[:20].tolist()}")
+
+        price = pd.to_numeric(valid["Valor Unitário"], errors="coerce").astype(float)
+        rows = pd.DataFrame({
+            "name": client_names[keep] + " - " + product_names[keep],
+            "promised_date": promised.to_numpy(),
+            "demand": np.trunc(demand[keep]).astype(int),
+            "product_value": price.to_numpy(),
+            "fk_id_client": client_ids[keep].astype(int),
+            "fk_id_product": product_ids[keep].astype(int),
+        })
+        if len(rows):
+            db.execute(insert(Job), rows.to_dict("records"))
+        created += len(rows)
+        row_offset += len(chunk)
+
+    db.commit()
+    return created, ignored
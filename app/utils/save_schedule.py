@@ -1,11 +1,13 @@
 from sqlalchemy.orm import Session
 from datetime import datetime, timedelta
 from collections import defaultdict
+from typing import Optional
 from pulp import value
 
 from app.models.production_schedule_run import ProductionScheduleRun
 from app.models.production_schedule_result import ProductionScheduleResult
 from app.models.predicted_revenue_by_day import PredictedRevenueByDay
+from app.utils.working_calendar import get_working_calendar
 
 def save_solver_result_to_db(
     db: Session,
@@ -17,16 +19,31 @@ def save_solver_result_to_db(
     bottleneck_times: list[float],
     setup_count: int,
     optimized_setups: int,
+    due_time: Optional[list[float]] = None,
+    weight: Optional[list[float]] = None,
+    setup_in: Optional[list[float]] = None,
+    composition_line_ids: Optional[list[int]] = None,
+    machine_availability: Optional[int] = None,
+    base_run_id: Optional[int] = None,
 ) -> ProductionScheduleRun:
+    """
+    Grava o run e um resultado por job. Os dados do modelo por job (prazo,
+    peso, setup de entrada e composition line, por índice de `jobs_data`)
+    são opcionais; com eles o run pode ser re-sequenciado sem remontar o
+    modelo (`resequence_run`).
+    """
 
     latest_promised_datetime = max(job.promised_date for job in jobs_data)
-    total_machine_hours = (latest_promised_datetime - sequencing_date).total_seconds() / 3600
 
     time_required = max(
         value(start[i]) + processing_time[i] + bottleneck_times[i]
         for i in range(len(jobs_data))
     )
 
+    # Os tempos do solver são horas de trabalho: datas vêm do calendário de turnos e feriados
+    calendar = get_working_calendar(db, sequencing_date, latest_promised_datetime, min_hours=time_required)
+    total_machine_hours = calendar.working_hours(latest_promised_datetime)
+
     machine_status = "On Time" if total_machine_hours >= time_required else "Late"
 
     on_time_count = 0
@@ -40,6 +57,8 @@ def save_solver_result_to_db(
         total_machine_hours=int(time_required),
         max_deadline_hours=int(total_machine_hours),
         machine_status=machine_status,
+        machine_availability=machine_availability,
+        base_run_id=base_run_id,
         created_at=datetime.utcnow()
     )
     db.add(run)
@@ -53,8 +72,8 @@ def save_solver_result_to_db(
 
         moment_conclusion = start_h + proc_time
         moment_conclusion_final = moment_conclusion + bottleneck
-        production_completion = sequencing_date + timedelta(hours=moment_conclusion_final)
-        start_dt = sequencing_date + timedelta(hours=start_h)
+        production_completion = calendar.to_datetime(moment_conclusion_final, at_end=True)
+        start_dt = calendar.to_datetime(start_h)
 
         status = "On Time" if production_completion <= job.promised_date else "Late"
         if status == "On Time":
@@ -82,7 +101,14 @@ def save_solver_result_to_db(
             completion_time=production_completion.time(),
             billing_date=billing_date,
             status=status,
-            expected_revenue=revenue
+            expected_revenue=revenue,
+            composition_line_id=composition_line_ids[i] if composition_line_ids is not None else None,
+            start_hours=start_h,
+            processing_hours=proc_time,
+            post_bottleneck_hours=bottleneck,
+            due_hours=due_time[i] if due_time is not None else None,
+            weight=weight[i] if weight is not None else None,
+            setup_hours=setup_in[i] if setup_in is not None else None,
         ))
 
     run.on_time_jobs = on_time_count
@@ -0,0 +1,346 @@
+"""
+Carregamento em lote da matriz de setup.
+
+Em vez de consultar o banco a cada par (origem, destino), busca todos os
+`Setup` das composition lines envolvidas em uma única query e monta a
+matriz densa em memória (NumPy). Usado pelo solver, pelo download do
+template e pelo upload da matriz.
+
+Por linha de produção, os setups também podem ser resolvidos de forma
+esparsa (`SetupResolver`): só os pares cadastrados mais os padrões da
+linha (`SetupDefault`), sem a matriz N x N.
+"""
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Iterable, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session, joinedload
+
+from app.models.composition_line import CompositionLine
+from app.models.setup import Setup
+from app.models.setup_default import SetupDefault
+
+
+def composition_line_label(composition_line: CompositionLine) -> str:
+    """Rótulo usado nas planilhas e relatórios: "M{id_mold}-{nome_produto}"."""
+    return f"M{composition_line.mold_id}-{composition_line.product.name}"
+
+
+@dataclass
+class SetupMatrix:
+    """
+    Matriz densa de setup (em segundos) entre composition lines.
+
+    - ids: IDs das composition lines, na ordem das linhas/colunas
+    - index: ID da composition line -> posição na matriz
+    - seconds: matriz N x N; NaN onde não existe setup cadastrado
+    """
+    ids: list[int]
+    index: dict[int, int]
+    seconds: np.ndarray
+
+    @property
+    def present(self) -> np.ndarray:
+        return ~np.isnan(self.seconds)
+
+    def get(self, from_id: int, to_id: int) -> Optional[int]:
+        i = self.index.get(from_id)
+        j = self.index.get(to_id)
+        if i is None or j is None or np.isnan(self.seconds[i, j]):
+            return None
+        return int(self.seconds[i, j])
+
+    def take(self, composition_line_ids: list[int]) -> np.ndarray:
+        """Submatriz (com repetição permitida) na ordem dos IDs informados."""
+        positions = np.fromiter(
+            (self.index[cl_id] for cl_id in composition_line_ids),
+            dtype=np.intp,
+            count=len(composition_line_ids),
+        )
+        return self.seconds[np.ix_(positions, positions)]
+
+
+@dataclass
+class SetupResolver:
+    """
+    Setups de uma linha de produção em formato esparso:
+
+    - ids / index: composition lines da linha e a posição de cada uma
+    - molds: molde de cada posição
+    - keys / seconds: pares cadastrados (origem * N + destino, ordenados) e tempos
+    - same_mold / mold_change: padrões da linha (NaN = sem padrão)
+
+    Ordem de resolução (ver `SetupDefault`): setup cadastrado; mesma
+    composition line = 0; mesmo molde = same_mold; moldes diferentes =
+    mold_change. `get` responde em O(1); `take` resolve uma submatriz
+    inteira de forma vetorizada.
+    """
+    ids: list[int]
+    index: dict[int, int]
+    molds: np.ndarray
+    keys: np.ndarray
+    seconds: np.ndarray
+    same_mold: float = np.nan
+    mold_change: float = np.nan
+
+    @cached_property
+    def _pairs(self) -> dict[int, float]:
+        return dict(zip(self.keys.tolist(), self.seconds.tolist()))
+
+    def _default(self, i: int, j: int) -> float:
+        if i == j:
+            return 0.0
+        return self.same_mold if self.molds[i] == self.molds[j] else self.mold_change
+
+    def get(self, from_id: int, to_id: int, defaults: bool = True) -> Optional[int]:
+        i = self.index.get(from_id)
+        j = self.index.get(to_id)
+        if i is None or j is None:
+            return None
+        value = self._pairs.get(i * len(self.ids) + j)
+        if value is None and defaults:
+            value = self._default(i, j)
+        if value is None or np.isnan(value):
+            return None
+        return int(value)
+
+    def positions(self, composition_line_ids: list[int]) -> np.ndarray:
+        return np.fromiter(
+            (self.index[cl_id] for cl_id in composition_line_ids),
+            dtype=np.int64,
+            count=len(composition_line_ids),
+        )
+
+    def pairs(self, from_positions: np.ndarray, to_positions: np.ndarray, defaults: bool = True) -> np.ndarray:
+        """
+        Setup (segundos) de cada par origem/destino, elemento a elemento,
+        pelas posições das composition lines; NaN onde o par não tem setup
+        (nem padrão, com defaults).
+        """
+        wanted = from_positions * len(self.ids) + to_positions
+        if len(self.keys):
+            found = np.minimum(np.searchsorted(self.keys, wanted), len(self.keys) - 1)
+            seconds = np.where(self.keys[found] == wanted, self.seconds[found], np.nan)
+        else:
+            seconds = np.full(np.shape(wanted), np.nan)
+        if defaults:
+            fallback = np.where(
+                self.molds[from_positions] == self.molds[to_positions], self.same_mold, self.mold_change
+            )
+            fallback[from_positions == to_positions] = 0.0
+            seconds = np.where(np.isnan(seconds), fallback, seconds)
+        return seconds
+
+    def take(self, composition_line_ids: list[int], defaults: bool = True) -> np.ndarray:
+        """
+        Submatriz densa (com repetição permitida) na ordem dos IDs
+        informados; NaN onde o par não tem setup (nem padrão, com defaults).
+        """
+        positions = self.positions(composition_line_ids)
+        return self.pairs(positions[:, None], positions[None, :], defaults)
+
+
+def load_setup_resolver(db: Session, production_line_id: int) -> SetupResolver:
+    """
+    `SetupResolver` de uma linha de produção: composition lines, setups
+    cadastrados (pares entre composition lines da linha) e padrões, com
+    uma query para cada.
+    """
+    composition_lines = db.query(CompositionLine.id, CompositionLine.mold_id).filter(
+        CompositionLine.production_line_id == production_line_id
+    ).order_by(CompositionLine.id).all()
+    ids = [cl_id for cl_id, _ in composition_lines]
+    index = {cl_id: pos for pos, cl_id in enumerate(ids)}
+    molds = np.asarray([mold_id for _, mold_id in composition_lines], dtype=np.int64)
+
+    rows = [
+        (index[from_id], index[to_id], setup_time)
+        for from_id, to_id, setup_time in db.query(
+            Setup.from_composition_line_id, Setup.to_composition_line_id, Setup.setup_time
+        ).filter(Setup.production_line_id == production_line_id).order_by(Setup.id)
+        if from_id in index and to_id in index
+    ]
+    keys = np.asarray([i * len(ids) + j for i, j, _ in rows], dtype=np.int64)
+    # Em caso de duplicidade, o setup de menor ID prevalece (primeira ocorrência)
+    keys, first = np.unique(keys, return_index=True)
+    seconds = np.asarray([setup_time for _, _, setup_time in rows], dtype=float)[first]
+
+    default = db.query(SetupDefault.same_mold_time, SetupDefault.mold_change_time).filter(
+        SetupDefault.production_line_id == production_line_id
+    ).first()
+    same_mold, mold_change = (np.nan, np.nan) if default is None else (
+        np.nan if value is None else float(value) for value in default
+    )
+    return SetupResolver(
+        ids=ids, index=index, molds=molds, keys=keys, seconds=seconds,
+        same_mold=same_mold, mold_change=mold_change,
+    )
+
+
+def _setups_query(db: Session, entities, ids: list[int], production_line_id: Optional[int]):
+    query = db.query(*entities).filter(
+        Setup.from_composition_line_id.in_(ids),
+        Setup.to_composition_line_id.in_(ids),
+    )
+    if production_line_id is not None:
+        query = query.filter(Setup.production_line_id == production_line_id)
+    return query.order_by(Setup.id)
+
+
+def fetch_setups(
+    db: Session,
+    composition_line_ids: Iterable[int],
+    production_line_id: Optional[int] = None,
+) -> dict[tuple[int, int], Setup]:
+    """
+    Busca, em uma única query, todos os setups entre as composition lines
+    informadas. Retorna {(from_id, to_id): Setup}; em caso de duplicidade
+    mantém o de menor ID (mesmo comportamento do antigo `.first()`).
+    """
+    ids = list(set(composition_line_ids))
+    if not ids:
+        return {}
+
+    setups = {}
+    for setup in _setups_query(db, (Setup,), ids, production_line_id).all():
+        key = (setup.from_composition_line_id, setup.to_composition_line_id)
+        setups.setdefault(key, setup)
+    return setups
+
+
+def load_setup_matrix(
+    db: Session,
+    composition_line_ids: Iterable[int],
+    production_line_id: Optional[int] = None,
+) -> SetupMatrix:
+    """
+    Monta a `SetupMatrix` das composition lines informadas com uma única query.
+    Só as colunas necessárias são lidas (sem instanciar objetos ORM).
+    """
+    ids = list(dict.fromkeys(composition_line_ids))
+    index = {cl_id: pos for pos, cl_id in enumerate(ids)}
+    seconds = np.full((len(ids), len(ids)), np.nan, dtype=float)
+    if not ids:
+        return SetupMatrix(ids=ids, index=index, seconds=seconds)
+
+    rows = _setups_query(
+        db,
+        (Setup.from_composition_line_id, Setup.to_composition_line_id, Setup.setup_time),
+        ids,
+        production_line_id,
+    ).all()
+    if rows:
+        from_ids, to_ids, times = zip(*rows)
+        rows_idx = np.fromiter((index[i] for i in from_ids), dtype=np.intp, count=len(rows))
+        cols_idx = np.fromiter((index[j] for j in to_ids), dtype=np.intp, count=len(rows))
+        # Ordem reversa: em caso de duplicidade, o setup de menor ID prevalece
+        seconds[rows_idx[::-1], cols_idx[::-1]] = np.asarray(times, dtype=float)[::-1]
+
+    return SetupMatrix(ids=ids, index=index, seconds=seconds)
+
+
+def resolve_job_composition_lines(db: Session, jobs_data: list) -> dict[int, CompositionLine]:
+    """
+    Associa cada job à primeira composition line que produz o seu produto,
+    com uma única query. Jobs sem composition line ficam fora do dicionário.
+    """
+    product_ids = {job.fk_id_product for job in jobs_data}
+    if not product_ids:
+        return {}
+
+    composition_lines = db.query(CompositionLine).options(
+        joinedload(CompositionLine.mold),
+        joinedload(CompositionLine.product)
+    ).filter(CompositionLine.product_id.in_(product_ids)).order_by(CompositionLine.id).all()
+
+    by_product = {}
+    for cl in composition_lines:
+        by_product.setdefault(cl.product_id, cl)
+
+    return {
+        job.id: by_product[job.fk_id_product]
+        for job in jobs_data
+        if job.fk_id_product in by_product
+    }
+
+
+def setup_hours(seconds: np.ndarray) -> np.ndarray:
+    """Setup em horas usado pelos modelos: segundos arredondados para cima em 0.1h."""
+    return np.ceil(seconds / 3600 * 10) / 10
+
+
+class MissingSetupError(ValueError):
+    """Pares de jobs (índices) sem setup cadastrado nem padrão."""
+
+    def __init__(self, pairs: list[tuple[int, int]]):
+        super().__init__(f"Faltam setups entre {len(pairs)} pares de jobs")
+        self.pairs = pairs
+
+
+def job_setup_lookup(db: Session, composition_lines: list[CompositionLine]):
+    """
+    Setup em horas entre jobs, consultado sob demanda: recebe arrays de
+    índices de jobs (origem, destino; posição em `composition_lines`) e
+    resolve só esses pares pelos `SetupResolver` do cache, sem montar a
+    matriz job x job. Mesmo job = 0. Levanta `MissingSetupError` para pares
+    sem setup (incluindo composition lines de linhas de produção diferentes).
+    """
+    # Import local: o cache depende deste módulo
+    from app.utils.setup_matrix_cache import setup_matrix_cache
+
+    line_of = np.asarray([cl.production_line_id for cl in composition_lines], dtype=np.int64)
+    position_of = np.zeros(len(composition_lines), dtype=np.int64)
+    resolvers = {}
+    for production_line_id in dict.fromkeys(line_of.tolist()):
+        jobs = np.flatnonzero(line_of == production_line_id)
+        cl_ids = [composition_lines[i].id for i in jobs]
+        resolvers[production_line_id] = setup_matrix_cache.line_resolver(db, production_line_id, cl_ids)
+        position_of[jobs] = resolvers[production_line_id].positions(cl_ids)
+
+    def lookup(from_jobs: np.ndarray, to_jobs: np.ndarray) -> np.ndarray:
+        from_jobs, to_jobs = np.asarray(from_jobs), np.asarray(to_jobs)
+        seconds = np.full(from_jobs.shape, np.nan)
+        for production_line_id, resolver in resolvers.items():
+            mask = (line_of[from_jobs] == production_line_id) & (line_of[to_jobs] == production_line_id)
+            seconds[mask] = resolver.pairs(position_of[from_jobs[mask]], position_of[to_jobs[mask]])
+        same_job = from_jobs == to_jobs
+        missing = np.isnan(seconds) & ~same_job
+        if missing.any():
+            raise MissingSetupError(list(zip(from_jobs[missing].tolist(), to_jobs[missing].tolist())))
+        hours = setup_hours(seconds)
+        hours[same_job] = 0.0
+        return hours
+
+    return lookup
+
+
+def build_job_setup_times(
+    db: Session,
+    jobs_data: list,
+    job_to_composition_line: dict[int, CompositionLine],
+) -> tuple[np.ndarray, list[str]]:
+    """
+    Matriz job x job de setup em horas (arredondada para cima em 0.1h) e a
+    lista de pares sem setup cadastrado, no formato "M1-Produto ➜ M2-Produto".
+    """
+    # Import local: o cache depende deste módulo
+    from app.utils.setup_matrix_cache import get_setup_matrix
+
+    composition_lines = [job_to_composition_line[job.id] for job in jobs_data]
+    # Matrizes por linha de produção do cache (sem query de setups quando já carregadas)
+    matrix = get_setup_matrix(db, composition_lines)
+    seconds = matrix.take([cl.id for cl in composition_lines])
+
+    missing_mask = np.isnan(seconds)
+    np.fill_diagonal(missing_mask, False)
+
+    labels = [composition_line_label(cl) for cl in composition_lines]
+    setups_faltando = [
+        f"{labels[i]} ➜ {labels[j]}"
+        for i, j in np.argwhere(missing_mask)
+    ]
+
+    setup_time = setup_hours(np.nan_to_num(seconds, nan=0.0))
+    np.fill_diagonal(setup_time, 0.0)
+    return setup_time, setups_faltando
@@ -0,0 +1,179 @@
+"""
+Cache versionado dos setups por linha de produção.
+
+Cada linha de produção tem um `SetupResolver` (esparso: só os pares
+cadastrados, mais os padrões de `SetupDefault`), então o tamanho cresce
+com o número de setups cadastrados e não com N x N. Os arrays são
+gravados em SETUP_MATRIX_CACHE_DIR como `.npy` e abertos com
+`mmap_mode="r"`, então os workers do uvicorn e os processos do solver
+compartilham as mesmas páginas de memória em vez de cada um consultar o
+banco.
+
+Versão: cada linha tem um arquivo `line_{id}.version` com um token novo a
+cada escrita de setup (`invalidate_setup_matrix`, chamado pelas rotas de
+setup e dos padrões, pela geração da matriz e pelo upload da planilha).
+Como o token fica em arquivo, a invalidação vale para todos os workers.
+Um resolver só é usado se foi gerado para o token atual e tem menos de
+SETUP_MATRIX_TTL segundos (padrão 300), o que cobre escritas feitas fora
+da API.
+
+Os setups de uma linha são os cadastrados com o `production_line_id` dela;
+pares de composition lines de linhas diferentes ficam sem setup (NaN),
+mesmo com padrões.
+"""
+import glob
+import hashlib
+import os
+import tempfile
+import threading
+import time
+import uuid
+from typing import Iterable, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from app.database import engine
+from app.models.composition_line import CompositionLine
+from app.utils.setup_matrix import SetupMatrix, SetupResolver, load_setup_resolver
+
+SETUP_MATRIX_TTL = float(os.getenv("SETUP_MATRIX_TTL", 300))
+# Um diretório por banco: bancos diferentes na mesma máquina não se misturam
+SETUP_MATRIX_CACHE_DIR = os.getenv("SETUP_MATRIX_CACHE_DIR") or os.path.join(
+    tempfile.gettempdir(), f"quant_setup_matrix_{hashlib.sha1(str(engine.url).encode()).hexdigest()[:8]}"
+)
+
+ALL_LINES = "all"
+
+
+class SetupMatrixCache:
+    def __init__(self, directory: str = SETUP_MATRIX_CACHE_DIR, ttl: float = SETUP_MATRIX_TTL):
+        self.directory = directory
+        self.ttl = ttl
+        # production_line_id -> (versão, SetupResolver, carregado em)
+        self._resolvers: dict[int, tuple[str, SetupResolver, float]] = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _write_atomic(self, name: str, write):
+        temporary = self._path(f".{name}.{uuid.uuid4().hex}")
+        with open(temporary, "wb") as file:
+            write(file)
+        os.replace(temporary, self._path(name))
+
+    def _token(self, name: str) -> str:
+        try:
+            with open(self._path(f"{name}.version")) as file:
+                return file.read().strip()
+        except FileNotFoundError:
+            return "0"
+
+    def version(self, production_line_id: int) -> str:
+        """Versão atual da matriz da linha (invalidação da linha ou de todas as linhas)."""
+        return f"{self._token(ALL_LINES)}-{self._token(f'line_{production_line_id}')}"
+
+    def bump(self, production_line_id: Optional[int] = None):
+        """Nova versão para a linha (ou para todas, com None)."""
+        name = ALL_LINES if production_line_id is None else f"line_{production_line_id}"
+        token = f"{time.time_ns()}{os.getpid()}"
+        self._write_atomic(f"{name}.version", lambda file: file.write(token.encode()))
+        with self._lock:
+            if production_line_id is None:
+                self._resolvers.clear()
+            else:
+                self._resolvers.pop(production_line_id, None)
+
+    def _load_file(self, production_line_id: int, version: str) -> Optional[SetupResolver]:
+        prefix = self._path(f"line_{production_line_id}_{version}")
+        try:
+            if time.time() - os.path.getmtime(f"{prefix}_seconds.npy") >= self.ttl:
+                return None
+            ids = np.load(f"{prefix}_ids.npy").tolist()
+            molds = np.load(f"{prefix}_molds.npy")
+            same_mold, mold_change = np.load(f"{prefix}_defaults.npy").tolist()
+            keys = np.load(f"{prefix}_keys.npy", mmap_mode="r")
+            seconds = np.load(f"{prefix}_seconds.npy", mmap_mode="r")
+        except (FileNotFoundError, ValueError):
+            return None
+        return SetupResolver(
+            ids=ids, index={cl_id: pos for pos, cl_id in enumerate(ids)}, molds=molds,
+            keys=keys, seconds=seconds, same_mold=same_mold, mold_change=mold_change,
+        )
+
+    def _build(self, db: Session, production_line_id: int, version: str) -> SetupResolver:
+        resolver = load_setup_resolver(db, production_line_id)
+        name = f"line_{production_line_id}_{version}"
+        arrays = {
+            "ids": np.asarray(resolver.ids, dtype=np.int64),
+            "molds": resolver.molds,
+            "defaults": np.asarray([resolver.same_mold, resolver.mold_change], dtype=float),
+            "keys": resolver.keys,
+            # tempos por último: quem encontra os tempos encontra os demais arrays
+            "seconds": resolver.seconds,
+        }
+        for suffix, array in arrays.items():
+            self._write_atomic(f"{name}_{suffix}.npy", lambda file: np.save(file, array))
+        for old in glob.glob(self._path(f"line_{production_line_id}_*.npy")):
+            if not os.path.basename(old).startswith(f"{name}_"):
+                try:
+                    os.remove(old)
+                except OSError:
+                    pass  # em uso (Windows) ou já removido por outro worker
+        return self._load_file(production_line_id, version) or resolver
+
+    def line_resolver(self, db: Session, production_line_id: int, required_ids: Iterable[int] = ()) -> SetupResolver:
+        """
+        Setups da linha de produção. Recarrega do banco se a versão mudou, se
+        expirou ou se falta alguma das composition lines em `required_ids`
+        (composition line criada depois do cache).
+        """
+        version = self.version(production_line_id)
+        with self._lock:
+            cached = self._resolvers.get(production_line_id)
+        if cached is not None and (cached[0] != version or time.monotonic() - cached[2] >= self.ttl):
+            cached = None
+        resolver = cached[1] if cached is not None else self._load_file(production_line_id, version)
+        if resolver is None or any(cl_id not in resolver.index for cl_id in required_ids):
+            resolver = self._build(db, production_line_id, version)
+        if cached is None or resolver is not cached[1]:
+            with self._lock:
+                self._resolvers[production_line_id] = (version, resolver, time.monotonic())
+        return resolver
+
+    def matrix(self, db: Session, composition_lines: list[CompositionLine], defaults: bool = True) -> SetupMatrix:
+        """
+        `SetupMatrix` das composition lines informadas, resolvida com os
+        setups das suas linhas. Com `defaults=False`, só os setups cadastrados.
+        """
+        ids = list(dict.fromkeys(cl.id for cl in composition_lines))
+        index = {cl_id: pos for pos, cl_id in enumerate(ids)}
+        seconds = np.full((len(ids), len(ids)), np.nan, dtype=float)
+
+        by_line: dict[int, list[int]] = {}
+        for cl in composition_lines:
+            if cl.id not in by_line.setdefault(cl.production_line_id, []):
+                by_line[cl.production_line_id].append(cl.id)
+        for production_line_id, line_ids in by_line.items():
+            resolver = self.line_resolver(db, production_line_id, line_ids)
+            rows = [index[cl_id] for cl_id in line_ids]
+            seconds[np.ix_(rows, rows)] = resolver.take(line_ids, defaults)
+        return SetupMatrix(ids=ids, index=index, seconds=seconds)
+
+
+setup_matrix_cache = SetupMatrixCache()
+
+
+def get_setup_matrix(db: Session, composition_lines: list[CompositionLine], defaults: bool = True) -> SetupMatrix:
+    return setup_matrix_cache.matrix(db, composition_lines, defaults)
+
+
+def invalidate_setup_matrix(production_line_ids: Optional[Iterable[int]] = None):
+    """Chamada após commits que alteram setups ou padrões; None invalida todas as linhas."""
+    if production_line_ids is None:
+        setup_matrix_cache.bump()
+        return
+    for production_line_id in set(production_line_ids):
+        setup_matrix_cache.bump(production_line_id)
@@ -0,0 +1,147 @@
+"""
+Cache de resultados do solver, endereçado pelo conteúdo do problema.
+
+A chave é o SHA-256 do JSON canônico do problema (tempos de processamento,
+prazos, prioridades, setups) e das opções do solver. Duas camadas:
+
+- memória: LRU com TTL (SOLVER_CACHE_SIZE entradas, SOLVER_CACHE_TTL segundos)
+- banco: tabela `solver_cache`, compartilhada entre processos e reinícios
+
+Um acerto na camada do banco é promovido para a memória.
+"""
+import hashlib
+import json
+import math
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+import numpy as np
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.solver_cache import SolverCacheEntry
+
+SOLVER_CACHE_SIZE = int(os.getenv("SOLVER_CACHE_SIZE", 128))
+SOLVER_CACHE_TTL = int(os.getenv("SOLVER_CACHE_TTL", 24 * 3600))
+
+# Casas decimais consideradas na chave (evita chaves diferentes por ruído de ponto flutuante)
+_FLOAT_DIGITS = 6
+
+_memory: "OrderedDict[str, tuple[str, datetime]]" = OrderedDict()
+_memory_lock = threading.Lock()
+
+
+def _normalize(obj):
+    """Converte o problema para tipos JSON em forma canônica."""
+    if isinstance(obj, dict):
+        if all(isinstance(k, str) for k in obj):
+            return {k: _normalize(v) for k, v in obj.items()}
+        # Chaves compostas (ex.: (job, máquina)) viram pares ordenados
+        items = [[_normalize(k), _normalize(v)] for k, v in obj.items()]
+        return sorted(items, key=lambda item: json.dumps(item[0], sort_keys=True))
+    if isinstance(obj, (list, tuple)):
+        return [_normalize(v) for v in obj]
+    if isinstance(obj, np.ndarray):
+        return _normalize(obj.tolist())
+    if isinstance(obj, (bool, np.bool_)):
+        return bool(obj)
+    if isinstance(obj, (int, np.integer)):
+        return int(obj)
+    if isinstance(obj, (float, np.floating)):
+        value = float(obj)
+        if not math.isfinite(value):
+            return str(value)
+        value = round(value, _FLOAT_DIGITS) + 0.0  # + 0.0 normaliza -0.0
+        return int(value) if value.is_integer() else value
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    return obj
+
+
+def problem_fingerprint(kind: str, problem: dict, options: Optional[dict] = None) -> str:
+    canonical = json.dumps(
+        {"kind": kind, "problem": _normalize(problem), "options": _normalize(options or {})},
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _hit_metadata(fingerprint: str, tier: str, created_at: datetime) -> dict:
+    return {
+        "hit": True,
+        "tier": tier,
+        "fingerprint": fingerprint,
+        "cached_at": created_at.isoformat(),
+        "age_s": round((datetime.utcnow() - created_at).total_seconds(), 3),
+    }
+
+
+def _memory_get(fingerprint: str):
+    with _memory_lock:
+        entry = _memory.get(fingerprint)
+        if entry is None:
+            return None
+        payload, created_at = entry
+        if datetime.utcnow() - created_at > timedelta(seconds=SOLVER_CACHE_TTL):
+            del _memory[fingerprint]
+            return None
+        _memory.move_to_end(fingerprint)
+        return payload, created_at
+
+
+def _memory_put(fingerprint: str, payload: str, created_at: datetime):
+    with _memory_lock:
+        _memory[fingerprint] = (payload, created_at)
+        _memory.move_to_end(fingerprint)
+        while len(_memory) > SOLVER_CACHE_SIZE:
+            _memory.popitem(last=False)
+
+
+def get_cached_result(db: Session, fingerprint: str) -> tuple[Optional[dict], dict]:
+    """Retorna (resultado, metadados do cache); resultado é None quando não há acerto."""
+    entry = _memory_get(fingerprint)
+    if entry is not None:
+        payload, created_at = entry
+        return json.loads(payload), _hit_metadata(fingerprint, "memory", created_at)
+
+    row = db.query(SolverCacheEntry).filter(
+        SolverCacheEntry.fingerprint == fingerprint,
+        SolverCacheEntry.expires_at > datetime.utcnow(),
+    ).first()
+    if row is None:
+        return None, {"hit": False, "fingerprint": fingerprint}
+
+    row.hits += 1
+    db.commit()
+    _memory_put(fingerprint, row.result, row.created_at)
+    return json.loads(row.result), _hit_metadata(fingerprint, "db", row.created_at)
+
+
+def store_result(db: Session, fingerprint: str, kind: str, result: dict):
+    """Grava o resultado nas duas camadas e remove do banco as entradas expiradas."""
+    payload = json.dumps(result, default=str)
+    now = datetime.utcnow()
+    _memory_put(fingerprint, payload, now)
+
+    db.query(SolverCacheEntry).filter(SolverCacheEntry.expires_at <= now).delete(synchronize_session=False)
+    row = db.query(SolverCacheEntry).filter(SolverCacheEntry.fingerprint == fingerprint).first()
+    if row is None:
+        row = SolverCacheEntry(fingerprint=fingerprint, kind=kind)
+        db.add(row)
+    row.result = payload
+    row.created_at = now
+    row.expires_at = now + timedelta(seconds=SOLVER_CACHE_TTL)
+    try:
+        db.commit()
+    except IntegrityError:
+        # Outro worker gravou a mesma chave ao mesmo tempo
+        db.rollback()
+
+
+def clear_memory_cache():
+    with _memory_lock:
+        _memory.clear()
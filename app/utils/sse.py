@@ -1,28 +1,146 @@
+"""
+Streams SSE por usuário e estado "sequenciamento em andamento".
+
+Os eventos passam pelo broker (`app/utils/event_broker.py`), então chegam
+ao stream do usuário mesmo quando ele está conectado em outro worker do
+uvicorn. A trava de processamento também é do broker (compartilhada entre
+workers com SSE_BROKER=postgres).
+
+Cada conexão (aba do navegador) é um `Subscriber` com fila própria e
+limitada (SSE_QUEUE_SIZE): com a fila cheia, o evento mais antigo é
+descartado. Os últimos SSE_HISTORY_SIZE eventos de cada usuário ficam em
+um buffer circular para retomar a conexão a partir do `Last-Event-ID`.
+"""
 import asyncio
 import json
+import os
+import time
+import uuid
+from collections import deque
+from typing import Optional
+
+from starlette.concurrency import run_in_threadpool
+
+from app.utils.event_broker import create_broker
+
+SSE_QUEUE_SIZE = int(os.getenv("SSE_QUEUE_SIZE", 256))
+SSE_HISTORY_SIZE = int(os.getenv("SSE_HISTORY_SIZE", 100))
+SSE_HEARTBEAT_S = float(os.getenv("SSE_HEARTBEAT_S", 15))
+
+# Prefixo dos ids deste processo: ids únicos mesmo com vários workers publicando
+_ID_PREFIX = uuid.uuid4().hex[:8]
+_sequence = 0
+
+
+class Subscriber:
+    """Uma conexão SSE de um usuário: fila limitada com descarte do mais antigo."""
+
+    def __init__(self, user_id: str, maxsize: int = SSE_QUEUE_SIZE):
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self.connected_at = time.time()
+
+    def put(self, event_id: Optional[str], data: str):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait((event_id, data))
+
+
+sse_subscribers: dict[str, set[Subscriber]] = {}
+sse_history: dict[str, deque] = {}
+_delivered = 0
+
+
+def _deliver(user_id: str, event_id: str, data: str):
+    """Entrega um evento publicado pelo broker aos streams locais do usuário."""
+    global _delivered
+    sse_history.setdefault(user_id, deque(maxlen=SSE_HISTORY_SIZE)).append((event_id, data))
+    for subscriber in sse_subscribers.get(user_id, ()):
+        subscriber.put(event_id, data)
+        _delivered += 1
+
+
+broker = create_broker(_deliver)
+
+
+async def start_broker():
+    await broker.start()
+
+
+async def stop_broker():
+    await broker.stop()
+
+
+def register_user(user_id: str, last_event_id: Optional[str] = None) -> Subscriber:
+    """
+    Nova conexão do usuário (as demais continuam recebendo). Com
+    `last_event_id`, reenvia os eventos do buffer posteriores a ele; se o id
+    já saiu do buffer, reenvia o buffer inteiro.
+    """
+    subscriber = Subscriber(user_id)
+    sse_subscribers.setdefault(user_id, set()).add(subscriber)
+    if last_event_id is not None:
+        history = list(sse_history.get(user_id, ()))
+        ids = [event_id for event_id, _ in history]
+        start = ids.index(last_event_id) + 1 if last_event_id in ids else 0
+        for event_id, data in history[start:]:
+            subscriber.put(event_id, data)
+    return subscriber
+
+def unregister_user(subscriber: Subscriber):
+    subscribers = sse_subscribers.get(subscriber.user_id)
+    if subscribers is None:
+        return
+    subscribers.discard(subscriber)
+    if not subscribers:
+        sse_subscribers.pop(subscriber.user_id, None)
+
+async def send_event(user_id: str, message):
+    global _sequence
+    _sequence += 1
+    await broker.publish(user_id, f"{_ID_PREFIX}-{_sequence}", json.dumps(message))  # manda booleano, string ou dict
+
+
+def format_event(event_id: Optional[str], data: str) -> str:
+    if event_id is None:
+        return f"data: {data}\n\n"
+    return f"id: {event_id}\ndata: {data}\n\n"
+
 
-sse_event_queues: dict[str, asyncio.Queue] = {}
-sse_status: dict[str, bool] = {}
+def sse_metrics() -> dict:
+    """Conexões e profundidade das filas deste processo."""
+    subscribers = [subscriber for group in sse_subscribers.values() for subscriber in group]
+    return {
+        "pid": os.getpid(),
+        "broker": type(broker).__name__,
+        "users": len(sse_subscribers),
+        "subscribers": len(subscribers),
+        "delivered_events": _delivered,
+        "dropped_events": sum(subscriber.dropped for subscriber in subscribers),
+        "queue_size": SSE_QUEUE_SIZE,
+        "history_size": SSE_HISTORY_SIZE,
+        "queues": [
+            {
+                "user_id": subscriber.user_id,
+                "depth": subscriber.queue.qsize(),
+                "dropped": subscriber.dropped,
+                "connected_s": round(time.time() - subscriber.connected_at, 1),
+            }
+            for subscriber in subscribers
+        ],
+    }
 
-def register_user(user_id: str) -> asyncio.Queue:
-    queue = asyncio.Queue()
-    sse_event_queues[user_id] = queue
-    sse_status.setdefault(user_id, True)  # default False se não existe
-    return queue
 
-def unregister_user(user_id: str):
-    sse_event_queues.pop(user_id, None)
-    sse_status.pop(user_id, None)
+# A trava pode consultar o banco (broker "postgres"): roda no threadpool, fora do event loop
 
-async def send_event(user_id: str, message) -> bool:
-    queue = sse_event_queues.get(user_id)
-    if queue:
-        await queue.put(json.dumps(message))  # manda booleano ou string
-        return False
-    return True
+async def acquire_processing(user_id: str) -> bool:
+    """Marca o usuário como processando; False se já houver um sequenciamento em andamento."""
+    return await run_in_threadpool(broker.try_lock, user_id)
 
-def set_processing(user_id: str, value: bool):
-    sse_status[user_id] = value
+async def release_processing(user_id: str):
+    await run_in_threadpool(broker.unlock, user_id)
 
-def is_processing(user_id: str) -> bool:
-    return sse_status.get(user_id, False)
+async def is_processing(user_id: str) -> bool:
+    return await run_in_threadpool(broker.is_locked, user_id)
@@ -0,0 +1,327 @@
+"""
+Fila de tarefas do solver.
+
+As execuções do solver rodam em um pool de workers compartilhado e de
+tamanho limitado (variável de ambiente SOLVER_WORKERS, padrão = número de
+núcleos). Cada tarefa é registrada na tabela `solve_task`, com status e
+resultado em JSON, para que o cliente consulte o andamento por polling
+em vez de manter a requisição HTTP aberta durante o solve.
+
+A parte pesada (construção do modelo, solve e extração dos valores) roda
+em um pool de processos (`run_solver`), para não disputar o GIL com as
+requisições da API:
+
+- SOLVER_THREADS: threads do solver MIP (CBC ou HiGHS) por solve (padrão 1)
+- SOLVER_PROCESSES: processos do pool (padrão = núcleos / SOLVER_THREADS);
+  0 executa o solve na própria thread do worker
+
+Ex.: em 16 núcleos, SOLVER_PROCESSES=4 e SOLVER_THREADS=4.
+"""
+import asyncio
+import json
+import multiprocessing
+import os
+import threading
+import traceback
+from contextlib import contextmanager
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Optional
+
+from sqlalchemy.orm import Session
+
+from algorithm.solver_backends import request_stop
+from app.database import SessionLocal
+from app.models.solve_task import SolveTask
+from app.utils.sse import send_event
+
+SOLVER_WORKERS = int(os.getenv("SOLVER_WORKERS", os.cpu_count() or 1))
+
+# Pool único para todos os solves (tarefas assíncronas e rota síncrona /solve)
+solver_executor = ThreadPoolExecutor(max_workers=SOLVER_WORKERS, thread_name_prefix="solver")
+
+SOLVER_THREADS = max(1, int(os.getenv("SOLVER_THREADS", 1)))
+SOLVER_PROCESSES = int(os.getenv("SOLVER_PROCESSES", max(1, (os.cpu_count() or 1) // SOLVER_THREADS)))
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_lock = threading.Lock()
+
+_futures: dict[int, Future] = {}
+_futures_lock = threading.Lock()
+
+# Intervalo de consulta do flag `stop_requested` durante o solve
+STOP_REQUEST_POLL_INTERVAL = float(os.getenv("STOP_REQUEST_POLL_INTERVAL", 1.0))
+
+
+def _get_process_pool() -> Optional[ProcessPoolExecutor]:
+    global _process_pool
+    if SOLVER_PROCESSES <= 0:
+        return None
+    with _process_pool_lock:
+        if _process_pool is None:
+            # "spawn": o processo filho não herda threads/conexões do servidor
+            _process_pool = ProcessPoolExecutor(
+                max_workers=SOLVER_PROCESSES,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _process_pool
+
+
+def submit_solver(fn: Callable, *args, **kwargs) -> Future:
+    """
+    Agenda `fn(*args, **kwargs)` no pool de processos sem aguardar (vários
+    subproblemas em paralelo). `fn` deve ser uma função de módulo e os
+    argumentos/retorno picklable. Com SOLVER_PROCESSES=0 usa o `solver_executor`.
+    """
+    pool = _get_process_pool()
+    if pool is None:
+        return solver_executor.submit(fn, *args, **kwargs)
+    return pool.submit(fn, *args, **kwargs)
+
+
+def run_solver(fn: Callable, *args, **kwargs):
+    """
+    Executa `fn(*args, **kwargs)` no pool de processos e aguarda o resultado.
+    Chamada a partir das threads do `solver_executor`.
+    """
+    pool = _get_process_pool()
+    if pool is None:
+        return fn(*args, **kwargs)
+    return pool.submit(fn, *args, **kwargs).result()
+
+
+def shutdown_solver_pools():
+    global _process_pool
+    solver_executor.shutdown(wait=False, cancel_futures=True)
+    with _process_pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+            _process_pool = None
+
+
+class TaskCancelled(Exception):
+    """Levantada pelo worker quando o cancelamento é solicitado durante a execução."""
+
+
+def _notify(loop: Optional[asyncio.AbstractEventLoop], user_id: Optional[str], message):
+    if loop is None or user_id is None or loop.is_closed():
+        return
+    asyncio.run_coroutine_threadsafe(send_event(user_id, message), loop)
+
+
+def progress_notifier(loop: Optional[asyncio.AbstractEventLoop], user_id: Optional[str], **extra) -> Optional[Callable]:
+    """
+    Callback para `algorithm.solver_progress.track_solver_progress` que envia
+    cada evento de progresso (mais os campos de `extra`) ao stream SSE do usuário.
+    """
+    if loop is None or user_id is None:
+        return None
+
+    def on_progress(progress: dict):
+        _notify(loop, user_id, {"progress": progress, **extra})
+
+    return on_progress
+
+
+def is_cancel_requested(db: Session, task_id: int) -> bool:
+    """Consulta o flag de cancelamento gravado por `cancel_task` (outra sessão)."""
+    flag = db.query(SolveTask.cancel_requested).filter(SolveTask.id == task_id).scalar()
+    return bool(flag)
+
+
+def _stop_flags(db: Session, task_id: int) -> tuple[bool, bool]:
+    """
+    (stop_requested, cancel_requested) da tarefa, em uma consulta: flags
+    gravados por `stop_task` e `cancel_task` (qualquer worker).
+    """
+    row = db.query(SolveTask.stop_requested, SolveTask.cancel_requested).filter(SolveTask.id == task_id).first()
+    return (bool(row[0]), bool(row[1])) if row is not None else (False, False)
+
+
+def _run_task(task_id: int, work: Callable, loop, user_id: Optional[str]):
+    """
+    Executa `work(db, task)` em uma sessão própria do worker. `work` retorna
+    (resultado, run_id) e pode levantar `TaskCancelled`.
+    """
+    db = SessionLocal()
+    try:
+        task = db.query(SolveTask).get(task_id)
+        if task is None or task.status != "pending":
+            return
+        if task.cancel_requested:
+            task.status = "cancelled"
+            task.finished_at = datetime.utcnow()
+            db.commit()
+            return
+
+        task.status = "running"
+        task.started_at = datetime.utcnow()
+        db.commit()
+        _notify(loop, user_id, {"task_id": task_id, "status": "running"})
+
+        try:
+            result, run_id = work(db, task)
+        except TaskCancelled:
+            db.rollback()
+            task = db.query(SolveTask).get(task_id)
+            task.status = "cancelled"
+        except Exception as e:
+            db.rollback()
+            task = db.query(SolveTask).get(task_id)
+            task.status = "failed"
+            # HTTPException (validação dos dados) carrega o detalhe em .detail
+            detail = getattr(e, "detail", None)
+            task.error = json.dumps(detail if detail is not None else str(e), default=str)
+            traceback.print_exc()
+        else:
+            task = db.query(SolveTask).get(task_id)
+            task.status = "completed"
+            task.result = json.dumps(result, default=str)
+            task.run_id = run_id
+
+        task.finished_at = datetime.utcnow()
+        db.commit()
+        _notify(loop, user_id, {"task_id": task_id, "status": task.status})
+    finally:
+        db.close()
+        with _futures_lock:
+            _futures.pop(task_id, None)
+
+
+def submit_task(
+    db: Session,
+    kind: str,
+    params: dict,
+    work: Callable,
+    user_id: Optional[str] = None,
+) -> SolveTask:
+    """
+    Registra a tarefa como "pending" e agenda `work` no pool de workers.
+    Retorna imediatamente; deve ser chamada de dentro do event loop (as
+    notificações SSE do worker são enviadas para esse loop).
+    """
+    task = SolveTask(kind=kind, user_id=user_id, status="pending", params=json.dumps(params, default=str))
+    db.add(task)
+    db.commit()
+    db.refresh(task)
+
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = None
+
+    with _futures_lock:
+        _futures[task.id] = solver_executor.submit(_run_task, task.id, work, loop, user_id)
+    return task
+
+
+def cancel_task(db: Session, task: SolveTask) -> SolveTask:
+    """
+    Tarefas pendentes são retiradas da fila; tarefas em execução recebem o
+    flag `cancel_requested`: o worker que executa o solve interrompe o
+    solver (ver `running_solve`) e descarta o resultado.
+    """
+    if task.status not in ("pending", "running"):
+        return task
+
+    task.cancel_requested = True
+    with _futures_lock:
+        future = _futures.get(task.id)
+    if task.status == "pending" and future is not None and future.cancel():
+        task.status = "cancelled"
+        task.finished_at = datetime.utcnow()
+        with _futures_lock:
+            _futures.pop(task.id, None)
+    db.commit()
+    db.refresh(task)
+    return task
+
+
+class _StopRequestWatcher(threading.Thread):
+    """
+    Consulta `stop_requested` e `cancel_requested` da tarefa no banco
+    enquanto o solve roda e, quando um dos flags aparece, pede a parada ao
+    solver (`request_stop`). Como o pedido fica no banco, vale mesmo quando
+    POST /tasks/{id}/stop ou /cancel chega a outro worker do uvicorn.
+    """
+
+    def __init__(self, task_id: int, log_dir: str):
+        super().__init__(name=f"solve-stop-{task_id}", daemon=True)
+        self.task_id = task_id
+        self.log_dir = log_dir
+        self.finished = threading.Event()
+        self.cancelled = False
+
+    def run(self):
+        db = SessionLocal()
+        try:
+            while True:
+                try:
+                    stop, cancel = _stop_flags(db, self.task_id)
+                    db.rollback()  # encerra a transação: a próxima consulta vê novos commits
+                except Exception as e:
+                    print(f"Falha ao consultar a parada da tarefa {self.task_id}: {e}")
+                    db.rollback()
+                    stop = cancel = False
+                if stop or cancel:
+                    self.cancelled = cancel
+                    request_stop(self.log_dir)
+                    return
+                if self.finished.wait(STOP_REQUEST_POLL_INTERVAL):
+                    return
+        finally:
+            db.close()
+
+
+@contextmanager
+def running_solve(task_id: Optional[int], log_dir: str):
+    """
+    Acompanha os pedidos de parada antecipada (ver `stop_task`) e de
+    cancelamento (ver `cancel_task`) da tarefa enquanto o solve que usa
+    `log_dir` roda. Cancelada, o solver é interrompido e `TaskCancelled` é
+    levantada quando ele retorna.
+    """
+    if task_id is None:
+        yield
+        return
+    watcher = _StopRequestWatcher(task_id, log_dir)
+    watcher.start()
+    try:
+        yield
+    finally:
+        watcher.finished.set()
+        watcher.join()
+    if watcher.cancelled:
+        raise TaskCancelled()
+
+
+def stop_task(db: Session, task: SolveTask) -> SolveTask:
+    """
+    Parada antecipada de uma tarefa em execução: o solver termina com a
+    melhor solução encontrada até agora, que é gravada normalmente pela
+    tarefa. O pedido é gravado na tarefa e lido pelo worker que executa o
+    solve (em até STOP_REQUEST_POLL_INTERVAL segundos); se o solve ainda não
+    começou, ele para assim que iniciar.
+    """
+    task.stop_requested = True
+    db.commit()
+    db.refresh(task)
+    return task
+
+
+def task_to_dict(task: SolveTask) -> dict:
+    return {
+        "id": task.id,
+        "kind": task.kind,
+        "user_id": task.user_id,
+        "status": task.status,
+        "params": json.loads(task.params) if task.params else {},
+        "result": json.loads(task.result) if task.result else None,
+        "error": json.loads(task.error) if task.error else None,
+        "cancel_requested": task.cancel_requested,
+        "stop_requested": task.stop_requested,
+        "run_id": task.run_id,
+        "created_at": task.created_at,
+        "started_at": task.started_at,
+        "finished_at": task.finished_at,
+    }
@@ -0,0 +1,15 @@
+"""
+INSERT ... ON CONFLICT (upsert em um único comando) dos bancos suportados,
+Postgres e SQLite. O comando retornado aceita `on_conflict_do_nothing` e
+`on_conflict_do_update` com a mesma assinatura nos dois dialetos.
+"""
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+UPSERT_INSERTS = {"postgresql": postgresql_insert, "sqlite": sqlite_insert}
+
+
+def upsert_insert(db: Session, model):
+    """`insert(model)` do dialeto do banco da sessão."""
+    return UPSERT_INSERTS[db.get_bind().dialect.name](model)
@@ -0,0 +1,131 @@
+"""
+Calendário de trabalho (turnos regulares e feriados) usado nos prazos do
+solver e nas datas de conclusão gravadas em `save_schedule`.
+
+Os turnos (`RegularShift`) e as datas de feriado (`Holiday`) ficam em cache
+no processo com uma versão, incrementada pelas rotas que alteram esses
+cadastros (`invalidate_working_calendar`) e também expirando após
+CALENDAR_TTL segundos (padrão 300), como o índice de tempos de ciclo.
+Cada calendário compilado fica em cache por (início, fim, versão).
+
+Sem nenhum turno cadastrado o calendário é contínuo (24h por dia), o mesmo
+comportamento de antes do calendário existir.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from sqlalchemy.orm import Session
+
+from algorithm.working_calendar import DayShifts, WorkingCalendar, compile_calendar
+from app.models.holiday import Holiday
+from app.models.regular_shift import DiaSemana, FrequenciaTurno, RegularShift
+
+CALENDAR_TTL = float(os.getenv("CALENDAR_TTL", 300))
+CALENDAR_CACHE_SIZE = int(os.getenv("CALENDAR_CACHE_SIZE", 32))
+# Sem horas de trabalho em um período deste tamanho o calendário não avança
+_MAX_IDLE_DAYS = 28
+
+WEEKDAYS = {
+    DiaSemana.SEGUNDA: 0,
+    DiaSemana.TERCA: 1,
+    DiaSemana.QUARTA: 2,
+    DiaSemana.QUINTA: 3,
+    DiaSemana.SEXTA: 4,
+    DiaSemana.SABADO: 5,
+    DiaSemana.DOMINGO: 6,
+}
+
+
+def load_calendar_data(db: Session) -> tuple[Optional[dict[int, DayShifts]], frozenset[date]]:
+    """Turnos por dia da semana (None se não há turnos cadastrados) e datas de feriado."""
+    rows = db.query(
+        RegularShift.dia_semana, RegularShift.manha, RegularShift.tarde, RegularShift.noite, RegularShift.frequencia
+    ).all()
+    shifts = None
+    if rows:
+        shifts = {
+            WEEKDAYS[dia_semana]: DayShifts(
+                manha=manha, tarde=tarde, noite=noite, biweekly=frequencia == FrequenciaTurno.QUINZENAL
+            )
+            for dia_semana, manha, tarde, noite, frequencia in rows
+            if frequencia != FrequenciaTurno.NAO_TRABALHA
+        }
+    holidays = frozenset(holiday_date for (holiday_date,) in db.query(Holiday.date))
+    return shifts, holidays
+
+
+_data = None  # (shifts, holidays, versão, carregado em)
+_calendars: "OrderedDict[tuple, WorkingCalendar]" = OrderedDict()
+_version = 0
+_lock = threading.Lock()
+
+
+def _calendar_data(db: Session):
+    global _data, _version
+    with _lock:
+        data, version = _data, _version
+    if data is not None and time.monotonic() - data[3] < CALENDAR_TTL:
+        return data
+
+    shifts, holidays = load_calendar_data(db)
+    with _lock:
+        if version != _version:
+            # Uma escrita durante a carga invalida o que foi lido
+            return shifts, holidays, None, 0.0
+        # Recarga por TTL também muda a versão: os compilados antigos deixam de valer
+        _version += 1
+        _data = (shifts, holidays, _version, time.monotonic())
+        return _data
+
+
+def _compiled(start: datetime, end: datetime, shifts, holidays, version) -> WorkingCalendar:
+    key = (start, end, version)
+    with _lock:
+        calendar = _calendars.get(key) if version is not None else None
+        if calendar is not None:
+            _calendars.move_to_end(key)
+            return calendar
+    calendar = compile_calendar(start, end, shifts, holidays)
+    if version is not None:
+        with _lock:
+            _calendars[key] = calendar
+            while len(_calendars) > CALENDAR_CACHE_SIZE:
+                _calendars.popitem(last=False)
+    return calendar
+
+
+def get_working_calendar(db: Session, start: datetime, end: datetime, min_hours: float = 0.0) -> WorkingCalendar:
+    """
+    Calendário com origem em `start` cobrindo até `end`. Com `min_hours`, o
+    fim é estendido até o calendário ter pelo menos essa quantidade de horas
+    de trabalho (ex.: para converter o término do último job).
+    """
+    shifts, holidays, version, _ = _calendar_data(db)
+    end = max(end, start)
+    calendar = _compiled(start, end, shifts, holidays, version)
+    while calendar.total_hours < min_hours:
+        idle = timedelta(days=_MAX_IDLE_DAYS)
+        if end - start >= idle and calendar.hours_between(end - idle, end) == 0:
+            raise ValueError(f"Calendário sem horas de trabalho em {_MAX_IDLE_DAYS} dias: verifique os turnos cadastrados")
+        end = start + 2 * max(end - start, timedelta(days=7))
+        calendar = _compiled(start, end, shifts, holidays, version)
+    return calendar
+
+
+def has_working_shifts(db: Session) -> bool:
+    """Se há algum turno de trabalho (sem turnos cadastrados o calendário é contínuo)."""
+    shifts = _calendar_data(db)[0]
+    return shifts is None or any(day.manha or day.tarde or day.noite for day in shifts.values())
+
+
+def invalidate_working_calendar():
+    """Chamada após commits que alteram turnos regulares ou feriados."""
+    global _data, _version
+    with _lock:
+        _data = None
+        _version += 1
+        _calendars.clear()
@@ -0,0 +1,159 @@
+"""
+Benchmark do carregamento da matriz de setup usada em /sequenciamento/solve.
+
+Compara a abordagem antiga (uma query de Setup por par de jobs, mais duas de
+CompositionLine quando falta o setup) com o carregador em lote de
+app/utils/setup_matrix.py, medindo número de queries e tempo.
+
+Uso:
+    python -m benchmarks.bench_setup_matrix
+    python -m benchmarks.bench_setup_matrix --sizes 50 150 500 --legacy-max 500
+"""
+import argparse
+import math
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker, joinedload
+
+from app.database import Base
+from app.models import (
+    client, product, job, setup, mold, mold_product, machine,
+    production_line, composition_line, composition_line_machine, production_time,
+    raw_material, product_composition,
+)
+from app.models.client import Client
+from app.models.product import Product
+from app.models.job import Job
+from app.models.mold import Mold
+from app.models.production_line import ProductionLine
+from app.models.composition_line import CompositionLine
+from app.models.setup import Setup
+from app.utils.setup_matrix import resolve_job_composition_lines, build_job_setup_times
+
+
+def populate(session, n_jobs: int, missing_ratio: float = 0.0):
+    rng = np.random.default_rng(42)
+    session.add(Client(id=1, name="Cliente", priority=1))
+    session.add(ProductionLine(id=1, name="Linha 1"))
+    session.add(Mold(id=1, name="M1", total_cavities=4, open_cavities=4, scrap=0, closed_cavity_risk=0))
+    session.flush()
+
+    session.execute(insert(Product), [{"id": i + 1, "name": f"Produto {i + 1}"} for i in range(n_jobs)])
+    session.execute(insert(CompositionLine), [
+        {"id": i + 1, "production_line_id": 1, "mold_id": 1, "product_id": i + 1, "post_injection_cycle_time": 0}
+        for i in range(n_jobs)
+    ])
+    setups = [
+        {
+            "production_line_id": 1,
+            "from_composition_line_id": i + 1,
+            "to_composition_line_id": j + 1,
+            "name": f"M1 Produto {i + 1}",
+            "setup_time": int(rng.integers(0, 7200)),
+        }
+        for i in range(n_jobs)
+        for j in range(n_jobs)
+        if i != j and rng.random() >= missing_ratio
+    ]
+    session.execute(insert(Setup), setups)
+    base = datetime(2025, 1, 1)
+    session.execute(insert(Job), [
+        {
+            "id": i + 1, "name": f"Job {i + 1}", "promised_date": base + timedelta(days=i % 30),
+            "demand": 100, "product_value": 1.0, "fk_id_client": 1, "fk_id_product": i + 1,
+        }
+        for i in range(n_jobs)
+    ])
+    session.commit()
+
+
+def legacy_setup_times(db, jobs_data):
+    """Reprodução do laço original de solve_jobs (uma query por par)."""
+    job_to_composition_line = {}
+    for job in jobs_data:
+        cl = db.query(CompositionLine).filter_by(product_id=job.fk_id_product).first()
+        job_to_composition_line[job.id] = cl.id
+
+    setup_time = np.zeros((len(jobs_data), len(jobs_data)), dtype=float)
+    setups_faltando = []
+    for i, job_i in enumerate(jobs_data):
+        for j, job_j in enumerate(jobs_data):
+            if i != j:
+                from_cl_id = job_to_composition_line[job_i.id]
+                to_cl_id = job_to_composition_line[job_j.id]
+                s = db.query(Setup).filter_by(
+                    from_composition_line_id=from_cl_id,
+                    to_composition_line_id=to_cl_id
+                ).first()
+                if s:
+                    setup_time[i][j] = math.ceil((s.setup_time / 3600) * 10) / 10
+                else:
+                    from_cl = db.query(CompositionLine).options(
+                        joinedload(CompositionLine.mold), joinedload(CompositionLine.product)
+                    ).get(from_cl_id)
+                    to_cl = db.query(CompositionLine).options(
+                        joinedload(CompositionLine.mold), joinedload(CompositionLine.product)
+                    ).get(to_cl_id)
+                    setups_faltando.append(
+                        f"M{from_cl.mold_id}-{from_cl.product.name} ➜ M{to_cl.mold_id}-{to_cl.product.name}"
+                    )
+    return setup_time, setups_faltando
+
+
+def bulk_setup_times(db, jobs_data):
+    job_to_composition_line = resolve_job_composition_lines(db, jobs_data)
+    return build_job_setup_times(db, jobs_data, job_to_composition_line)
+
+
+def measure(engine, Session, fn):
+    counter = {"queries": 0}
+
+    def count(*_):
+        counter["queries"] += 1
+
+    event.listen(engine, "before_cursor_execute", count)
+    db = Session()
+    try:
+        jobs_data = db.query(Job).order_by(Job.id).all()
+        counter["queries"] = 0
+        t0 = time.perf_counter()
+        result = fn(db, jobs_data)
+        elapsed = time.perf_counter() - t0
+    finally:
+        db.close()
+        event.remove(engine, "before_cursor_execute", count)
+    return counter["queries"], elapsed, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 150, 500])
+    parser.add_argument("--legacy-max", type=int, default=150,
+                        help="Maior número de jobs para rodar a versão antiga (é lenta)")
+    parser.add_argument("--missing-ratio", type=float, default=0.0,
+                        help="Fração de pares sem setup cadastrado")
+    args = parser.parse_args()
+
+    print(f"{'jobs':>6} | {'versão':>7} | {'queries':>8} | {'tempo (s)':>10} | faltantes")
+    for n in args.sizes:
+        engine = create_engine("sqlite://")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine, autoflush=False)
+        with Session() as session:
+            populate(session, n, args.missing_ratio)
+
+        queries, elapsed, (matrix, missing) = measure(engine, Session, bulk_setup_times)
+        print(f"{n:>6} | {'lote':>7} | {queries:>8} | {elapsed:>10.4f} | {len(missing)}")
+
+        if n <= args.legacy_max:
+            l_queries, l_elapsed, (l_matrix, l_missing) = measure(engine, Session, legacy_setup_times)
+            assert np.array_equal(matrix, l_matrix) and missing == l_missing
+            print(f"{n:>6} | {'antiga':>7} | {l_queries:>8} | {l_elapsed:>10.4f} | {len(l_missing)}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Benchmark dos backends MIP (CBC x HiGHS) no modelo de /sequenciamento/solve.
+
+Por padrão usa os jobs ainda não sequenciados do banco configurado em
+DATABASE_URL (mesma preparação da rota: tempos, prazos, prioridades e matriz
+de setup). Com --random, gera instâncias sintéticas de N jobs.
+
+Uso:
+    python -m benchmarks.bench_solver_backends
+    python -m benchmarks.bench_solver_backends --job-ids 1 2 3 4 5 --sequencing-date 2025-01-06T06:00
+    python -m benchmarks.bench_solver_backends --random 10 15 20 --time-limit 60
+"""
+import argparse
+import contextlib
+import io
+from datetime import datetime
+
+import numpy as np
+
+from algorithm.sequencing import FORMULATIONS, solve_sequencing_problem
+from algorithm.solver_backends import BACKENDS, SolverOptions
+
+
+def random_instance(n: int, seed: int) -> dict:
+    rng = np.random.default_rng(seed)
+    processing_time = rng.uniform(1, 6, n).round(1)
+    due_time = rng.uniform(0, processing_time.sum(), n).round(1)
+    setup_time = rng.uniform(0, 1.5, (n, n)).round(1)
+    np.fill_diagonal(setup_time, 0.0)
+    return {
+        "name": f"aleatória n={n} seed={seed}",
+        "processing_time": processing_time.tolist(),
+        "due_time": due_time.tolist(),
+        "weight": rng.integers(1, 4, n).astype(float).tolist(),
+        "setup_time": setup_time.tolist(),
+    }
+
+
+def database_instance(job_ids, sequencing_date: datetime, machine_availability: int) -> dict:
+    # Importados aqui: a rota carrega a configuração da aplicação (.env)
+    from app.database import SessionLocal
+    from app.models.job import Job
+    from app.routes.solver import prepare_sequencing
+
+    db = SessionLocal()
+    try:
+        if not job_ids:
+            job_ids = [job_id for (job_id,) in db.query(Job.id).filter(Job.processed.isnot(True)).order_by(Job.id)]
+        # Só leitura: jobs já sequenciados também servem de instância
+        prepared = prepare_sequencing(db, job_ids, sequencing_date, machine_availability, include_processed=True)
+    finally:
+        db.close()
+    return {
+        "name": f"banco ({len(job_ids)} jobs)",
+        **{key: prepared[key] for key in ("processing_time", "due_time", "weight", "setup_time")},
+    }
+
+
+def run(instance: dict, formulation: str, options: SolverOptions, warm_start: bool) -> dict:
+    # O log do solver vai para stdout; aqui só interessa o resumo
+    with contextlib.redirect_stdout(io.StringIO()):
+        solution = solve_sequencing_problem(
+            instance["processing_time"],
+            instance["due_time"],
+            instance["weight"],
+            instance["setup_time"],
+            formulation=formulation,
+            warm_start=warm_start,
+            options=options,
+        )
+    return solution["model"]
+
+
+def _fmt(number, digits=4):
+    return "-" if number is None else f"{number:.{digits}f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--random", type=int, nargs="+", help="Tamanhos das instâncias sintéticas")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--job-ids", type=int, nargs="+", help="Jobs do banco (padrão: todos não processados)")
+    parser.add_argument("--sequencing-date", type=datetime.fromisoformat, default=datetime.now())
+    parser.add_argument("--machine-availability", type=int, default=100)
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--formulations", nargs="+", choices=FORMULATIONS, default=["precedence"])
+    parser.add_argument("--time-limit", type=float, default=120)
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--gap-rel", type=float, default=None)
+    parser.add_argument("--no-presolve", action="store_true")
+    parser.add_argument("--no-warm-start", action="store_true")
+    args = parser.parse_args()
+
+    if args.random:
+        instances = [random_instance(n, args.seed) for n in args.random]
+    else:
+        instances = [database_instance(args.job_ids, args.sequencing_date, args.machine_availability)]
+
+    print(
+        f"{'instância':<28} | {'formulação':<10} | {'backend':<7} | {'objetivo':>10} | "
+        f"{'limitante':>10} | {'gap':>7} | {'nós':>8} | {'tempo (s)':>9} | resultado"
+    )
+    for instance in instances:
+        for formulation in args.formulations:
+            for backend in args.backends:
+                options = SolverOptions(
+                    backend=backend,
+                    time_limit=args.time_limit,
+                    threads=args.threads,
+                    gap_rel=args.gap_rel,
+                    presolve=not args.no_presolve,
+                )
+                report = run(instance, formulation, options, warm_start=not args.no_warm_start)
+                print(
+                    f"{instance['name']:<28} | {formulation:<10} | {backend:<7} | "
+                    f"{_fmt(report['objective_value'], 2):>10} | {_fmt(report['best_bound'], 2):>10} | "
+                    f"{_fmt(report['gap']):>7} | {report['nodes'] if report['nodes'] is not None else '-':>8} | "
+                    f"{report['solve_time_s']:>9.2f} | {report['result']}"
+                )
+
+
+if __name__ == "__main__":
+    main()
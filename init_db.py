@@ -1,5 +1,6 @@
 # init_db.py
 
+from sqlalchemy import inspect, text
 from app.database import Base, engine
 from app.models import (
     user,
@@ -11,6 +12,7 @@ from app.models import (
     product,
     job,
     setup,
+    setup_default,
     machine,
     production_line,
     composition_line,
@@ -26,11 +28,60 @@ from app.models import (
     mold,
     mold_product,
     production_time,
+    solve_task,
+    solver_cache,
 )
 
+# Colunas adicionadas a tabelas já existentes. O create_all só cria tabelas
+# novas (não altera as existentes); estas colunas são adicionadas por
+# upgrade_schema(). Todas anuláveis: linhas antigas ficam com NULL.
+ADDED_COLUMNS = [
+    production_schedule_run.ProductionScheduleRun.__table__.c.machine_availability,
+    production_schedule_run.ProductionScheduleRun.__table__.c.base_run_id,
+    production_schedule_result.ProductionScheduleResult.__table__.c.composition_line_id,
+    production_schedule_result.ProductionScheduleResult.__table__.c.start_hours,
+    production_schedule_result.ProductionScheduleResult.__table__.c.processing_hours,
+    production_schedule_result.ProductionScheduleResult.__table__.c.post_bottleneck_hours,
+    production_schedule_result.ProductionScheduleResult.__table__.c.due_hours,
+    production_schedule_result.ProductionScheduleResult.__table__.c.weight,
+    production_schedule_result.ProductionScheduleResult.__table__.c.setup_hours,
+]
+
+
+def _add_column_sql(column) -> str:
+    sql = f"ALTER TABLE {column.table.name} ADD COLUMN {column.name} {column.type.compile(dialect=engine.dialect)}"
+    for fk in column.foreign_keys:
+        sql += f" REFERENCES {fk.column.table.name} ({fk.column.name})"
+        if fk.ondelete:
+            sql += f" ON DELETE {fk.ondelete}"
+    return sql
+
+
+def upgrade_schema():
+    """
+    Adiciona as colunas de ADDED_COLUMNS que faltam em bancos criados antes
+    delas. Idempotente: só altera tabelas existentes sem a coluna.
+    """
+    inspector = inspect(engine)
+    added = []
+    with engine.begin() as conn:
+        for column in ADDED_COLUMNS:
+            table = column.table.name
+            if not inspector.has_table(table):
+                continue
+            if column.name in {existing["name"] for existing in inspector.get_columns(table)}:
+                continue
+            conn.execute(text(_add_column_sql(column)))
+            added.append(f"{table}.{column.name}")
+    return added
+
+
 def init():
     print("Criando todas as tabelas no banco de dados...")
     Base.metadata.create_all(bind=engine)
+    added = upgrade_schema()
+    if added:
+        print(f"Colunas adicionadas: {', '.join(added)}")
     print("Tabelas criadas com sucesso!")
 
 if __name__ == "__main__":
@@ -37,6 +37,8 @@ from fastapi_utils.tasks import repeat_every
 from contextlib import asynccontextmanager
 from app.database import get_db
 from app.models.user_session import UserSession
+from app.utils.task_queue import shutdown_solver_pools
+from app.utils.sse import start_broker, stop_broker
 from fastapi.middleware.cors import CORSMiddleware
 
 @asynccontextmanager
@@ -46,7 +48,10 @@ async def lifespan(app: FastAPI):
         db = next(get_db())
         db.query(UserSession).filter(UserSession.is_active == False).delete()
         db.commit()
+    await start_broker()
     yield
+    await stop_broker()
+    shutdown_solver_pools()
 
 app = FastAPI(lifespan=lifespan)
 